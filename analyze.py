@@ -0,0 +1,112 @@
+"""Module to search single positions or FEN and EPD files headlessly"""
+import argparse
+import json
+import sys
+
+from utils.book import OpeningBook
+from utils.core import START_FEN
+from utils.fenfile import load_positions
+from utils.parallel import ParallelSearch, compare
+from utils.position import Position
+from utils.report import write_report
+from utils.search import Search
+from utils.tablebase import open_tablebases
+from utils.transposition import DEFAULT_HASH_MB, TranspositionTable
+
+
+def parse_args():
+    """Parses command line arguments"""
+
+    parser = argparse.ArgumentParser(description="Search a position and "
+        "print the best move, score, principal variation and node counts")
+    parser.add_argument("-f", "--fen", default=START_FEN,
+        help="position to analyse (default: start position)")
+    parser.add_argument("-F", "--fen-file",
+        help="analyse every FEN or EPD line of a file, printing one JSON "
+        "line per position")
+    parser.add_argument("--skip-invalid", action="store_true",
+        help="pass over invalid lines of --fen-file instead of stopping")
+    parser.add_argument("-d", "--depth", type=int, help="maximum depth")
+    parser.add_argument("-n", "--nodes", type=int, help="maximum nodes")
+    parser.add_argument("-t", "--movetime", type=float,
+        help="maximum seconds")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+        help="search processes, 0 for one per core (default: 1)")
+    parser.add_argument("--hash", type=int, default=DEFAULT_HASH_MB,
+        help=f"transposition table megabytes (default: {DEFAULT_HASH_MB})")
+    parser.add_argument("-b", "--book",
+        help="play book moves from this opening book without searching")
+    parser.add_argument("--tablebases",
+        help="probe endgame tables in this directory during the search, "
+        "which runs in one process")
+    parser.add_argument("--compare", action="store_true",
+        help="report parallel speedup against one process at --depth")
+    return parser.parse_args()
+
+
+def analyse_file(args, book, tablebases):
+    """Streams positions from a file and prints one JSON line for each"""
+
+    table = TranspositionTable(args.hash)
+    positions = load_positions(args.fen_file,
+        errors="skip" if args.skip_invalid else "raise")
+    try:
+        for (number, position) in positions:
+            fen = position.fen()
+            result = Search(position, max_depth=args.depth,
+                max_nodes=args.nodes, max_time=args.movetime,
+                table=table, book=book, tablebases=tablebases).run()
+            print(json.dumps(dict({"line": number, "fen": fen},
+                **result.as_dict())), flush=True)
+    except (OSError, ValueError) as error:
+        print(f"[ERROR] {error}", file=sys.stderr)
+        return 2
+    return 0
+
+
+def main():
+    """Runs the requested analysis and prints JSON"""
+
+    args = parse_args()
+    if args.depth is None and args.nodes is None and args.movetime is None:
+        args.depth = 4
+    try:
+        book = OpeningBook(args.book) if args.book else None
+        tablebases = open_tablebases(args.tablebases) \
+            if args.tablebases else None
+    except (OSError, ValueError) as error:
+        print(f"[ERROR] {error}", file=sys.stderr)
+        return 2
+    if args.fen_file:
+        return analyse_file(args, book, tablebases)
+
+    position = Position("bitboard")
+    try:
+        position.set_fen(args.fen)
+    except ValueError as error:
+        print(f"[ERROR] {error}", file=sys.stderr)
+        return 2
+
+    if args.compare:
+        report = compare(position, args.depth or 4, args.workers or None,
+            args.hash)
+    elif args.workers == 1 or book is not None and book.moves(position) or \
+            tablebases is not None:
+        table = TranspositionTable(args.hash)
+        result = Search(position, max_depth=args.depth, max_nodes=args.nodes,
+            max_time=args.movetime, table=table, book=book,
+            tablebases=tablebases).run()
+        report = dict(result.as_dict(), table=table.stats())
+    else:
+        with ParallelSearch(args.workers or None, args.hash) as parallel:
+            result = parallel.search(position, args.depth, args.nodes,
+                args.movetime)
+            report = dict(result.as_dict(), workers=parallel.workers,
+                table=parallel.table.stats())
+
+    write_report(report, "-")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Module to time imports, measure memory and stress test games"""
+import argparse
+import platform
+import sys
+
+from utils.benchmark import (IMPORT_MODULES, measure_imports, measure_memory,
+    stress_games)
+from utils.report import write_report
+
+
+def parse_args():
+    """Parses command line arguments"""
+
+    parser = argparse.ArgumentParser(description="Measure startup and "
+        "resource costs of the game modules")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    imports = commands.add_parser("imports", help="time importing modules "
+        "in fresh interpreters and check they have no side effects")
+    imports.add_argument("-m", "--module", action="append",
+        help=f"module to import, repeatable (default: "
+        f"{', '.join(IMPORT_MODULES)})")
+    imports.add_argument("-r", "--repeat", type=int, default=5,
+        help="interpreters per module, best time is kept (default: 5)")
+
+    memory = commands.add_parser("memory", help="report bytes used per "
+        "position and per board square and piece view")
+    memory.add_argument("-c", "--count", type=int, default=10000,
+        help="objects built per measurement (default: 10000)")
+    memory.add_argument("-p", "--plies", type=int, default=40,
+        help="random moves played into each position (default: 40)")
+
+    stress = commands.add_parser("stress", help="play many games side by "
+        "side in one process and check that none share state")
+    stress.add_argument("-g", "--games", type=int, default=2000,
+        help="simultaneous games (default: 2000)")
+    stress.add_argument("-p", "--plies", type=int, default=60,
+        help="random moves per game (default: 60)")
+    stress.add_argument("-s", "--seed", type=int, default=1,
+        help="random seed (default: 1)")
+    parser.add_argument("-o", "--output",
+        help="write JSON results to file, or - for stdout")
+    return parser.parse_args()
+
+
+def run_imports(args):
+    """Times module imports and returns (report, passed)"""
+
+    results = measure_imports(args.module or IMPORT_MODULES, args.repeat)
+    if args.output != "-":
+        for result in results:
+            effects = [name for name in ("tkinter", "threads", "files")
+                if result[name]]
+            status = "ok" if result["clean"] else \
+                f"SIDE EFFECTS ({', '.join(effects)})"
+            print(f"{result['module']:<16} {result['seconds'] * 1000:>8.2f} ms"
+                f"  {status}")
+    return ({"results": results}, all(result["clean"] for result in results))
+
+
+def run_memory(args):
+    """Measures memory per object and returns (report, passed)"""
+
+    report = measure_memory(args.count, args.plies)
+    if args.output != "-":
+        for (name, value) in report["bytes"].items():
+            print(f"{name:<16} {value:>10.1f} bytes")
+    return (report, True)
+
+
+def run_stress(args):
+    """Plays simultaneous games and returns (report, passed)"""
+
+    report = stress_games(args.games, args.plies, args.seed)
+    if args.output != "-":
+        print(f"{report['games']} games  {report['played']} plies  "
+            f"{report['seconds']:.3f}s  {report['plies_per_second']} plies/s  "
+            f"{report['finished']} finished")
+        for (index, problems) in report["failures"].items():
+            print(f"game {index}: {'; '.join(problems)}", file=sys.stderr)
+        for (index, problems) in report["board_failures"].items():
+            print(f"board {index}: {'; '.join(problems)}", file=sys.stderr)
+        print("ok" if not report["failures"] and not report["board_failures"]
+            else f"FAIL ({len(report['failures'])} games, "
+            f"{len(report['board_failures'])} boards)")
+    return (report, not report["failures"] and not report["board_failures"])
+
+
+COMMANDS = {
+    "imports": run_imports,
+    "memory": run_memory,
+    "stress": run_stress,
+}
+
+
+def main():
+    """Runs the requested benchmark"""
+
+    args = parse_args()
+    (report, passed) = COMMANDS[args.command](args)
+    report = dict({"python": platform.python_version(),
+        "command": args.command}, **report)
+    write_report(report, args.output)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Module to build opening books from PGN archives and probe them"""
+import argparse
+import sys
+
+from utils.book import BOOK_PLIES, OpeningBook, build_book
+from utils.core import START_FEN, move_name
+from utils.position import Position
+from utils.report import write_report
+
+
+def parse_args():
+    """Parses command line arguments"""
+
+    parser = argparse.ArgumentParser(description="Build an opening book "
+        "from a PGN archive, or list the book moves of a position")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="count the opening moves of "
+        "a PGN archive into a sorted, memory mappable book file")
+    build.add_argument("pgn", help="PGN file to read")
+    build.add_argument("book", help="book file to write")
+    build.add_argument("-p", "--plies", type=int, default=BOOK_PLIES,
+        help=f"plies of each game to count (default: {BOOK_PLIES})")
+    build.add_argument("-m", "--min-games", type=int, default=1,
+        help="leave out moves played in fewer games (default: 1)")
+    build.add_argument("-w", "--workers", type=int, default=0,
+        help="reading processes, 0 for one per core (default: 0)")
+
+    probe = commands.add_parser("probe", help="list the book moves of a "
+        "position with their weights and game counts")
+    probe.add_argument("book", help="book file to read")
+    probe.add_argument("-f", "--fen", default=START_FEN,
+        help="position to look up (default: start position)")
+    parser.add_argument("-o", "--output",
+        help="write JSON results to file, or - for stdout")
+    return parser.parse_args()
+
+
+def run_build(args):
+    """Builds the book and returns its figures"""
+
+    report = build_book(args.pgn, args.book, args.plies, args.min_games,
+        args.workers or None)
+    if args.output != "-":
+        print(f"{report['games']} games  {report['errors']} errors  "
+            f"{report['positions']} positions  {report['entries']} moves  "
+            f"{report['bytes']} bytes  {report['seconds']:.3f}s  "
+            f"{report['games_per_second']} games/s")
+    return report
+
+
+def run_probe(args):
+    """Looks a position up and returns its book moves"""
+
+    position = Position("bitboard")
+    position.set_fen(args.fen)
+    with OpeningBook(args.book) as book:
+        records = book.moves(position)
+        entries = book.entries
+    total = sum(weight for (_, weight, _) in records) or 1
+    moves = [{"move": move_name(move), "weight": weight, "games": games,
+        "share": round(weight / total, 4)}
+        for (move, weight, games) in records]
+    if args.output != "-":
+        for move in moves:
+            print(f"{move['move']:<6} {move['weight']:>6} weight  "
+                f"{move['share'] * 100:>6.2f}%  {move['games']:>8} games")
+        if not moves:
+            print("out of book")
+    return {"fen": args.fen, "entries": entries, "moves": moves}
+
+
+COMMANDS = {
+    "build": run_build,
+    "probe": run_probe,
+}
+
+
+def main():
+    """Runs the requested book command"""
+
+    args = parse_args()
+    try:
+        report = dict({"command": args.command},
+            **COMMANDS[args.command](args))
+    except (OSError, ValueError) as error:
+        print(f"[ERROR] {error}", file=sys.stderr)
+        return 2
+    write_report(report, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
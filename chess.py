@@ -1,42 +1,43 @@
 """Module to run the chess game"""
-import tkinter as tk
+import argparse
 import sys
 
-from utils.board import Board
-
-
-class App(tk.Tk):
-    """Controls the window and contains the board"""
-
-    def __init__(self):
-        super().__init__()
-        self.title('Chess V2')
-
-        if sys.platform == "linux":
-            self.window_arg = "-zoomed"
-        else:
-            self.window_arg = "-fullscreen"
-
-        self.fullscreen_state = False
-        self.attributes(self.window_arg, self.fullscreen_state)
-
-        self.bind("<F11>", self.toggle_fullscreen)
-        self.bind("<Escape>", self.exit_fullscreen)
-
-        self.board = Board(self)
-        self.mainloop()
-
-    def toggle_fullscreen(self, _):
-        """Gives user ability to toggle fullscreen"""
-
-        self.fullscreen_state = not self.fullscreen_state
-        self.attributes(self.window_arg, self.fullscreen_state)
-
-    def exit_fullscreen(self, _):
-        """Allows user to escape fullscreen with escape key"""
-
-        self.attributes(self.window_arg, False)
+from utils.book import OpeningBook
+from utils.position import Position
+from utils.tablebase import open_tablebases
+from utils.uci import UciEngine
+
+
+def main():
+    """Opens the game window, or speaks UCI on stdin and stdout"""
+
+    parser = argparse.ArgumentParser(description="Play chess in a window, "
+        "or drive the engine over the Universal Chess Interface")
+    parser.add_argument("--uci", action="store_true",
+        help="speak UCI on stdin/stdout instead of opening a window")
+    parser.add_argument("-f", "--fen",
+        help="position to start from (default: start position)")
+    parser.add_argument("-b", "--book",
+        help="opening book to play and show book moves from")
+    parser.add_argument("--tablebases",
+        help="directory of endgame tables for the UCI engine to probe")
+    args = parser.parse_args()
+    try:
+        book = OpeningBook(args.book) if args.book else None
+        tablebases = open_tablebases(args.tablebases) \
+            if args.tablebases else None
+        if args.fen:
+            Position().set_fen(args.fen)
+    except (OSError, ValueError) as error:
+        print(f"[ERROR] {error}", file=sys.stderr)
+        return 2
+    if args.uci:
+        return UciEngine(book=book, tablebases=tablebases).run()
+    # the window is imported only here, so UCI runs without tkinter
+    from utils.window import App  # pylint: disable=import-outside-toplevel
+    App(args.fen, book)
+    return 0
 
 
 if __name__ == "__main__":
-    App()
+    sys.exit(main())
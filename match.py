@@ -0,0 +1,82 @@
+"""Module to play two engine settings against each other with an SPRT"""
+import argparse
+import sys
+
+from utils.match import (DEFAULT_ENGINE, MAX_PLIES, OPENINGS, SPRT,
+    load_openings, parse_engine, run_match)
+from utils.report import write_report
+
+
+def parse_args():
+    """Parses command line arguments"""
+
+    default = ",".join(f"{name}={value}"
+        for (name, value) in DEFAULT_ENGINE.items())
+    parser = argparse.ArgumentParser(description="Play one engine setting "
+        "against another from an opening set and report the Elo "
+        "difference, stopping early once the SPRT is decided")
+    parser.add_argument("-a", "--engine-a", default=default,
+        help=f"limits of the tested engine (default: {default})")
+    parser.add_argument("-b", "--engine-b", default=default,
+        help=f"limits of the baseline engine (default: {default})")
+    parser.add_argument("-g", "--games", type=int, default=200,
+        help="maximum games, played in color swapped pairs (default: 200)")
+    parser.add_argument("-w", "--workers", type=int, default=0,
+        help="game processes, 0 for one per core (default: 0)")
+    parser.add_argument("--openings", help="file of FENs or coordinate "
+        f"move lines (default: {len(OPENINGS)} built in lines)")
+    parser.add_argument("--elo0", type=float, default=0.0,
+        help="Elo difference of H0 (default: 0)")
+    parser.add_argument("--elo1", type=float, default=10.0,
+        help="Elo difference of H1 (default: 10)")
+    parser.add_argument("--alpha", type=float, default=0.05,
+        help="false positive rate (default: 0.05)")
+    parser.add_argument("--beta", type=float, default=0.05,
+        help="false negative rate (default: 0.05)")
+    parser.add_argument("--max-plies", type=int, default=MAX_PLIES,
+        help=f"adjudicate longer games as draws (default: {MAX_PLIES})")
+    parser.add_argument("-o", "--output",
+        help="write JSON results to file, or - for stdout")
+    return parser.parse_args()
+
+
+def report_game(record, sprt):
+    """Prints a progress line for a finished game"""
+
+    (elo, margin) = sprt.elo()
+    print(f"game {record['index'] + 1:>4}  {record['score']:>3}  "
+        f"{record['reason']:<21} {record['plies']:>3} plies  "
+        f"W{sprt.wins} D{sprt.draws} L{sprt.losses}  "
+        f"elo {elo:+.1f} +/- {margin:.1f}  llr {sprt.llr():+.3f}", flush=True)
+
+
+def main():
+    """Runs the match and prints the result"""
+
+    args = parse_args()
+    try:
+        engines = (parse_engine(args.engine_a), parse_engine(args.engine_b))
+        openings = load_openings(args.openings) if args.openings else OPENINGS
+    except (OSError, ValueError) as error:
+        print(f"[ERROR] {error}", file=sys.stderr)
+        return 2
+
+    sprt = SPRT(args.elo0, args.elo1, args.alpha, args.beta)
+    try:
+        report = run_match(engines, args.games, args.workers or None,
+            openings, sprt, args.max_plies,
+            None if args.output == "-" else report_game)
+    except ValueError as error:
+        print(f"[ERROR] {error}", file=sys.stderr)
+        return 2
+    if args.output != "-":
+        print(f"{report['games']} games on {report['workers']} workers in "
+            f"{report['seconds']:.1f}s: elo {report['elo']:+.1f} +/- "
+            f"{report['elo_margin']:.1f}, "
+            f"SPRT {report['result'] or 'undecided'}")
+    write_report(report, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""Module to count perft nodes of standard positions and time them"""
+import argparse
+import platform
+import sys
+
+from utils.perft import PERFT_POSITIONS, run_perft
+from utils.position import MOVEGEN_BACKENDS
+from utils.report import write_report
+
+
+def parse_args():
+    """Parses command line arguments"""
+
+    parser = argparse.ArgumentParser(description="Count legal move tree "
+        "nodes for the standard perft positions and report nodes per second")
+    parser.add_argument("-d", "--depth", type=int, default=3,
+        help="search depth (default: 3)")
+    parser.add_argument("-p", "--position", action="append",
+        choices=sorted(PERFT_POSITIONS),
+        help="position from the suite, repeatable (default: all)")
+    parser.add_argument("-f", "--fen", help="run a custom FEN instead")
+    parser.add_argument("-b", "--backend", default="bitboard",
+        choices=sorted(MOVEGEN_BACKENDS), help="move generation backend")
+    parser.add_argument("--divide", action="store_true",
+        help="report node counts below each root move")
+    parser.add_argument("-o", "--output",
+        help="write JSON results to file, or - for stdout")
+    return parser.parse_args()
+
+
+def main():
+    """Runs the requested perft jobs"""
+
+    args = parse_args()
+    if args.depth < 1:
+        print("[ERROR] --depth must be at least 1", file=sys.stderr)
+        return 2
+    if args.fen:
+        jobs = [("custom", args.fen)]
+    else:
+        names = args.position or list(PERFT_POSITIONS)
+        jobs = [(name, PERFT_POSITIONS[name][0]) for name in names]
+
+    results = []
+    for (name, fen) in jobs:
+        try:
+            result = run_perft(name, fen, args.depth, args.backend,
+                args.divide)
+        except ValueError as error:
+            print(f"[ERROR] {error}", file=sys.stderr)
+            return 2
+        results.append(result)
+        if args.output == "-":
+            continue
+        if args.divide:
+            for (move, nodes) in sorted(result["divide"].items()):
+                print(f"{move}: {nodes}")
+        status = "ok"
+        if not result["passed"]:
+            status = f"FAIL (expected {result['expected']})"
+        print(f"{name:<10} depth {args.depth}  {result['nodes']:>10} nodes  "
+            f"{result['seconds']:>8.3f}s  {result['nps']:>8} nps  {status}")
+
+    report = {
+        "python": platform.python_version(),
+        "backend": args.backend,
+        "depth": args.depth,
+        "results": results,
+    }
+    write_report(report, args.output)
+
+    return 0 if all(result["passed"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
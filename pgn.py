@@ -0,0 +1,68 @@
+"""Module to validate PGN archives by replaying every move in parallel"""
+import argparse
+import json
+import sys
+
+from utils.pgn import BATCH_SIZE, ReplayStats, replay_pgn
+from utils.report import write_report
+
+
+def parse_args():
+    """Parses command line arguments"""
+
+    parser = argparse.ArgumentParser(description="Stream games from a PGN "
+        "file, replay every SAN move against the legal move generator and "
+        "write one JSON line per game")
+    parser.add_argument("pgn", help="PGN file to replay")
+    parser.add_argument("-w", "--workers", type=int, default=0,
+        help="replay processes, 0 for one per core (default: 0)")
+    parser.add_argument("-b", "--batch", type=int, default=BATCH_SIZE,
+        help=f"games sent to a process at a time (default: {BATCH_SIZE})")
+    parser.add_argument("-o", "--output", default="-",
+        help="write game records to file, or - for stdout (default: -)")
+    parser.add_argument("-r", "--report",
+        help="write the JSON throughput report to file, or - for stdout")
+    parser.add_argument("-q", "--errors-only", action="store_true",
+        help="only write records of games that failed to replay")
+    return parser.parse_args()
+
+
+def write_records(records, handle, errors_only):
+    """Writes game records as JSON lines"""
+
+    for record in records:
+        if errors_only and record["status"] != "error":
+            continue
+        handle.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+def main():
+    """Replays the archive and prints the throughput report"""
+
+    args = parse_args()
+    if args.batch < 1:
+        print("[ERROR] --batch must be at least 1", file=sys.stderr)
+        return 2
+    stats = ReplayStats(args.workers)
+    records = replay_pgn(args.pgn, args.workers or None, args.batch, stats)
+    try:
+        if args.output == "-":
+            write_records(records, sys.stdout, args.errors_only)
+        else:
+            with open(args.output, "w", encoding="utf-8") as handle:
+                write_records(records, handle, args.errors_only)
+    except OSError as error:
+        print(f"[ERROR] {error}", file=sys.stderr)
+        return 2
+
+    report = stats.as_dict()
+    print(f"{report['games']} games  {report['errors']} errors  "
+        f"{report['plies']} plies  {report['seconds']:.3f}s  "
+        f"{report['games_per_second']} games/s  "
+        f"{report['megabytes_per_second']} MB/s", file=sys.stderr)
+    write_report(report, args.report)
+    return 0 if not report["errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Module to host headless games over a JSON lines socket protocol"""
+import argparse
+import asyncio
+import sys
+
+from utils.position import MOVEGEN_BACKENDS
+from utils.report import write_report
+from utils.server import GameServer, run_load
+
+
+def parse_args():
+    """Parses command line arguments"""
+
+    parser = argparse.ArgumentParser(description="Host headless games over "
+        "TCP or a unix socket, or load test a running server")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for (name, text) in (("serve", "host games until interrupted"),
+            ("load", "play random games against a running server")):
+        command = commands.add_parser(name, help=text)
+        command.add_argument("--host", default="127.0.0.1",
+            help="TCP host (default: 127.0.0.1)")
+        command.add_argument("-p", "--port", type=int, default=8765,
+            help="TCP port (default: 8765)")
+        command.add_argument("-u", "--unix", help="unix socket path, "
+            "used instead of TCP")
+
+    serve = commands.choices["serve"]
+    serve.add_argument("-b", "--backend", default="mailbox",
+        choices=sorted(MOVEGEN_BACKENDS), help="move generation backend")
+    serve.add_argument("-w", "--workers", type=int,
+        help="threads playing moves (default: Python's choice)")
+
+    load = commands.choices["load"]
+    load.add_argument("-g", "--games", type=int, default=1000,
+        help="games to play (default: 1000)")
+    load.add_argument("--plies", type=int, default=40,
+        help="moves per game (default: 40)")
+    load.add_argument("-c", "--connections", type=int, default=50,
+        help="concurrent connections (default: 50)")
+    load.add_argument("-s", "--seed", type=int, default=1,
+        help="random seed (default: 1)")
+    return parser.parse_args()
+
+
+async def serve(args):
+    """Runs the server until cancelled"""
+
+    game_server = GameServer(args.backend, args.workers)
+    server = await game_server.serve(args.host, args.port, args.unix)
+    where = args.unix or f"{args.host}:{args.port}"
+    print(f"Serving games on {where}", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        game_server.close()
+
+
+def main():
+    """Serves games or runs the load generator"""
+
+    args = parse_args()
+    try:
+        if args.command == "serve":
+            asyncio.run(serve(args))
+        else:
+            report = asyncio.run(run_load(args.games, args.plies,
+                args.connections, args.seed, args.host, args.port,
+                args.unix))
+            write_report(report, "-")
+    except KeyboardInterrupt:
+        pass
+    except (OSError, RuntimeError) as error:
+        print(f"[ERROR] {error}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
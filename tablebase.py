@@ -0,0 +1,109 @@
+"""Module to solve endgame tablebases and probe positions in them"""
+import argparse
+import sys
+
+from utils.core import move_name
+from utils.position import Position
+from utils.report import write_report
+from utils.search import MATE
+from utils.tablebase import (DEFAULT_DIRECTORY, TABLE_SETS, Tablebases,
+    build_tablebases, describe)
+
+
+def parse_args():
+    """Parses command line arguments"""
+
+    parser = argparse.ArgumentParser(description="Solve small endgames by "
+        "retrograde analysis, or look a position up in the solved tables")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="solve material signatures "
+        "and everything they convert into")
+    build.add_argument("-s", "--signature", action="append",
+        help="material such as KBNvK, repeatable (default: --pieces set)")
+    build.add_argument("-p", "--pieces", type=int, choices=sorted(TABLE_SETS),
+        default=3, help="build the standard tables of up to this many "
+        "pieces (default: 3)")
+    build.add_argument("-w", "--workers", type=int, default=0,
+        help="tables solved at once, 0 for one per core (default: 0)")
+    build.add_argument("--force", action="store_true",
+        help="rebuild tables that already exist")
+
+    probe = commands.add_parser("probe", help="print the result, distance "
+        "to mate and best line of a position")
+    probe.add_argument("fen", help="position to look up")
+    for command in (build, probe):
+        command.add_argument("-d", "--directory", default=DEFAULT_DIRECTORY,
+            help=f"table directory (default: {DEFAULT_DIRECTORY})")
+    parser.add_argument("-o", "--output",
+        help="write JSON results to file, or - for stdout")
+    return parser.parse_args()
+
+
+def print_table(report):
+    """Prints the figures of one solved table"""
+
+    print(f"{report['table']:<7} {report['positions']:>9} positions  "
+        f"W{report['wins']} L{report['losses']} D{report['draws']}  "
+        f"longest mate {report['longest_mate']:>2}  "
+        f"{report['bytes']:>9} bytes  {report['seconds']:>9.3f}s", flush=True)
+
+
+def run_build(args):
+    """Builds the requested tables and returns the build report"""
+
+    signatures = args.signature or [signature
+        for pieces in sorted(TABLE_SETS) if pieces <= args.pieces
+        for signature in TABLE_SETS[pieces]]
+    report = build_tablebases(signatures, args.directory,
+        args.workers or None, args.force,
+        print_table if args.output != "-" else None)
+    if args.output != "-":
+        if report["skipped"]:
+            print(f"already built: {', '.join(report['skipped'])}")
+        print(f"{len(report['tables'])} tables  {report['bytes']} bytes  "
+            f"{report['seconds']:.3f}s  {report['workers']} workers")
+    return report
+
+
+def run_probe(args):
+    """Looks a position up and returns its result and best line"""
+
+    position = Position("bitboard")
+    position.set_fen(args.fen)
+    tablebases = Tablebases(args.directory)
+    report = dict({"fen": args.fen}, **describe(tablebases.probe(position)))
+    report["line"] = [move_name(move)
+        for move in tablebases.line(position, MATE)]
+    tablebases.close()
+    if args.output != "-":
+        if report["result"] is None:
+            print("not in the tables")
+        else:
+            mate = f" mate {report['mate']}" if report["mate"] else ""
+            print(f"{report['result']}{mate}  {' '.join(report['line'])}")
+    return report
+
+
+COMMANDS = {
+    "build": run_build,
+    "probe": run_probe,
+}
+
+
+def main():
+    """Runs the requested tablebase command"""
+
+    args = parse_args()
+    try:
+        report = dict({"command": args.command},
+            **COMMANDS[args.command](args))
+    except (OSError, ValueError) as error:
+        print(f"[ERROR] {error}", file=sys.stderr)
+        return 2
+    write_report(report, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Package contains regression tests for the headless engine modules"""
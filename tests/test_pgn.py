@@ -0,0 +1,131 @@
+"""Module contains game splitting and SAN decoding tests for PGN reading"""
+import io
+import unittest
+
+from utils.core import SQUARE_NAMES, move_name
+from utils.pgn import decode_san, parse_game, split_games
+from utils.position import Position
+
+
+def games_of(text):
+    """Returns the raw text of every game split from a PGN string"""
+
+    source = io.BytesIO(text.encode())
+    return [raw.decode() for (_, raw) in split_games(source)]
+
+
+class SplitGamesTest(unittest.TestCase):
+    """Checks where one game ends and the next begins"""
+
+    def test_tagged_games(self):
+        """Games split at the tag section after each movetext"""
+
+        games = games_of('[Event "a"]\n[Result "1-0"]\n\n1. e4 e5 1-0\n\n'
+            '[Event "b"]\n\n1. d4 d5\n2. c4\n\n[Event "c"]\n\n1. c4 *\n')
+        self.assertEqual(len(games), 3)
+        self.assertEqual(parse_game(games[1])[1], ["d4", "d5", "c4"])
+
+    def test_games_without_tags(self):
+        """A line ending in a result ends a game without tags"""
+
+        games = games_of("1. e4 e5 1-0\n1. d4 d5 0-1\n1. c4 1/2-1/2\n")
+        self.assertEqual([parse_game(game)[2] for game in games],
+            ["1-0", "0-1", "1/2-1/2"])
+
+    def test_offsets(self):
+        """Each game comes with the byte offset it starts at"""
+
+        text = b'[Event "a"]\n\n1. e4 *\n\n[Event "b"]\n\n1. d4 *\n'
+        offsets = [offset for (offset, _) in split_games(io.BytesIO(text))]
+        self.assertEqual(offsets, [0, text.index(b'[Event "b"]')])
+
+    def test_brace_comments_across_lines(self):
+        """Tag or result lines inside a brace comment stay in the game"""
+
+        games = games_of('[Event "a"]\n\n1. e4 { a comment\n'
+            '[which looks like a tag]\nand ends like a game 1-0\n'
+            '} e5 ; not a {\n2. Nf3 *\n\n[Event "b"]\n\n1. d4 *\n')
+        self.assertEqual(len(games), 2)
+        self.assertEqual(parse_game(games[0])[1:], (["e4", "e5", "Nf3"],
+            "*"))
+
+
+class DecodeSanTest(unittest.TestCase):
+    """Checks SAN against the legal moves of a position"""
+
+    def decode(self, fen, san):
+        """Returns the coordinate name of a SAN move in a position"""
+
+        position = Position("bitboard")
+        position.set_fen(fen)
+        return move_name(decode_san(position, san))
+
+    def assertRejected(self, fen, san, message):
+        """Asserts that a SAN move raises ValueError naming why"""
+
+        with self.assertRaisesRegex(ValueError, message):
+            self.decode(fen, san)
+
+    def test_disambiguation(self):
+        """Files and ranks pick one of several pieces"""
+
+        knights = "4k3/8/8/8/8/8/8/1N2KN2 w - - 0 1"
+        self.assertEqual(self.decode(knights, "Nbd2"), "b1d2")
+        self.assertEqual(self.decode(knights, "Nfd2"), "f1d2")
+        self.assertRejected(knights, "Nd2", "Ambiguous")
+        rooks = "4k3/8/8/R7/8/8/8/R3K3 w - - 0 1"
+        self.assertEqual(self.decode(rooks, "R1a3"), "a1a3")
+        self.assertEqual(self.decode(rooks, "R5xa3"), "a5a3")
+        self.assertRejected(rooks, "Ra3", "Ambiguous")
+
+    def test_pinned_piece_needs_no_disambiguation(self):
+        """A piece that may not move does not make SAN ambiguous"""
+
+        fen = "4r2k/8/8/8/8/8/4N3/1N2K3 w - - 0 1"
+        self.assertEqual(self.decode(fen, "Nc3"), "b1c3")
+
+    def test_en_passant(self):
+        """A pawn captures onto the en passant square"""
+
+        fen = "4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1"
+        position = Position("bitboard")
+        position.set_fen(fen)
+        position.make_move(decode_san(position, "exd6"))
+        self.assertFalse(position.board[SQUARE_NAMES.index("d5")])
+        self.assertRejected("4k3/8/8/3pP3/8/8/8/4K3 w - - 0 1", "exd6",
+            "Illegal")
+
+    def test_promotion(self):
+        """Pawns on the last rank must promote, and only there"""
+
+        fen = "1n2k3/P7/8/8/8/8/4P3/4K3 w - - 0 1"
+        self.assertEqual(self.decode(fen, "a8=Q"), "a7a8q")
+        self.assertEqual(self.decode(fen, "a8N+"), "a7a8n")
+        self.assertEqual(self.decode(fen, "axb8=R"), "a7b8r")
+        self.assertRejected(fen, "a8", "Illegal")
+        self.assertRejected(fen, "e3=Q", "Illegal")
+
+    def test_castling(self):
+        """Both castling notations pick the king move"""
+
+        fen = "r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1"
+        self.assertEqual(self.decode(fen, "O-O"), "e1g1")
+        self.assertEqual(self.decode(fen, "0-0-0+"), "e1c1")
+        self.assertRejected("r3k2r/8/8/8/8/8/8/R3K2R w - - 0 1", "O-O",
+            "Illegal")
+
+    def test_illegal_and_malformed(self):
+        """Moves no piece can make and text that is not SAN are refused"""
+
+        fen = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+        self.assertEqual(self.decode(fen, "Nf3"), "g1f3")
+        for san in ("e5", "Ke2", "Bc4", "exd3"):
+            with self.subTest(san=san):
+                self.assertRejected(fen, san, "Illegal")
+        for san in ("Zz9", "e9", ""):
+            with self.subTest(san=san):
+                self.assertRejected(fen, san, "Bad SAN")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""Module contains perft and FEN validation tests for positions"""
+import unittest
+
+from utils.core import move_name
+from utils.perft import PERFT_POSITIONS, perft
+from utils.position import Position
+
+BACKENDS = ("bitboard", "mailbox")
+PERFT_DEPTH = 3
+
+
+class PerftTest(unittest.TestCase):
+    """Counts the standard perft positions with both move generators"""
+
+    def test_standard_positions(self):
+        """Node counts match the published totals"""
+
+        for backend in BACKENDS:
+            for (name, (fen, expected)) in PERFT_POSITIONS.items():
+                with self.subTest(backend=backend, position=name):
+                    position = Position(backend)
+                    position.set_fen(fen)
+                    self.assertEqual(perft(position, PERFT_DEPTH),
+                        expected[PERFT_DEPTH - 1])
+
+
+class FenTest(unittest.TestCase):
+    """Checks that set_fen only accepts states the generators can play"""
+
+    def test_castling_rights_need_king_and_rook(self):
+        """Rights without the king and rook at home are dropped"""
+
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                position = Position(backend)
+                position.set_fen("4k3/8/8/8/8/8/8/4K3 w KQ - 0 1")
+                self.assertEqual(position.castling, 0)
+                self.assertNotIn("e1g1",
+                    map(move_name, position.generate_moves()))
+                for move in position.generate_moves():
+                    position.make_move(move)
+                    self.assertEqual(position.bitboards[0], 0)
+                    position.unmake_move()
+
+                position.set_fen("r3k3/8/8/8/8/8/8/4K2R w KQkq - 0 1")
+                self.assertEqual(position.fen().split()[2], "Kq")
+
+    def test_castling_rights_kept_at_home(self):
+        """Rights with the king and rook at home survive a round trip"""
+
+        fen = "r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1"
+        position = Position("bitboard")
+        position.set_fen(fen)
+        self.assertEqual(position.fen(), fen)
+        self.assertEqual(perft(position, 1), 26)
+
+    def test_pawns_on_back_ranks_are_rejected(self):
+        """Pawns on the first or last rank raise ValueError"""
+
+        for fen in ("P3k3/8/8/8/8/8/8/4K3 w - - 0 1",
+                "4k3/8/8/8/8/8/8/p3K3 b - - 0 1"):
+            for backend in BACKENDS:
+                with self.subTest(fen=fen, backend=backend):
+                    with self.assertRaises(ValueError):
+                        Position(backend).set_fen(fen)
+
+    def test_en_passant_needs_a_double_push(self):
+        """En passant squares must lie behind a pawn that just advanced"""
+
+        for fen in ("4k3/8/8/8/8/8/4P3/4K3 w - e3 0 1",
+                "3k4/8/8/3P4/8/8/8/4K3 w - e6 0 1",
+                "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e3 0 1",
+                "rnbqkbnr/ppp1pppp/3p4/3p4/8/8/PPPPPPPP/RNBQKBNR w KQkq d6 "
+                "0 3"):
+            for backend in BACKENDS:
+                with self.subTest(fen=fen, backend=backend):
+                    with self.assertRaises(ValueError):
+                        Position(backend).set_fen(fen)
+
+    def test_en_passant_round_trip(self):
+        """En passant squares written by fen are read back"""
+
+        for fen in (
+                "rnbqkbnr/pppp1ppp/8/4p3/8/8/PPPPPPPP/RNBQKBNR w KQkq e6 0 2",
+                "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"):
+            position = Position("bitboard")
+            position.set_fen(fen)
+            self.assertEqual(position.fen(), fen)
+
+    def test_side_not_to_move_in_check_is_rejected(self):
+        """A king that could be taken at once raises ValueError"""
+
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                with self.assertRaises(ValueError):
+                    Position(backend).set_fen(
+                        "4k3/8/8/8/8/8/4R3/4K3 w - - 0 1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+"""Module contains protocol error tests for the JSON lines game server"""
+import asyncio
+import json
+import unittest
+
+from utils.server import STREAM_LIMIT, GameServer
+
+
+class HandleLineTest(unittest.TestCase):
+    """Checks that bad requests come back as errors"""
+
+    def setUp(self):
+        self.server = GameServer()
+
+    def tearDown(self):
+        self.server.close()
+
+    def request(self, line):
+        """Returns the server's response to one raw request line"""
+
+        return asyncio.run(self.server.handle_line(line))
+
+    def test_bad_requests(self):
+        """Malformed lines and unknown ops return ok false"""
+
+        for line in (b"{", b"\xff\xfe\n", b"[1, 2]", b'{"op": "fly"}',
+                b'{"op": ["new"]}', b'{"op": {"new": 1}}',
+                b'{"op": "state", "game": 99}',
+                b'{"op": "new", "fen": "8/8/8/8/8/8/8/8 w - - 0 1"}'):
+            with self.subTest(line=line):
+                response = self.request(line)
+                self.assertFalse(response["ok"])
+                self.assertIn("error", response)
+
+    def test_illegal_move(self):
+        """An illegal move is refused and leaves the game unchanged"""
+
+        game = self.request(b'{"op": "new"}')["game"]
+        response = self.request(json.dumps({"op": "move", "game": game,
+            "move": "e2e5", "id": 7}).encode())
+        self.assertEqual((response["ok"], response["id"]), (False, 7))
+        state = self.request(json.dumps({"op": "state",
+            "game": game}).encode())
+        self.assertEqual(state["ply"], 0)
+
+
+class ConnectionTest(unittest.TestCase):
+    """Checks that errors never drop the connection"""
+
+    @staticmethod
+    def exchange(lines):
+        """Returns the responses of a fresh server to lines sent in turn"""
+
+        async def session():
+            server = GameServer()
+            listener = await server.serve(port=0)
+            port = listener.sockets[0].getsockname()[1]
+            (reader, writer) = await asyncio.open_connection("127.0.0.1",
+                port)
+            responses = []
+            for line in lines:
+                writer.write(line)
+                await writer.drain()
+                responses.append(json.loads(await reader.readline()))
+            writer.close()
+            await writer.wait_closed()
+            listener.close()
+            await listener.wait_closed()
+            server.close()
+            return responses
+
+        return asyncio.run(session())
+
+    def test_connection_survives_bad_lines(self):
+        """Requests after undecodable lines are still answered"""
+
+        responses = self.exchange((b"\xff\xfe\n", b"not json\n",
+            b'{"op": "new"}\n',
+            b'{"op": "move", "game": 1, "move": "e2e4"}\n'))
+        self.assertEqual([response["ok"] for response in responses],
+            [False, False, True, True])
+        self.assertEqual(responses[3]["move"], "e2e4")
+
+    def test_connection_survives_long_lines(self):
+        """A line over the stream limit gets one error, not a disconnect"""
+
+        for size in (STREAM_LIMIT, STREAM_LIMIT * 3):
+            with self.subTest(size=size):
+                line = b'{"op": "' + b"x" * size + b'"}\n'
+                responses = self.exchange((line, b'{"op": "new"}\n'))
+                self.assertEqual([response["ok"] for response in responses],
+                    [False, True])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+"""Module contains correctness tests for the retrograde tablebases"""
+import os
+import tempfile
+import unittest
+
+from utils.position import Position
+from utils.tablebase import (DRAW, ILLEGAL, TABLE_SETS, Tablebases,
+    attacked, build_tablebases, describe, generate_children, is_valid)
+
+SAMPLE_STRIDE = 7  # every seventh index is checked against its children
+SLOW = os.environ.get("SLOW_TESTS")  # 4-piece tables take minutes to build
+# black's only quiet move loses, but taking the queen wins KRvK
+CAPTURE_WIN_FEN = "Qk2r3/8/8/8/3K4/8/8/8 b - - 0 1"
+
+
+def expected_value(tablebases, layout, squares, turn):
+    """Returns the table byte implied by the values of every child"""
+
+    values = [tablebases.value(pieces, child, turn ^ 1)
+        for (pieces, child) in generate_children(layout.pieces, squares,
+            turn)]
+    if not values:
+        king = squares[0 if turn == 0 else layout.black_king]
+        occupancy = sum(1 << square for square in squares)
+        return 1 if attacked(king, layout.pieces, squares, turn ^ 1,
+            occupancy) else DRAW
+    wins = [value for value in values if value % 2]  # the opponent loses
+    if wins:
+        return min(wins) + 1
+    if DRAW in values:
+        return DRAW
+    return max(values) + 1
+
+
+class TablebaseCase(unittest.TestCase):
+    """Builds tables once into a temporary directory"""
+
+    signatures = TABLE_SETS[3]
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.report = build_tablebases(cls.signatures, cls.directory.name,
+            workers=1)
+        cls.tablebases = Tablebases(cls.directory.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tablebases.close()
+        cls.directory.cleanup()
+
+    def probe(self, fen):
+        """Returns the result and moves to mate of a position"""
+
+        position = Position("bitboard")
+        position.set_fen(fen)
+        return describe(self.tablebases.probe(position))
+
+    def check_consistent(self, signature, stride):
+        """Every sampled position agrees with the best of its moves"""
+
+        (layout, data) = self.tablebases.table(signature)
+        for turn in (0, 1):
+            for index in range(0, layout.size, stride):
+                stored = data[turn * layout.size + index]
+                squares = layout.decode(index)
+                if not is_valid(layout, squares, turn) or \
+                        layout.index(squares) != index:
+                    self.assertEqual(stored, ILLEGAL)
+                    continue
+                self.assertEqual(stored, expected_value(self.tablebases,
+                    layout, squares, turn), (signature, turn, squares))
+
+
+class ThreePieceTest(TablebaseCase):
+    """Checks the 3-piece tables against known results"""
+
+    def test_longest_mates(self):
+        """Longest mates are the published 10, 16 and 28 moves"""
+
+        longest = {table["table"]: table["longest_mate"]
+            for table in self.report["tables"]}
+        self.assertEqual(longest, {"KQvK": 10, "KRvK": 16, "KPvK": 28})
+
+    def test_known_positions(self):
+        """Mates, stalemates and pawn endings probe as expected"""
+
+        for (fen, expected) in (
+                ("k7/1Q6/1K6/8/8/8/8/8 b - - 0 1", ("loss", 0)),
+                ("k7/2Q5/1K6/8/8/8/8/8 b - - 0 1", ("draw", None)),
+                ("k7/8/1K6/8/8/8/8/6Q1 w - - 0 1", ("win", 1)),
+                ("8/8/8/8/8/1K6/8/k6R b - - 0 1", ("loss", 0)),
+                ("4k3/8/8/8/8/8/4P3/4K3 b - - 0 1", ("draw", None)),
+                ("4k3/8/8/8/8/8/4P3/4K3 w - - 0 1", ("win", 22))):
+            with self.subTest(fen=fen):
+                result = self.probe(fen)
+                self.assertEqual((result["result"], result["mate"]),
+                    expected)
+
+    def test_colors_flipped(self):
+        """A position and its color mirror probe the same"""
+
+        self.assertEqual(self.probe("8/8/8/3k4/8/8/8/R3K3 w - - 0 1"),
+            self.probe("r3k3/8/8/8/3K4/8/8/8 b - - 0 1"))
+
+    def test_promotion_wins_into_another_table(self):
+        """Promoting scores from the KQvK table"""
+
+        result = self.probe("8/4P3/8/8/8/8/k7/4K3 w - - 0 1")
+        self.assertEqual(result["result"], "win")
+
+    def test_consistent(self):
+        """Stored values agree with the values of every move"""
+
+        for signature in self.signatures:
+            with self.subTest(signature=signature):
+                self.check_consistent(signature, SAMPLE_STRIDE)
+
+
+@unittest.skipUnless(SLOW, "set SLOW_TESTS=1 to build a 4-piece table")
+class FourPieceTest(TablebaseCase):
+    """Checks a table where both sides have material"""
+
+    signatures = ("KQvKR",)
+
+    def test_longest_mate(self):
+        """KQvKR is won in at most the published 35 moves"""
+
+        longest = {table["table"]: table["longest_mate"]
+            for table in self.report["tables"]}
+        self.assertEqual(longest["KQvKR"], 35)
+
+    def test_capture_wins_into_another_table(self):
+        """Taking the queen wins even when every other move loses"""
+
+        result = self.probe(CAPTURE_WIN_FEN)
+        self.assertEqual((result["result"], result["mate"]), ("win", 15))
+
+    def test_consistent(self):
+        """Stored values agree with the values of every move"""
+
+        self.check_consistent("KQvKR", 97)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+"""Module contains move parsing tests for the UCI front end"""
+import unittest
+
+from utils.core import move_name
+from utils.position import Position
+from utils.uci import UciEngine
+
+PROMOTION_FEN = "4k3/P7/8/8/8/8/4P3/4K3 w - - 0 1"
+
+
+class ParseMoveTest(unittest.TestCase):
+    """Checks that only legal UCI move names are accepted"""
+
+    def setUp(self):
+        self.position = Position("bitboard")
+        self.position.set_fen(PROMOTION_FEN)
+
+    def parse(self, name):
+        """Returns the coordinate name of a parsed move, or None"""
+
+        move = UciEngine.parse_move(self.position, name)
+        return None if move is None else move_name(move)
+
+    def test_promotions(self):
+        """Promotion letters pick the piece, and a bare move queens"""
+
+        for letter in "nbrq":
+            with self.subTest(letter=letter):
+                self.assertEqual(self.parse(f"a7a8{letter}"),
+                    f"a7a8{letter}")
+        self.assertEqual(self.parse("a7a8"), "a7a8q")
+
+    def test_bad_suffixes(self):
+        """Other letters, and letters on moves that do not promote, fail"""
+
+        self.assertEqual(self.parse("e2e4"), "e2e4")
+        for name in ("a7a8k", "a7a8p", "a7a8x", "a7a8 ", "a7a8Q", "e2e4q",
+                "e2e4n", "e2e4x", "e1d1q"):
+            with self.subTest(name=name):
+                self.assertIsNone(self.parse(name))
+
+
+if __name__ == "__main__":
+    unittest.main()
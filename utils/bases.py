@@ -1,33 +1,28 @@
 """Module contains square and piece logic"""
 import sys
-from utils.logger import LOGGER
-
-logger = LOGGER.get_logger('bases')
-logger.debug('Hello from bases')
+from functools import lru_cache
+from utils.core import COLORS, EMPTY, make_piece
+from utils.sprites import SPRITES
 
 
 class Square:
     """Contains logic and properties for square"""
 
-    length = 75
+    __slots__ = ("row", "col", "length", "is_selected", "is_possible",
+        "is_threat", "item")
+
     colors = ("#455a64", "#bdbdbd")  # dark blue/grey, light grey
     selectedColor = "#ffff00"  # Gold
     possibleColor = "#00e000"  # Green
     threatColor = "#c62828"  # Red
 
-
-    @classmethod
-    def update_length(cls, length):
-        """Updates square length based on input"""
-
-        cls.length = int(length)
-
-    def __init__(self, row, col):
+    def __init__(self, row, col, length=75):
         (self.row, self.col) = (row, col)
-        self.color = self.colors[(self.row + self.col) % 2]
+        self.length = length
         self.is_selected = False
         self.is_possible = False
         self.is_threat = False
+        self.item = None
 
     def __str__(self):
         return str(self.length)
@@ -38,6 +33,12 @@ class Square:
 
         return "ABCDEFGH"[self.col] + str(self.row + 1)
 
+    @property
+    def color(self):
+        """Base color of square"""
+
+        return self.colors[(self.row + self.col) & 1]
+
     @property
     def x_1(self):
         """Top left x coordinate for square"""
@@ -66,19 +67,35 @@ class Square:
     def coords(self):
         """Compiled all corners into coordinates"""
 
-        return (self.x_1, self.y_1, self.x_2, self.y_2)
+        length = self.length
+        x_1 = length * self.col
+        y_1 = length * self.row
+        return (x_1, y_1, x_1 + length, y_1 + length)
 
-    def draw(self, canvas):
-        """Draw square to canvas"""
+    @property
+    def fill(self):
+        """Fill color for current state of square"""
 
         if self.is_selected:
-            canvas.create_rectangle(*self.coords, fill=self.selectedColor)
-        elif self.is_possible:
-            canvas.create_rectangle(*self.coords, fill=self.possibleColor)
-        elif self.is_threat:
-            canvas.create_rectangle(*self.coords, fill=self.threatColor)
+            return self.selectedColor
+        if self.is_possible:
+            return self.possibleColor
+        if self.is_threat:
+            return self.threatColor
+        return self.color
+
+    def draw(self, canvas):
+        """Draw square to canvas, reusing its canvas item"""
+
+        if self.item is None:
+            self.item = canvas.create_rectangle(*self.coords, fill=self.fill)
         else:
-            canvas.create_rectangle(*self.coords, fill=self.color)
+            canvas.itemconfig(self.item, fill=self.fill)
+
+    def place(self, canvas):
+        """Move square canvas item to current coordinates"""
+
+        canvas.coords(self.item, *self.coords)
 
     def reset_state(self):
         """Reset state of square"""
@@ -89,17 +106,25 @@ class Square:
 
 
 class Piece:
-    """Contains logic and properties for piece"""
+    """Contains logic and properties for piece
+
+    Views only store their square and side as small integers; the glyph,
+    name and piece type are class attributes of each piece subclass.
+    """
+
+    __slots__ = ("row", "col", "side", "item")
 
     white = "white"
     black = "black"
+    tag = "piece"
+    kind = EMPTY
+    glyph = 0x20
+    name = None
 
-    def __init__(self, row, col, *args):
+    def __init__(self, row, col, side):
         (self.row, self.col) = (row, col)
-        (char, color, name) = args
-        self.char = chr(char)
-        self.color = color
-        self.name = name
+        self.side = side
+        self.item = None
 
     def __str__(self):
         return f"({self.name}, {self.position})"
@@ -110,31 +135,77 @@ class Piece:
 
         return "ABCDEFGH"[self.col] + str(self.row + 1)
 
-    def draw(self, canvas):
-        """Draw piece to canvas"""
+    @property
+    def char(self):
+        """Unicode chess glyph of piece"""
+
+        return chr(self.glyph)
+
+    @property
+    def color(self):
+        """Color name of piece side"""
+
+        return COLORS[self.side]
+
+    @property
+    def code(self):
+        """Piece code used by the position"""
+
+        return make_piece(self.side, self.kind)
+
+    def draw(self, canvas, length):
+        """Draw piece to canvas at square length, reusing its canvas item"""
+
+        x_pos = (length * self.col) + (length / 2)
+        y_pos = (length * self.row) + (length / 2)
+        sprite = SPRITES.get(self.char, self.color, length,
+            self.get_font_size(length))
+        if self.item is None:
+            if sprite is not None:
+                self.item = canvas.create_image(x_pos, y_pos, image=sprite,
+                    tags=self.tag)
+            else:
+                self.item = canvas.create_text(x_pos, y_pos, text=self.char,
+                    fill=self.color, font=self.get_font(length),
+                    tags=self.tag)
+            return
+        canvas.coords(self.item, x_pos, y_pos)
+        if sprite is not None:
+            canvas.itemconfig(self.item, image=sprite)
+        else:
+            canvas.itemconfig(self.item, text=self.char, fill=self.color,
+                font=self.get_font(length))
+
+    def erase(self, canvas):
+        """Remove piece canvas item"""
 
-        font_size = self.get_font_size()
-        x_pos = (Square.length * self.col) + (Square.length / 2)
-        y_pos = (Square.length * self.row) + (Square.length / 2)
-        canvas.create_text(x_pos, y_pos, text=self.char,
-            fill=self.color, font=("", font_size))
+        canvas.delete(self.item)
+        self.item = None
 
     @staticmethod
-    def get_font_size():
+    def get_font_size(length):
         """Cross platform compatability for font size"""
 
-        if sys.platform == "linux":
-            font_size = int(Square.length * 0.74667) # 74.667% of 75 is 56
-        else:
-            font_size = int(Square.length * 0.48) # 48% of 75 is 36
-        return font_size
+        return font_size(length)
 
     @staticmethod
-    def get_moves_in_play(moves):
-        """Return moves within the board"""
-
-        moves_in_play = []
-        for move in moves:
-            if move[0] in range(8) and move[1] in range(8):
-                moves_in_play.append(move)
-        return moves_in_play
+    def get_font(length):
+        """Font tuple for a square length"""
+
+        return piece_font(length)
+
+
+@lru_cache(maxsize=32)
+def font_size(length):
+    """Returns piece font size for a square length"""
+
+    if sys.platform == "linux":
+        return int(length * 0.74667) # 74.667% of 75 is 56
+    return int(length * 0.48) # 48% of 75 is 36
+
+
+@lru_cache(maxsize=32)
+def piece_font(length):
+    """Returns piece font tuple for a square length"""
+
+    return ("", font_size(length))
@@ -0,0 +1,329 @@
+"""Module contains startup and resource benchmarks for the game modules"""
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_MODULES = (
+    "utils.core",
+    "utils.position",
+    "utils.search",
+    "utils.parallel",
+    "utils.pieces",
+    "utils.board",
+)
+
+IMPORT_PROBE = """
+import sys, threading, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+import json, os
+print(json.dumps({{
+    "seconds": seconds,
+    "tkinter": "tkinter" in sys.modules,
+    "threads": threading.active_count() - 1,
+    "files": sorted(os.listdir(".")),
+}}))
+"""
+
+
+def probe_import(module):
+    """Imports module in a fresh interpreter inside an empty directory"""
+
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, PYTHONDONTWRITEBYTECODE="1")
+    with tempfile.TemporaryDirectory() as directory:
+        output = subprocess.run([sys.executable, "-c",
+            IMPORT_PROBE.format(module=module)], cwd=directory, env=env,
+            capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+def measure_imports(modules=IMPORT_MODULES, repeat=5):
+    """Returns best import time and side effects for every module
+
+    A module has side effects if importing it loads tkinter, starts a
+    thread or creates files in the working directory.
+    """
+
+    results = []
+    for module in modules:
+        probes = [probe_import(module) for _ in range(repeat)]
+        first = probes[0]
+        results.append({
+            "module": module,
+            "seconds": round(min(probe["seconds"] for probe in probes), 6),
+            "tkinter": first["tkinter"],
+            "threads": first["threads"],
+            "files": first["files"],
+            "clean": not (first["tkinter"] or first["threads"]
+                or first["files"]),
+        })
+    return results
+
+
+def random_position(rng, plies, backend="bitboard"):
+    """Plays up to plies random legal moves from the start position"""
+
+    # pylint: disable=import-outside-toplevel
+    from utils.position import Position
+
+    position = Position(backend)
+    for _ in range(plies):
+        moves = position.generate_moves()
+        if not moves:
+            break
+        position.make_move(rng.choice(moves))
+    position.history = []  # stored positions do not need undo state
+    return position
+
+
+def traced_bytes(build, count):
+    """Returns traced bytes per object kept alive from count builds"""
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = [build() for _ in range(count)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del kept
+    return (after - before) / count
+
+
+def pickle_copy(value):
+    """Returns a deep copy made through pickle, as worker processes do"""
+
+    import pickle  # pylint: disable=import-outside-toplevel
+
+    return pickle.loads(pickle.dumps(value))
+
+
+def measure_memory(count=10000, plies=40, seed=1):
+    """Returns memory used per position, square and piece view"""
+
+    # pylint: disable=import-outside-toplevel
+    from utils.bases import Square
+    from utils.core import WHITE, PAWN
+    from utils.pieces import PIECE_VIEWS
+
+    rng = random.Random(seed)
+    positions = iter([random_position(rng, plies) for _ in range(count)])
+    results = {
+        # copies are measured so move generation runs outside tracemalloc
+        "position": traced_bytes(lambda: pickle_copy(next(positions)),
+            count),
+        "square": traced_bytes(lambda: Square(3, 4), count),
+        "piece": traced_bytes(
+            lambda: PIECE_VIEWS[PAWN](3, 4, WHITE), count),
+    }
+    results["board_views"] = results["square"] * 64 + results["piece"] * 32
+    return {
+        "count": count,
+        "plies": plies,
+        "bytes": {name: round(value, 1) for (name, value) in results.items()},
+    }
+
+
+def random_reply(game, rng):
+    """Returns a random legal (from square, destination) pair of a game"""
+
+    from_square = rng.choice(sorted(game.move_map))
+    return (from_square, rng.choice(sorted(game.move_map[from_square])))
+
+
+def play_games(games, plies, seed):
+    """Plays random moves round robin over every game for up to plies"""
+
+    rngs = [random.Random(seed * 1000003 + index)
+        for index in range(len(games))]
+    played = 0
+    for _ in range(plies):
+        for (game, rng) in zip(games, rngs):
+            if game.over:
+                continue
+            game.play(*random_reply(game, rng))
+            played += 1
+    return played
+
+
+def check_game(game):
+    """Returns a list of problems found replaying a game on its own"""
+
+    # pylint: disable=import-outside-toplevel
+    from utils.position import Position
+    from utils.zobrist import compute_key
+
+    problems = []
+    replay = Position(game.position.backend)
+    for move in game.moves:
+        replay.make_move(move)
+    position = game.position
+    if position.board != replay.board or position.key != replay.key:
+        problems.append("position differs from replay")
+    if position.key != compute_key(position):
+        problems.append("incremental key is stale")
+    if game.turn != len(game.moves):
+        problems.append("turn counter does not match moves played")
+    if game.turn_color != ("white", "black")[position.turn]:
+        problems.append("turn color does not match side to move")
+    return problems
+
+
+class StubCanvas:
+    """Canvas stand-in that hands out item ids and ignores drawing"""
+
+    def __init__(self):
+        self.items = 0
+
+    def create_item(self, *_, **__):
+        """Returns a new item id"""
+
+        self.items += 1
+        return self.items
+
+    create_rectangle = create_text = create_image = create_item
+
+    def ignore(self, *_, **__):
+        """Accepts any drawing call"""
+
+    bind = pack = config = coords = itemconfig = scale = delete = ignore
+
+
+class StubMaster:
+    """Window stand-in with a fixed size and a queue of after callbacks"""
+
+    def __init__(self, size):
+        self.size = size
+        self.callbacks = {}
+        self.ids = 0
+
+    def winfo_width(self):
+        """Returns the window width"""
+
+        return self.size
+
+    winfo_height = winfo_width
+
+    def after(self, _, callback):
+        """Queues a callback and returns its id"""
+
+        self.ids += 1
+        self.callbacks[self.ids] = callback
+        return self.ids
+
+    def after_cancel(self, job):
+        """Drops a queued callback"""
+
+        self.callbacks.pop(job, None)
+
+    def run_callbacks(self):
+        """Runs every queued callback"""
+
+        while self.callbacks:
+            self.callbacks.pop(min(self.callbacks))()
+
+    def ignore(self, *_, **__):
+        """Accepts any window call"""
+
+    geometry = title = ignore
+
+
+def board_layout(board):
+    """Returns the size, square length and square coordinates of a board"""
+
+    return (board.board_size, board.length,
+        [square.coords for square in board.squares])
+
+
+def stress_boards(sizes=(200, 400, 600, 800), resize=320):
+    """Resizes one of several boards and checks the others keep their size
+
+    Boards are drawn on stub canvases, so no window is needed. Sprites are
+    switched off meanwhile, as images need a running Tk.
+    """
+
+    # pylint: disable=import-outside-toplevel
+    from utils.board import Board
+    from utils.sprites import SPRITES
+
+    enabled = SPRITES.enabled
+    SPRITES.enabled = False
+    try:
+        boards = [Board(StubMaster(size), size, canvas=StubCanvas())
+            for size in sizes]
+        before = [board_layout(board) for board in boards]
+        boards[0].master.size = resize
+        boards[0].on_resize(None)
+        boards[0].master.run_callbacks()
+    finally:
+        SPRITES.enabled = enabled
+
+    failures = {}
+    for (index, board) in enumerate(boards):
+        problems = []
+        (size, length, coords) = board_layout(board)
+        expected = (resize, resize // 8) if not index else before[index][:2]
+        if (size, length) != expected:
+            problems.append(f"size {size} and length {length}, expected "
+                f"{expected[0]} and {expected[1]}")
+        if any(square.length != length for square in board.squares):
+            problems.append("square length differs from board length")
+        if index and coords != before[index][2]:
+            problems.append("square coords changed by another board")
+        if problems:
+            failures[index] = problems
+    return failures
+
+
+def stress_games(count=2000, plies=60, seed=1, sample=50):
+    """Runs many interleaved games and checks no state leaks between them
+
+    Each game is replayed on a fresh position, and a sample of games is
+    played again one at a time, which must give exactly the same moves.
+    Boards of different sizes are also checked by stress_boards.
+    """
+
+    # pylint: disable=import-outside-toplevel
+    import time
+    from utils.game import Game
+
+    start = time.perf_counter()
+    games = [Game() for _ in range(count)]
+    played = play_games(games, plies, seed)
+    seconds = time.perf_counter() - start
+
+    failures = {}
+    for (index, game) in enumerate(games):
+        problems = check_game(game)
+        if problems:
+            failures[index] = problems
+    for index in range(min(sample, count)):
+        alone = Game()
+        rng = random.Random(seed * 1000003 + index)
+        for _ in range(plies):
+            if alone.over:
+                break
+            alone.play(*random_reply(alone, rng))
+        if alone.moves != games[index].moves:
+            failures.setdefault(index, []).append(
+                "moves differ from the game played alone")
+
+    return {
+        "games": count,
+        "plies": plies,
+        "played": played,
+        "finished": sum(1 for game in games if game.over),
+        "seconds": round(seconds, 6),
+        "plies_per_second": int(played / seconds) if seconds else 0,
+        "failures": {str(index): problems
+            for (index, problems) in failures.items()},
+        "board_failures": {str(index): problems
+            for (index, problems) in stress_boards().items()},
+    }
@@ -0,0 +1,393 @@
+"""Module contains bitboard move generation with precomputed attacks"""
+from utils.core import (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, NO_SQUARE,
+    PROMOTIONS, square_coords)
+from utils.tables import (ORTHOGONAL, DIAGONAL, KNIGHT_OFFSETS,
+    PAWN_CAPTURE_OFFSETS, PAWN_PUSH, PAWN_LAST_ROW, CASTLING_MOVES,
+    build_steps)
+
+FULL = (1 << 64) - 1
+BITS = tuple(1 << square for square in range(64))
+ROW_MASKS = tuple(0xff << (row * 8) for row in range(8))
+COL_MASKS = tuple(0x0101010101010101 << col for col in range(8))
+FILL = COL_MASKS[0]
+COL_COLLAPSE = 0x0102040810204080  # gathers a column into the top row
+
+
+def to_bitboard(squares):
+    """Returns bitboard with given squares set"""
+
+    bitboard = 0
+    for square in squares:
+        bitboard |= BITS[square]
+    return bitboard
+
+
+def iter_squares(bitboard):
+    """Yields square index of every set bit"""
+
+    while bitboard:
+        low = bitboard & -bitboard
+        yield low.bit_length() - 1
+        bitboard ^= low
+
+
+def _build_line_masks(directions):
+    """Precomputes line through each square, excluding the square"""
+
+    masks = []
+    for square in range(64):
+        (row, col) = square_coords(square)
+        mask = 0
+        for (d_row, d_col) in directions:
+            (r_pos, c_pos) = (row + d_row, col + d_col)
+            while 0 <= r_pos < 8 and 0 <= c_pos < 8:
+                mask |= BITS[r_pos * 8 + c_pos]
+                (r_pos, c_pos) = (r_pos + d_row, c_pos + d_col)
+        masks.append(mask)
+    return tuple(masks)
+
+
+def _build_between():
+    """Precomputes squares strictly between every aligned pair of squares"""
+
+    between = []
+    for square in range(64):
+        (row, col) = square_coords(square)
+        targets = [0] * 64
+        for (d_row, d_col) in ORTHOGONAL + DIAGONAL:
+            (r_pos, c_pos) = (row + d_row, col + d_col)
+            path = 0
+            while 0 <= r_pos < 8 and 0 <= c_pos < 8:
+                targets[r_pos * 8 + c_pos] = path
+                path |= BITS[r_pos * 8 + c_pos]
+                (r_pos, c_pos) = (r_pos + d_row, c_pos + d_col)
+        between.append(tuple(targets))
+    return tuple(between)
+
+
+def _build_row_attacks():
+    """Precomputes sliding attacks along a single row for every occupancy"""
+
+    table = []
+    for col in range(8):
+        col_table = []
+        for occupancy in range(256):
+            attacks = 0
+            for step in (1, -1):
+                target = col + step
+                while 0 <= target < 8:
+                    attacks |= 1 << target
+                    if occupancy & (1 << target):
+                        break
+                    target += step
+            col_table.append(attacks)
+        table.append(tuple(col_table))
+    return tuple(table)
+
+
+KNIGHT_ATTACKS = tuple(to_bitboard(targets)
+    for targets in build_steps(KNIGHT_OFFSETS))
+KING_ATTACKS = tuple(to_bitboard(targets)
+    for targets in build_steps(ORTHOGONAL + DIAGONAL))
+PAWN_ATTACKS = tuple(
+    tuple(to_bitboard(targets) for targets in build_steps(offsets))
+    for offsets in PAWN_CAPTURE_OFFSETS
+)
+
+DIAGONAL_LINES = _build_line_masks(((-1, 1), (1, -1)))
+ANTI_DIAGONAL_LINES = _build_line_masks(((-1, -1), (1, 1)))
+ROW_ATTACKS = _build_row_attacks()
+BETWEEN = _build_between()
+COL_SPREAD = tuple(
+    sum(1 << (row * 8) for row in range(8) if value >> row & 1)
+    for value in range(256)
+)
+
+
+# Sliding attacks use kindergarten magic multiplication: the occupancy of a
+# line is collapsed into one byte, looked up in the row attack table and
+# spread back onto the line.
+
+
+def rook_attacks(square, occupancy):
+    """Returns rook attacks from square"""
+
+    shift = square & 56
+    col = square & 7
+    row_bits = (occupancy >> shift) & 0xff
+    col_bits = ((((occupancy >> col) & FILL) * COL_COLLAPSE) & FULL) >> 56
+    return ((ROW_ATTACKS[col][row_bits] << shift)
+        | (COL_SPREAD[ROW_ATTACKS[square >> 3][col_bits]] << col))
+
+
+def bishop_attacks(square, occupancy):
+    """Returns bishop attacks from square"""
+
+    row_attacks = ROW_ATTACKS[square & 7]
+    diagonal = DIAGONAL_LINES[square]
+    anti_diagonal = ANTI_DIAGONAL_LINES[square]
+    diagonal_bits = (((occupancy & diagonal) * FILL) & FULL) >> 56
+    anti_bits = (((occupancy & anti_diagonal) * FILL) & FULL) >> 56
+    return (((row_attacks[diagonal_bits] * FILL) & diagonal)
+        | ((row_attacks[anti_bits] * FILL) & anti_diagonal))
+
+
+def queen_attacks(square, occupancy):
+    """Returns queen attacks from square"""
+
+    return rook_attacks(square, occupancy) | bishop_attacks(square, occupancy)
+
+
+SLIDER_ATTACKS = (
+    (BISHOP, bishop_attacks),
+    (ROOK, rook_attacks),
+    (QUEEN, queen_attacks),
+)
+
+
+def piece_attacks(kind, color, square, occupancy):
+    """Returns attacked squares for piece type on square"""
+
+    if kind == PAWN:
+        return PAWN_ATTACKS[color][square]
+    if kind == KNIGHT:
+        return KNIGHT_ATTACKS[square]
+    if kind == BISHOP:
+        return bishop_attacks(square, occupancy)
+    if kind == ROOK:
+        return rook_attacks(square, occupancy)
+    if kind == QUEEN:
+        return queen_attacks(square, occupancy)
+    return KING_ATTACKS[square]
+
+
+def attackers_to(position, square, color, occupancy):
+    """Returns pieces of color attacking square through given occupancy"""
+
+    bitboards = position.bitboards
+    base = color << 3
+    queens = bitboards[base | QUEEN]
+    return ((PAWN_ATTACKS[color ^ 1][square] & bitboards[base | PAWN])
+        | (KNIGHT_ATTACKS[square] & bitboards[base | KNIGHT])
+        | (KING_ATTACKS[square] & bitboards[base | KING])
+        | (bishop_attacks(square, occupancy) & (bitboards[base | BISHOP] | queens))
+        | (rook_attacks(square, occupancy) & (bitboards[base | ROOK] | queens)))
+
+
+def king_square(position, color):
+    """Returns square of the king of color"""
+
+    return position.bitboards[(color << 3) | KING].bit_length() - 1
+
+
+def legal_state(position):
+    """Computes checkers and pins for the side to move once per position
+
+    Returns king square, checkers, the mask of squares that resolve check
+    and a dict mapping each pinned square to the line it may move along.
+    """
+
+    color = position.turn
+    enemy = color ^ 1
+    bitboards = position.bitboards
+    king = king_square(position, color)
+    checkers = attackers_to(position, king, enemy, position.occupied)
+
+    if not checkers:
+        check_mask = FULL
+    elif checkers & (checkers - 1):
+        check_mask = 0
+    else:
+        check_mask = BETWEEN[king][checkers.bit_length() - 1] | checkers
+
+    pins = {}
+    base = enemy << 3
+    queens = bitboards[base | QUEEN]
+    blockers = position.colors[enemy]
+    snipers = ((rook_attacks(king, blockers) & (bitboards[base | ROOK] | queens))
+        | (bishop_attacks(king, blockers) & (bitboards[base | BISHOP] | queens)))
+    own = position.colors[color]
+    while snipers:
+        low = snipers & -snipers
+        line = BETWEEN[king][low.bit_length() - 1]
+        pinned = line & position.occupied
+        if pinned and not pinned & (pinned - 1) and pinned & own:
+            pins[pinned.bit_length() - 1] = line | low
+        snipers ^= low
+    return (king, checkers, check_mask, pins)
+
+
+def add_targets(square, targets, moves):
+    """Appends a move from square to every square in targets"""
+
+    while targets:
+        low = targets & -targets
+        moves.append(square | ((low.bit_length() - 1) << 6))
+        targets ^= low
+
+
+def add_pawn_targets(square, targets, moves):
+    """Appends pawn moves from square, expanding promotions"""
+
+    while targets:
+        low = targets & -targets
+        target = low.bit_length() - 1
+        move = square | (target << 6)
+        if target >> 3 in PAWN_LAST_ROW:
+            for promotion in PROMOTIONS:
+                moves.append(move | (promotion << 12))
+        else:
+            moves.append(move)
+        targets ^= low
+
+
+def add_king_moves(position, king, moves, target_mask=FULL):
+    """Appends king steps into target_mask to squares that are not attacked"""
+
+    color = position.turn
+    occupancy = position.occupied ^ BITS[king]
+    targets = KING_ATTACKS[king] & ~position.colors[color] & target_mask
+    while targets:
+        low = targets & -targets
+        target = low.bit_length() - 1
+        if not attackers_to(position, target, color ^ 1, occupancy):
+            moves.append(king | (target << 6))
+        targets ^= low
+
+
+def add_castling_moves(position, moves):
+    """Appends castling moves, assuming the side to move is not in check"""
+
+    color = position.turn
+    occupied = position.occupied
+    for (right, king, target, _, _, empty, path) in CASTLING_MOVES[color]:
+        if not position.castling & right:
+            continue
+        if any(occupied & BITS[square] for square in empty):
+            continue
+        if any(attackers_to(position, square, color ^ 1, occupied)
+                for square in path):
+            continue
+        moves.append(king | (target << 6))
+
+
+def add_en_passant_moves(position, king, moves):
+    """Appends en passant captures that do not expose the king"""
+
+    target = position.ep
+    if target == NO_SQUARE:
+        return
+
+    color = position.turn
+    captured = target - PAWN_PUSH[color]
+    pawns = PAWN_ATTACKS[color ^ 1][target] & position.bitboards[(color << 3) | PAWN]
+    while pawns:
+        low = pawns & -pawns
+        square = low.bit_length() - 1
+        occupancy = position.occupied ^ low ^ BITS[target] ^ BITS[captured]
+        attackers = attackers_to(position, king, color ^ 1, occupancy)
+        if not attackers & ~BITS[captured]:
+            moves.append(square | (target << 6))
+        pawns ^= low
+
+
+def add_pawn_moves(position, check_mask, pins, moves, captures_only=False):
+    """Appends legal pawn pushes and captures to moves"""
+
+    color = position.turn
+    pawns = position.bitboards[(color << 3) | PAWN]
+    empty = ~position.occupied & FULL
+    enemies = position.colors[color ^ 1] & check_mask
+    step = PAWN_PUSH[color]
+
+    if color == 0:
+        single = (pawns >> 8) & empty
+        double = ((single & ROW_MASKS[5]) >> 8) & empty & check_mask
+    else:
+        single = (pawns << 8) & empty
+        double = ((single & ROW_MASKS[2]) << 8) & empty & check_mask
+    single &= check_mask
+    if captures_only:
+        single &= ROW_MASKS[PAWN_LAST_ROW[color]]
+        double = 0
+
+    while single:
+        low = single & -single
+        target = low.bit_length() - 1
+        square = target - step
+        if square not in pins or pins[square] & low:
+            add_pawn_targets(square, low, moves)
+        single ^= low
+    while double:
+        low = double & -double
+        target = low.bit_length() - 1
+        square = target - 2 * step
+        if square not in pins or pins[square] & low:
+            moves.append(square | (target << 6))
+        double ^= low
+
+    attacks = PAWN_ATTACKS[color]
+    while pawns:
+        low = pawns & -pawns
+        square = low.bit_length() - 1
+        targets = attacks[square] & enemies
+        if targets and square in pins:
+            targets &= pins[square]
+        add_pawn_targets(square, targets, moves)
+        pawns ^= low
+
+
+def add_special_moves(position, state, moves, captures_only=False):
+    """Appends king, castling and en passant moves shared by backends"""
+
+    (king, checkers, _, _) = state
+    if captures_only:
+        add_king_moves(position, king, moves, position.colors[position.turn ^ 1])
+    else:
+        add_king_moves(position, king, moves)
+    if not checkers and not captures_only:
+        add_castling_moves(position, moves)
+    if not checkers & (checkers - 1):
+        add_en_passant_moves(position, king, moves)
+
+
+def generate_moves(position, captures_only=False):
+    """Returns legal moves for the side to move
+
+    With captures_only set only captures and promotions are returned.
+    """
+
+    moves = []
+    state = legal_state(position)
+    add_special_moves(position, state, moves, captures_only)
+    (_, checkers, check_mask, pins) = state
+    if checkers & (checkers - 1):
+        return moves
+
+    color = position.turn
+    occupied = position.occupied
+    bitboards = position.bitboards
+    targets_mask = ~position.colors[color] & check_mask
+    if captures_only:
+        targets_mask &= position.colors[color ^ 1]
+    base = color << 3
+
+    add_pawn_moves(position, check_mask, pins, moves, captures_only)
+    for (kind, attacks) in SLIDER_ATTACKS:
+        pieces = bitboards[base | kind]
+        while pieces:
+            low = pieces & -pieces
+            square = low.bit_length() - 1
+            targets = attacks(square, occupied) & targets_mask
+            if square in pins:
+                targets &= pins[square]
+            add_targets(square, targets, moves)
+            pieces ^= low
+    knights = bitboards[base | KNIGHT]
+    while knights:
+        low = knights & -knights
+        square = low.bit_length() - 1
+        if square not in pins:
+            add_targets(square, KNIGHT_ATTACKS[square] & targets_mask, moves)
+        knights ^= low
+    return moves
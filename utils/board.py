@@ -1,53 +1,80 @@
 """Module contains chess board logic"""
-import tkinter as tk
 import json
+import logging
 
-from utils.logger import LOGGER
-from utils.bases import Square
-from utils.pieces import Pawn, Rook, Knight, Bishop, Queen, King
+from utils.logger import LOGGER, LazyMessage
+from utils.bases import Square, Piece
+from utils.core import (piece_color, piece_type, square_index, square_coords,
+    move_name)
+from utils.game import Game
+from utils.pieces import PIECE_VIEWS
+from utils.sprites import SPRITES
+from utils.worker import EngineWorker
 
 # pylint: disable=too-many-instance-attributes
 # pylint: disable=too-many-public-methods
 
 logger = LOGGER.get_logger('board')
 
+BOARD_SIZE = 600
+RESIZE_DELAY = 50  # milliseconds to wait for a burst of resizes to end
+ENGINE_POLL = 16  # milliseconds between engine queue polls, about 60 fps
 
-class Board:
-    """Contains logic to render and resize board"""
 
-    turn = 0
-    board_size = 600
+class Board:
+    """Contains logic to render and resize board
 
-    @classmethod
-    def inc_turn(cls):
-        """Increments turn"""
+    Turn, size and square length are kept per instance, so several
+    boards can live in one process without sharing state.
+    """
 
-        cls.turn += 1
+    def update_board_size(self, size):
+        """Updates board and square size based on size input"""
 
-    @classmethod
-    def update_board_size(cls, size):
-        """Updates board size based on size input"""
+        self.board_size = size
+        self.length = size // 8
+        for square in self.squares:
+            square.length = self.length
 
-        cls.board_size = size
+    def __init__(self, master, size=BOARD_SIZE, fen=None, book=None,
+            canvas=None):
+        # pylint: disable=too-many-arguments
 
-    def __init__(self, master):
         self.master = master
-        self.canvas = tk.Canvas(self.master,
-            width=self.board_size, height=self.board_size)
-        Square.update_length(self.board_size / 8)
+        self.game = Game(fen=fen)
+        self.position = self.game.position
+        self.book = book
         self.squares = self.init_squares()
-        self.pieces = self.init_pieces()
-        self.selected_piece = None
+        self.update_board_size(size)
+        self.canvas = self.create_canvas() if canvas is None else canvas
+        self.pieces = self.init_pieces(self.position)
+        self.codes = list(self.position.board)
+        self.highlighted = set()
+        self.dirty = set()
         self.square = None
         self.piece = None
-        self.draw_squares()
-        self.draw_pieces()
+        self.selected_piece = None
+        self.resize_job = None
+        self.pending_size = self.board_size
+        self.geometry = None
+        self.engine = None
+        self.analysing = False
+        self.poll_job = None
+        self.draw_board()
         self.canvas.bind("<Button-1>", self.left_click)
         self.canvas.bind("<Configure>", self.on_resize)
         self.canvas.pack()
         # self.label = tk.Label(self.master, text=self.turn_color.title(), fg="red")
         # self.label.pack()
 
+    def create_canvas(self):
+        """Creates the Tk canvas the board is drawn on"""
+
+        import tkinter as tk  # pylint: disable=import-outside-toplevel
+
+        return tk.Canvas(self.master, width=self.board_size,
+            height=self.board_size)
+
     @property
     def selected_piece(self):
         """Return private copy of selected piece"""
@@ -59,18 +86,23 @@ class Board:
         """Sets private copy of selected piece to current piece"""
 
         if piece:
-            self.square.is_selected = True
             self.__selected_piece = piece
             self.valid_moves = self.get_valid_moves()
         else:
             self.__selected_piece = None
             self.valid_moves = []
 
+    @property
+    def turn(self):
+        """Turn index of the game on this board"""
+
+        return self.game.turn
+
     @property
     def turn_color(self):
         """Returns team color based on turn index"""
 
-        return "white" if not self.turn % 2 else "black"
+        return self.game.turn_color
 
 
     def left_click(self, event):
@@ -78,8 +110,8 @@ class Board:
 
         self.reset_squares()
 
-        row = event.y // Square.length
-        col = event.x // Square.length
+        row = event.y // self.length
+        col = event.x // self.length
 
         self.square = self.find_square(row, col)
         self.piece = self.find_piece(row, col)
@@ -111,8 +143,6 @@ class Board:
                     if (row, col) in self.valid_moves:
                         # enemy piece is captured
                         self.move_piece(row, col)
-                        self.remove_piece(self.piece)
-                        Board.inc_turn()
                     else:
                         # enemy piece is clicked, deselect
                         self.selected_piece = None
@@ -121,248 +151,262 @@ class Board:
                 if (row, col) in self.valid_moves:
                     # square is valid, moving piece
                     self.move_piece(row, col)
-                    Board.inc_turn()
                 else:
                     # square is invalid, deselect
                     self.selected_piece = None
 
-        # redraw updated board
+        # highlight selection and redraw changed squares
+        self.highlight_moves()
         self.draw_squares()
-        self.draw_pieces()
         # self.label.destroy()
         # self.label = tk.Label(self.master, text=self.turn_color.title(), fg="red")
         # self.label.pack()
 
     def on_resize(self, _):
-        """Event handler for window resize"""
+        """Event handler for window resize, coalescing bursts of events"""
 
         width = self.master.winfo_width()
         height = self.master.winfo_height()
         new_size = width if width < height else height
-        self.board_size = new_size - (new_size % 8)
-        self.canvas.config(width=self.board_size, height=self.board_size)
-        self.master.geometry(f"{self.board_size}x{self.board_size}")
-        Square.update_length(self.board_size / 8)
-        self.draw_squares()
-        self.draw_pieces()
+        new_size -= new_size % 8
+        if new_size == self.pending_size:
+            return
+        if self.resize_job is not None:
+            self.master.after_cancel(self.resize_job)
+            self.resize_job = None
+        self.pending_size = new_size
+        if new_size != self.board_size:
+            self.resize_job = self.master.after(RESIZE_DELAY, self.apply_resize)
+
+    def apply_resize(self):
+        """Rescales existing canvas items to the pending board size"""
+
+        self.resize_job = None
+        new_size = self.pending_size
+        if new_size < 8 or new_size == self.board_size:
+            return
+        ratio = new_size / self.board_size
+        self.canvas.config(width=new_size, height=new_size)
+        geometry = f"{new_size}x{new_size}"
+        if geometry != self.geometry:
+            self.geometry = geometry
+            self.master.geometry(geometry)
+        self.update_board_size(new_size)
+        self.canvas.scale("all", 0, 0, ratio, ratio)
+        if SPRITES.enabled:
+            for piece in self.pieces:
+                if piece:
+                    piece.draw(self.canvas, self.length)
+        else:
+            self.canvas.itemconfig(Piece.tag,
+                font=Piece.get_font(self.length))
 
-    def draw_squares(self):
-        """Draws squares to board"""
+    def draw_board(self):
+        """Creates or repositions every square and piece item"""
 
         for square in self.squares:
             square.draw(self.canvas)
+            square.place(self.canvas)
+        for piece in self.pieces:
+            if piece:
+                piece.draw(self.canvas, self.length)
+        self.dirty.clear()
 
-    def draw_pieces(self):
-        """Draws pieces to board"""
+    def draw_squares(self):
+        """Redraws squares whose state changed since the last draw"""
 
-        for piece in self.pieces:
-            piece.draw(self.canvas)
+        for square in self.dirty:
+            square.draw(self.canvas)
+        self.dirty.clear()
+
+    def sync_pieces(self):
+        """Updates piece items on squares changed in the position"""
+
+        board = self.position.board
+        for index in range(64):
+            code = board[index]
+            if code == self.codes[index]:
+                continue
+            self.codes[index] = code
+            old = self.pieces[index]
+            if not code:
+                old.erase(self.canvas)
+                self.pieces[index] = None
+                continue
+            (row, col) = square_coords(index)
+            view = PIECE_VIEWS[piece_type(code)](row, col, piece_color(code))
+            if old:
+                view.item = old.item
+            view.draw(self.canvas, self.length)
+            self.pieces[index] = view
 
     def find_square(self, row, col):
         """Locates a square on the board based on input"""
 
-        found_square = None
-        for square in self.squares:
-            if square.row == row and square.col == col:
-                found_square = square
-                break
-
-        return found_square
+        return self.squares[square_index(row, col)]
 
     def find_piece(self, row, col):
         """Locates a piece on the board based on input"""
 
-        found_piece = None
-        for piece in self.pieces:
-            if piece.row == row and piece.col == col:
-                found_piece = piece
-                break
-
-        return found_piece
+        return self.pieces[square_index(row, col)]
 
     def reset_squares(self):
-        """Resets state of squares"""
+        """Resets state of highlighted squares"""
 
-        for square in self.squares:
+        for square in self.highlighted:
             square.reset_state()
+        self.dirty |= self.highlighted
+        self.highlighted = set()
+
+    def mark_square(self, square, state):
+        """Sets a highlight state on square and queues it for redraw"""
+
+        setattr(square, state, True)
+        self.highlighted.add(square)
+        self.dirty.add(square)
 
     def get_valid_moves(self):
-        """Retrieves valid moves for selected piece"""
-
-        if self.selected_piece.name == "Knight":
-            validate_func = self.validate_knight
-        elif self.selected_piece.name == "King":
-            validate_func = self.validate_king
-        elif self.selected_piece.name == "Pawn":
-            validate_func = self.validate_pawn
-        elif self.selected_piece.name == "Queen":
-            validate_func = self.validate_queen
-        elif self.selected_piece.name == "Rook":
-            validate_func = self.validate_rook
-        elif self.selected_piece.name == "Bishop":
-            validate_func = self.validate_bishop
-        else:
-            raise Exception("Unidentified piece.")
+        """Looks up legal destinations for selected piece"""
 
-        valid_moves = validate_func()
-        return valid_moves
+        piece = self.selected_piece
+        return self.game.targets(piece.row, piece.col)
 
-    def remove_piece(self, piece):
-        """Removes piece from board"""
+    def highlight_moves(self):
+        """Marks the selected square and its legal destinations"""
 
-        piece_id = self.pieces.index(piece)
-        self.pieces.pop(piece_id)
+        if not self.selected_piece:
+            return
+        piece = self.selected_piece
+        self.mark_square(self.find_square(piece.row, piece.col), "is_selected")
+        for move in self.valid_moves:
+            if self.find_piece(*move):
+                self.mark_square(self.find_square(*move), "is_threat")
+            else:
+                self.mark_square(self.find_square(*move), "is_possible")
 
     def move_piece(self, row, col):
-        """Moves selected piece to coordinates"""
-
-        if self.selected_piece.name == "Pawn":
-            self.selected_piece.has_not_moved = False
-        self.selected_piece.row = row
-        self.selected_piece.col = col
+        """Plays selected piece to coordinates and advances the turn"""
+
+        piece = self.selected_piece
+        move = self.game.play(square_index(piece.row, piece.col), (row, col))
+        self.after_move(move)
+
+    def play_book_move(self, _=None):
+        """Plays a weighted book move for the side to move, if any"""
+
+        move = self.book.choose(self.position) if self.book else None
+        if move is None:
+            self.master.title("Chess V2 - out of book")
+            return
+        move = self.game.play(move & 63, square_coords((move >> 6) & 63))
+        if move is not None:
+            self.reset_squares()
+            self.draw_squares()
+            self.after_move(move, book=True)
+
+    def after_move(self, move, book=False):
+        """Redraws pieces and restarts analysis after a move was played"""
+
+        logger.event("move", move=move_name(move), turn=self.turn - 1,
+            book=book)
+        self.sync_pieces()
         self.selected_piece = None
         self.valid_moves = []
+        if self.analysing:
+            self.start_analysis()
 
-    def validate_pawn(self):
-        """Returns valid moves for pawn"""
-
-        (diagonals, straight) = self.selected_piece.get_possible_moves()
-
-        valid_moves = []
-        for move in diagonals:
-            pos_square = self.find_square(*move)
-            pos_piece = self.find_piece(*move)
-            if pos_piece:
-                if pos_piece.color != self.selected_piece.color:
-                    # enemy piece, attack
-                    pos_square.is_threat = True
-                    valid_moves.append(move)
-
-        for move in straight:
-            pos_square = self.find_square(*move)
-            pos_piece = self.find_piece(*move)
-            if not pos_piece:
-                pos_square.is_possible = True
-                valid_moves.append(move)
-            else:
-                break
-
-        return valid_moves
-
-    def validate_rook(self):
-        """Returns valid moves for rook"""
-
-        moves = self.selected_piece.get_possible_moves()
-
-        valid_moves = []
-        for _moves in moves:
-            for move in _moves:
-                pos_square = self.find_square(*move)
-                pos_piece = self.find_piece(*move)
-                if pos_piece:
-                    if pos_piece.color != self.selected_piece.color:
-                        # enemy piece
-                        pos_square.is_threat = True
-                        valid_moves.append(move)
-                    break
-                pos_square.is_possible = True
-                valid_moves.append(move)
-
-        return valid_moves
-
-    def validate_knight(self):
-        """Returns valid moves for knight"""
-
-        moves = self.selected_piece.get_possible_moves()
-
-        valid_moves = []
-        for move in moves:
-            pos_square = self.find_square(*move)
-            pos_piece = self.find_piece(*move)
-            if pos_piece:
-                if pos_piece.color != self.selected_piece.color:
-                    # enemy piece, attack
-                    pos_square.is_threat = True
-                    valid_moves.append(move)
-            else:
-                pos_square.is_possible = True
-                valid_moves.append(move)
-
-        return valid_moves
-
-    def validate_bishop(self):
-        """Returns valid moves for bishop"""
-
-        moves = self.selected_piece.get_possible_moves()
-
-        valid_moves = []
-        for _moves in moves:
-            for move in _moves:
-                pos_square = self.find_square(*move)
-                pos_piece = self.find_piece(*move)
-                if pos_piece:
-                    if pos_piece.color != self.selected_piece.color:
-                        # enemy piece
-                        pos_square.is_threat = True
-                        valid_moves.append(move)
-                    break
-                pos_square.is_possible = True
-                valid_moves.append(move)
-
-        return valid_moves
-
-    def validate_queen(self):
-        """Returns valid moves for queen"""
-
-        moves = self.selected_piece.get_possible_moves()
-
-        valid_moves = []
-        for _moves in moves:
-            for move in _moves:
-                pos_square = self.find_square(*move)
-                pos_piece = self.find_piece(*move)
-                if pos_piece:
-                    if pos_piece.color != self.selected_piece.color:
-                        # enemy piece
-                        pos_square.is_threat = True
-                        valid_moves.append(move)
-                    break
-                pos_square.is_possible = True
-                valid_moves.append(move)
-
-        return valid_moves
-
-    def validate_king(self):
-        """Returns valid moves for king"""
-
-        moves = self.selected_piece.get_possible_moves()
-
-        valid_moves = []
-        for move in moves:
-            pos_square = self.find_square(*move)
-            pos_piece = self.find_piece(*move)
-            if pos_piece:
-                if pos_piece.color != self.selected_piece.color:
-                    # enemy piece, attack
-                    pos_square.is_threat = True
-                    valid_moves.append(move)
-            else:
-                pos_square.is_possible = True
-                valid_moves.append(move)
+    def toggle_analysis(self, _=None):
+        """Starts or stops background analysis of the position"""
 
-        return valid_moves
+        if self.analysing:
+            self.stop_analysis()
+        else:
+            self.start_analysis()
+
+    def start_analysis(self):
+        """Searches the current position on the engine worker
+
+        Positions in the opening book show their book moves at once
+        instead of starting a search.
+        """
+
+        moves = self.book.moves(self.position) if self.book else []
+        if moves:
+            self.analysing = True
+            if self.engine is not None:
+                self.engine.cancel()
+            self.show_book(moves)
+            return
+        if self.engine is None:
+            self.engine = EngineWorker()
+        self.analysing = True
+        self.engine.submit(self.position)
+        if self.poll_job is None:
+            self.poll_job = self.master.after(ENGINE_POLL, self.poll_engine)
+
+    def stop_analysis(self):
+        """Cancels background analysis"""
+
+        self.analysing = False
+        if self.engine is not None:
+            self.engine.cancel()
+
+    def poll_engine(self):
+        """Shows engine progress and keeps polling while it searches"""
+
+        self.poll_job = None
+        for (kind, payload) in self.engine.poll():
+            if kind == "error":
+                logger.error(f"Engine failed: {payload}")
+            else:
+                self.show_analysis(payload)
+                if kind == "done":
+                    logger.event("analysis", **payload)
+        if self.engine.busy:
+            self.poll_job = self.master.after(ENGINE_POLL, self.poll_engine)
+
+    def show_analysis(self, info):
+        """Displays a progress report from the engine"""
+
+        score = (f"mate {info['mate']}" if info["mate"] is not None
+            else f"{info['score'] / 100:+.2f}")
+        self.master.title(f"Chess V2 - depth {info['depth']} {score} "
+            f"{' '.join(info['pv'][:6])}")
+        logger.debug(LazyMessage("Engine: {}".format, info))
+
+    def show_book(self, moves):
+        """Displays the book moves of the position by weight"""
+
+        total = sum(weight for (_, weight, _) in moves) or 1
+        ranked = sorted(moves, key=lambda record: -record[1])
+        self.master.title("Chess V2 - book " + " ".join(
+            f"{move_name(move)} {weight * 100 // total}%"
+            for (move, weight, _) in ranked[:6]))
+
+    def close(self):
+        """Stops the engine worker"""
+
+        if self.poll_job is not None:
+            self.master.after_cancel(self.poll_job)
+            self.poll_job = None
+        if self.engine is not None:
+            self.engine.close()
+            self.engine = None
 
     def display(self):
         """Prints game data"""
 
-        logger.info(json.dumps({
+        if not logger.is_enabled(logging.INFO):
+            return
+        logger.info(LazyMessage(json.dumps, {
             "square": str(self.square),
             "piece": str(self.piece),
             "selected_piece": str(self.selected_piece),
             "validMoves": str(self.valid_moves),
             "turn": str(self.turn),
             "squareLength": self.square.length if self.square else None,
-            "pieceSize": self.piece.get_font_size() if self.piece else None
+            "pieceSize": self.piece.get_font_size(self.length)
+                if self.piece else None
         }, indent=2))
 
     @staticmethod
@@ -377,29 +421,12 @@ class Board:
         return squares
 
     @staticmethod
-    def init_pieces():
-        """Initializes board pieces"""
-
-        pieces = []
-        for row in range(8):
-            for col in range(8):
-                if row in (0, 1, 6, 7):
-                    color = "black" if row in (0, 1) else "white"
-
-                    piece = None
-                    if row in (1, 6):
-                        piece = Pawn(row, col, color)
-                    elif row in (0, 7):
-                        if col in (0, 7):
-                            piece = Rook(row, col, color)
-                        elif col in (1, 6):
-                            piece = Knight(row, col, color)
-                        elif col in (2, 5):
-                            piece = Bishop(row, col, color)
-                        elif col == 3:
-                            piece = Queen(row, color)
-                        elif col == 4:
-                            piece = King(row, color)
-
-                    pieces.append(piece)
+    def init_pieces(position):
+        """Initializes piece views from position"""
+
+        pieces = [None] * 64
+        for (square, code) in position.pieces():
+            (row, col) = square_coords(square)
+            view = PIECE_VIEWS[piece_type(code)]
+            pieces[square] = view(row, col, piece_color(code))
         return pieces
@@ -0,0 +1,177 @@
+"""Module contains a memory mapped opening book and its PGN builder"""
+import functools
+import mmap
+import os
+import random
+import struct
+import time
+
+from utils.core import START_FEN
+from utils.pgn import BATCH_SIZE, decode_san, map_batches, parse_game
+from utils.position import Position
+
+# Polyglot layout: big-endian key, move, weight and learn fields, sorted
+# by key. Keys are this engine's Zobrist keys and moves its own encoding,
+# so books are not interchangeable with other Polyglot readers.
+RECORD = struct.Struct(">QHHI")
+KEY = struct.Struct(">Q")
+MOVE_MASK = 0xffff
+MAX_WEIGHT = 0xffff
+MAX_COUNT = 0xffffffff
+BOOK_PLIES = 20
+WRITE_RECORDS = 1 << 16  # records packed per write
+RESULT_POINTS = {"1-0": (2, 0), "0-1": (0, 2), "1/2-1/2": (1, 1)}
+UNKNOWN_POINTS = (1, 1)  # unfinished games count like draws
+
+
+class OpeningBook:
+    """Read only view of a book file, probed by binary search
+
+    The file is memory mapped, so opening even a very large book costs
+    nothing and only the pages a probe touches are read from disk.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as handle:
+            size = os.fstat(handle.fileno()).st_size
+            if size % RECORD.size:
+                raise ValueError(f"{path} is not a book file: size {size} "
+                    f"is not a multiple of {RECORD.size}")
+            self.data = mmap.mmap(handle.fileno(), 0,
+                access=mmap.ACCESS_READ) if size else b""
+        self.entries = size // RECORD.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        """Unmaps the book file"""
+
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.data = b""
+        self.entries = 0
+
+    def lookup(self, key):
+        """Returns (move, weight, count) records stored for a key"""
+
+        (low, high) = (0, self.entries)
+        while low < high:
+            middle = (low + high) // 2
+            if KEY.unpack_from(self.data, middle * RECORD.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        records = []
+        for index in range(low, self.entries):
+            (found, move, weight, count) = RECORD.unpack_from(self.data,
+                index * RECORD.size)
+            if found != key:
+                break
+            records.append((move, weight, count))
+        return records
+
+    def moves(self, position):
+        """Returns legal (move, weight, count) book records for a position
+
+        Moves are checked against the legal moves, so a rare key
+        collision can never make the engine play an illegal move.
+        """
+
+        records = self.lookup(position.key)
+        if not records:
+            return []
+        legal = set(position.generate_moves())
+        return [record for record in records if record[0] in legal]
+
+    def choose(self, position, rng=random, best=False):
+        """Returns a book move chosen by weight, or None out of book"""
+
+        records = [record for record in self.moves(position) if record[1]]
+        if not records:
+            return None
+        if best:
+            return max(records, key=lambda record: record[1])[0]
+        return rng.choices([record[0] for record in records],
+            [record[1] for record in records])[0]
+
+
+def book_batch(batch, max_plies):
+    """Counts (key, move) points in the first plies of a batch of games
+
+    Returns a dict mapping key << 16 | move to points << 32 | games, and
+    the number of games that failed to replay.
+    """
+
+    counts = {}
+    errors = 0
+    position = Position("bitboard")
+    for (_, _, raw) in batch:
+        (tags, moves, result) = parse_game(raw.decode("utf-8", "replace"))
+        points = RESULT_POINTS.get(tags.get("Result", result),
+            UNKNOWN_POINTS)
+        try:
+            position.set_fen(tags.get("FEN") or START_FEN)
+            for san in moves[:max_plies]:
+                move = decode_san(position, san)
+                entry = position.key << 16 | move
+                counts[entry] = counts.get(entry, 0) + \
+                    (points[position.turn] << 32 | 1)
+                position.make_move(move)
+        except ValueError:
+            errors += 1
+    return (counts, errors)
+
+
+def build_book(source, path, max_plies=BOOK_PLIES, min_games=1,
+        workers=None, batch_size=BATCH_SIZE):
+    """Builds a book file from a PGN archive and returns its figures
+
+    Every move in the first max_plies of each game is weighted by the
+    points its side scored, two for a win and one for a draw, so moves
+    that never scored keep a zero weight and are never chosen.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-locals
+
+    start = time.perf_counter()
+    counts = {}
+    (games, errors) = (0, 0)
+    for (batch, (batch_counts, batch_errors)) in map_batches(source,
+            functools.partial(book_batch, max_plies=max_plies), workers,
+            batch_size):
+        games += len(batch)
+        errors += batch_errors
+        for (entry, value) in batch_counts.items():
+            counts[entry] = counts.get(entry, 0) + value
+
+    records = sorted(((entry >> 16, entry & MOVE_MASK, value >> 32,
+        value & MAX_COUNT) for (entry, value) in counts.items()
+        if value & MAX_COUNT >= min_games),
+        key=lambda record: (record[0], -record[2]))
+    heaviest = max((record[2] for record in records), default=0)
+    scale = min(MAX_WEIGHT / heaviest, 1) if heaviest else 1
+    with open(path, "wb") as handle:
+        for offset in range(0, len(records), WRITE_RECORDS):
+            chunk = records[offset:offset + WRITE_RECORDS]
+            buffer = bytearray(RECORD.size * len(chunk))
+            for (index, (key, move, points, played)) in enumerate(chunk):
+                weight = max(int(points * scale), 1) if points else 0
+                RECORD.pack_into(buffer, index * RECORD.size, key, move,
+                    weight, played)
+            handle.write(buffer)
+
+    seconds = time.perf_counter() - start
+    return {
+        "games": games,
+        "errors": errors,
+        "positions": len({record[0] for record in records}),
+        "entries": len(records),
+        "bytes": len(records) * RECORD.size,
+        "seconds": round(seconds, 6),
+        "games_per_second": round(games / seconds, 2) if seconds else 0,
+    }
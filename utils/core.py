@@ -0,0 +1,99 @@
+"""Module contains encodings shared by the game state core"""
+
+WHITE = 0
+BLACK = 1
+COLORS = ("white", "black")
+
+EMPTY = 0
+PAWN = 1
+KNIGHT = 2
+BISHOP = 3
+ROOK = 4
+QUEEN = 5
+KING = 6
+PIECE_NAMES = (None, "Pawn", "Knight", "Bishop", "Rook", "Queen", "King")
+PIECE_LETTERS = " pnbrqk"
+PROMOTIONS = (QUEEN, ROOK, BISHOP, KNIGHT)
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+NO_SQUARE = -1
+
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+ALL_CASTLING = 15
+CASTLING_LETTERS = (
+    ("K", WHITE_KINGSIDE),
+    ("Q", WHITE_QUEENSIDE),
+    ("k", BLACK_KINGSIDE),
+    ("q", BLACK_QUEENSIDE),
+)
+
+SQUARE_NAMES = tuple(
+    "abcdefgh"[square & 7] + str(8 - (square >> 3)) for square in range(64)
+)
+
+
+def make_piece(color, kind):
+    """Returns piece code for color and piece type"""
+
+    return (color << 3) | kind
+
+
+def piece_color(piece):
+    """Returns color of piece code"""
+
+    return piece >> 3
+
+
+def piece_type(piece):
+    """Returns piece type of piece code"""
+
+    return piece & 7
+
+
+def square_index(row, col):
+    """Returns square index for row and column"""
+
+    return (row << 3) | col
+
+
+def square_coords(square):
+    """Returns row and column for square index"""
+
+    return (square >> 3, square & 7)
+
+
+def encode_move(from_square, to_square, promotion=EMPTY):
+    """Packs a move into a single integer"""
+
+    return from_square | (to_square << 6) | (promotion << 12)
+
+
+def move_from(move):
+    """Returns origin square of move"""
+
+    return move & 63
+
+
+def move_to(move):
+    """Returns destination square of move"""
+
+    return (move >> 6) & 63
+
+
+def move_promotion(move):
+    """Returns promotion piece type of move"""
+
+    return move >> 12
+
+
+def move_name(move):
+    """Returns coordinate notation for move, such as e2e4 or a7a8q"""
+
+    name = SQUARE_NAMES[move & 63] + SQUARE_NAMES[(move >> 6) & 63]
+    if move >> 12:
+        name += PIECE_LETTERS[move >> 12]
+    return name
@@ -0,0 +1,100 @@
+"""Module contains static evaluation of positions"""
+from utils.core import WHITE, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+
+PIECE_VALUES = (0, 100, 320, 330, 500, 900, 20000)
+
+# Piece square tables from white's side, laid out from row 0 (the eighth
+# rank) to row 7, so a white piece reads its square directly and a black
+# piece reads the vertically mirrored square.
+PAWN_TABLE = (
+    0, 0, 0, 0, 0, 0, 0, 0,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    10, 10, 20, 30, 30, 20, 10, 10,
+    5, 5, 10, 25, 25, 10, 5, 5,
+    0, 0, 0, 20, 20, 0, 0, 0,
+    5, -5, -10, 0, 0, -10, -5, 5,
+    5, 10, 10, -20, -20, 10, 10, 5,
+    0, 0, 0, 0, 0, 0, 0, 0,
+)
+KNIGHT_TABLE = (
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20, 0, 0, 0, 0, -20, -40,
+    -30, 0, 10, 15, 15, 10, 0, -30,
+    -30, 5, 15, 20, 20, 15, 5, -30,
+    -30, 0, 15, 20, 20, 15, 0, -30,
+    -30, 5, 10, 15, 15, 10, 5, -30,
+    -40, -20, 0, 5, 5, 0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+)
+BISHOP_TABLE = (
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 10, 10, 5, 0, -10,
+    -10, 5, 5, 10, 10, 5, 5, -10,
+    -10, 0, 10, 10, 10, 10, 0, -10,
+    -10, 10, 10, 10, 10, 10, 10, -10,
+    -10, 5, 0, 0, 0, 0, 5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+)
+ROOK_TABLE = (
+    0, 0, 0, 0, 0, 0, 0, 0,
+    5, 10, 10, 10, 10, 10, 10, 5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    0, 0, 0, 5, 5, 0, 0, 0,
+)
+QUEEN_TABLE = (
+    -20, -10, -10, -5, -5, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 5, 5, 5, 0, -10,
+    -5, 0, 5, 5, 5, 5, 0, -5,
+    0, 0, 5, 5, 5, 5, 0, -5,
+    -10, 5, 5, 5, 5, 5, 0, -10,
+    -10, 0, 5, 0, 0, 0, 0, -10,
+    -20, -10, -10, -5, -5, -10, -10, -20,
+)
+KING_TABLE = (
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+    20, 20, 0, 0, 0, 0, 20, 20,
+    20, 30, 10, 0, 0, 10, 30, 20,
+)
+
+
+def _build_square_values():
+    """Combines material and table bonus for every piece code and square"""
+
+    tables = {PAWN: PAWN_TABLE, KNIGHT: KNIGHT_TABLE, BISHOP: BISHOP_TABLE,
+        ROOK: ROOK_TABLE, QUEEN: QUEEN_TABLE, KING: KING_TABLE}
+    values = [(0,) * 64 for _ in range(16)]
+    for (kind, table) in tables.items():
+        values[kind] = tuple(PIECE_VALUES[kind] + table[square]
+            for square in range(64))
+        values[8 | kind] = tuple(-(PIECE_VALUES[kind] + table[square ^ 56])
+            for square in range(64))
+    return tuple(values)
+
+
+SQUARE_VALUES = _build_square_values()
+
+
+def evaluate(position):
+    """Returns score in centipawns from the side to move's point of view"""
+
+    score = 0
+    bitboards = position.bitboards
+    for piece in (1, 2, 3, 4, 5, 6, 9, 10, 11, 12, 13, 14):
+        values = SQUARE_VALUES[piece]
+        pieces = bitboards[piece]
+        while pieces:
+            low = pieces & -pieces
+            score += values[low.bit_length() - 1]
+            pieces ^= low
+    return score if position.turn == WHITE else -score
@@ -0,0 +1,71 @@
+"""Module contains streaming loaders for files of FEN and EPD lines"""
+import io
+
+from utils.position import Position
+
+READ_BUFFER = 1 << 20  # bytes read from disk at a time
+
+
+def fen_fields(line):
+    """Returns the FEN part of a FEN or EPD line, or None for blank lines
+
+    EPD lines carry four FEN fields followed by operations such as
+    "bm e4;", so the move counters are only kept when both are numbers.
+    """
+
+    fields = line.split(None, 6)
+    if not fields or fields[0].startswith("#"):
+        return None
+    if len(fields) >= 6 and fields[4].isdigit() and fields[5].isdigit():
+        return " ".join(fields[:6])
+    return " ".join(fields[:4])
+
+
+def read_fens(source):
+    """Yields (line number, FEN) for every FEN in a path or text file
+
+    Lines are read lazily through a large buffer, so files of millions of
+    positions are never held in memory.
+    """
+
+    if isinstance(source, io.IOBase):
+        yield from _read_lines(source)
+        return
+    with open(source, encoding="ascii", errors="replace",
+            buffering=READ_BUFFER) as handle:
+        yield from _read_lines(handle)
+
+
+def _read_lines(handle):
+    """Yields (line number, FEN) from an open text file"""
+
+    for (number, line) in enumerate(handle, 1):
+        fen = fen_fields(line)
+        if fen is not None:
+            yield (number, fen)
+
+
+def load_positions(source, backend="bitboard", reuse=True, errors="raise"):
+    """Yields (line number, position) for every FEN in a path or text file
+
+    With reuse the same Position object is set up again for each line,
+    so its board and bitboard buffers are recycled instead of allocated;
+    consumers that keep a position must copy it before asking for the
+    next one. Invalid lines raise ValueError with the line number, or
+    are passed over when errors is "skip".
+    """
+
+    if errors not in ("raise", "skip"):
+        raise ValueError(f"Unknown errors mode {errors!r}, "
+            "expected raise or skip")
+    position = Position(backend)
+    for (number, fen) in read_fens(source):
+        if not reuse:
+            position = Position(backend)
+        try:
+            position.set_fen(fen)
+        except ValueError as error:
+            if errors == "skip":
+                continue
+            raise ValueError(f"Line {number}: {error}") from error
+        yield (number, position)
@@ -0,0 +1,91 @@
+"""Module contains the rules state of a single game without a window"""
+from utils.core import QUEEN, square_index, square_coords
+from utils.position import Position
+
+
+class Game:
+    """Position, turn counter and legal move map of one game
+
+    Every piece of state lives on the instance, so any number of games
+    can run side by side in one process.
+    """
+
+    def __init__(self, backend="mailbox", fen=None):
+        self.position = Position(backend)
+        self.turn = 0
+        self.moves = []
+        if fen:
+            self.set_fen(fen)
+        else:
+            self.move_map = self.init_move_map(self.position)
+
+    def set_fen(self, fen):
+        """Sets up a FEN position and forgets the moves played so far
+
+        The FEN is parsed into a new position, so a ValueError leaves the
+        current game untouched. The turn index counts plies from the
+        first move, which keeps turn_color in step with the side to move.
+        """
+
+        position = Position(self.position.backend)
+        position.set_fen(fen)
+        self.position = position
+        self.turn = max(position.fullmove - 1, 0) * 2 + position.turn
+        self.moves = []
+        self.move_map = self.init_move_map(position)
+
+    @property
+    def turn_color(self):
+        """Returns team color based on turn index"""
+
+        return "white" if not self.turn % 2 else "black"
+
+    @property
+    def over(self):
+        """True once the side to move has no legal moves"""
+
+        return not self.move_map
+
+    def inc_turn(self):
+        """Increments turn"""
+
+        self.turn += 1
+
+    def next_turn(self):
+        """Advances the turn and generates the new side's legal moves"""
+
+        self.inc_turn()
+        self.move_map = self.init_move_map(self.position)
+
+    def targets(self, row, col):
+        """Returns legal destinations for the piece on a square"""
+
+        return list(self.move_map.get(square_index(row, col), ()))
+
+    def play(self, from_square, to_coords):
+        """Plays the legal move between squares and returns it, or None"""
+
+        move = self.move_map.get(from_square, {}).get(to_coords)
+        if move is None:
+            return None
+        self.position.make_move(move)
+        self.moves.append(move)
+        self.next_turn()
+        return move
+
+    @staticmethod
+    def init_move_map(position):
+        """Maps each origin square to its legal destinations and moves
+
+        Under-promotions are left out, so a pawn reaching the last rank
+        always promotes to a queen.
+        """
+
+        move_map = {}
+        for move in position.generate_moves():
+            promotion = move >> 12
+            if promotion and promotion != QUEEN:
+                continue
+            targets = move_map.setdefault(move & 63, {})
+            targets[square_coords((move >> 6) & 63)] = move
+        return move_map
@@ -1,4 +1,5 @@
 """Module for custom logger"""
+import atexit
 import logging
 import sys
 import os
@@ -28,6 +29,39 @@ class StderrFormatter(logging.Formatter):
         super().__init__('[%(levelname)s] %(message)s')
 
 
+class EventFormatter(logging.Formatter):
+    """Formatting for structured events as one JSON object per line"""
+
+    def format(self, record):
+        import json  # pylint: disable=import-outside-toplevel
+
+        return json.dumps(dict({
+            "time": round(record.created, 6),
+            "level": record.levelname,
+            "name": record.name,
+            "event": record.event,
+        }, **record.fields), default=str, separators=(",", ":"))
+
+
+class LazyMessage:
+    """Log message built by a callable only when a handler formats it"""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, build, *args, **kwargs):
+        (self.build, self.args, self.kwargs) = (build, args, kwargs)
+
+    def __str__(self):
+        return str(self.build(*self.args, **self.kwargs))
+
+
+def format_event(event, fields):
+    """Formats an event and its fields for plain text handlers"""
+
+    return " ".join([event] + [f"{key}={value}"
+        for (key, value) in fields.items()])
+
+
 class DebugFilter(logging.Filter):
     """Filter for debug"""
 
@@ -57,6 +91,15 @@ class StderrFilter(logging.Filter):
         return record.levelno >= logging.WARNING
 
 
+class EventFilter(logging.Filter):
+    """Filter for structured events"""
+
+    def filter(self, record):
+        """Returns true if record was logged through Logger.event"""
+
+        return hasattr(record, "event")
+
+
 class DebugHandler(logging.FileHandler):
     """Event handler for debug"""
 
@@ -84,27 +127,92 @@ class StderrHandler(logging.StreamHandler):
         self.addFilter(StderrFilter())
 
 
+class EventHandler(logging.FileHandler):
+    """Event handler for JSON lines events"""
+
+    def __init__(self):
+        super().__init__('logs/events.jsonl', mode="w")
+        self.setFormatter(EventFormatter())
+        self.addFilter(EventFilter())
+
+
+class AsyncHandler(logging.Handler):
+    """Hands records to the listener thread without formatting them"""
+
+    def __init__(self, records):
+        super().__init__()
+        self.records = records
+
+    def emit(self, record):
+        """Queues record untouched so formatting happens off the caller"""
+
+        self.records.put_nowait(record)
+
+
 class Logger:
-    """Custom logger"""
+    """Custom logger
+
+    Records are put on a queue and written by a listener thread, so
+    callers never wait on terminal or file I/O. Messages may be a
+    LazyMessage, which is only built when a handler formats it. Nothing
+    is set up until the first message is logged, so importing modules
+    that create loggers has no side effects.
+    """
 
     RUNNING = False
+    LISTENER = None
 
     def __init__(self, alias, level=logging.DEBUG):
         (self.alias, self.level) = (alias, level)
-        self.logger = logging.getLogger(self.alias)
-        self.logger.setLevel(self.level)
-        if not self.RUNNING:
-            os.makedirs("logs", exist_ok=True)
-            self.logger.addHandler(StdoutHandler())
-            self.logger.addHandler(StderrHandler())
-            self.logger.addHandler(DebugHandler())
-            Logger.RUNNING = True
+        self.__logger = None
+
+    @classmethod
+    def setup(cls):
+        """Creates the log directory and starts the listener thread once"""
+
+        # pylint: disable=import-outside-toplevel
+        import logging.handlers
+        import queue
+
+        if cls.RUNNING:
+            return
+        os.makedirs("logs", exist_ok=True)
+        records = queue.SimpleQueue()
+        logging.getLogger("root").addHandler(AsyncHandler(records))
+        cls.LISTENER = logging.handlers.QueueListener(records,
+            StdoutHandler(), StderrHandler(), DebugHandler(), EventHandler(),
+            respect_handler_level=True)
+        cls.LISTENER.start()
+        atexit.register(cls.LISTENER.stop)
+        cls.RUNNING = True
+
+    @property
+    def logger(self):
+        """Standard library logger, set up on first use"""
+
+        if self.__logger is None:
+            self.setup()
+            self.__logger = logging.getLogger(self.alias)
+            self.__logger.setLevel(self.level)
+        return self.__logger
 
     def get_logger(self, alias):
         """Returns child logger"""
 
         return Logger('.'.join([self.alias, alias]))
 
+    def is_enabled(self, level):
+        """Returns true if messages at level would be handled"""
+
+        return self.logger.isEnabledFor(level)
+
+    def event(self, event, level=logging.DEBUG, **fields):
+        """Logs a structured event to the JSON lines sink"""
+
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, LazyMessage(format_event, event, fields),
+                extra={"event": event, "fields": fields})
+
     def debug(self, *args, **kwargs):
         """Logs debug messages"""
 
@@ -0,0 +1,100 @@
+"""Module contains mailbox move generation over precomputed rays"""
+from utils.bitboard import ROW_MASKS, legal_state, add_special_moves
+from utils.core import PAWN, KNIGHT, KING, PROMOTIONS, piece_color, piece_type
+from utils.tables import (KNIGHT_STEPS, SLIDER_RAYS, PAWN_PUSH,
+    PAWN_START_ROW, PAWN_LAST_ROW, PAWN_CAPTURES)
+
+PROMOTION_ROWS = tuple(ROW_MASKS[row] for row in PAWN_LAST_ROW)
+
+
+def generate_moves(position, captures_only=False):
+    """Returns legal moves for the side to move
+
+    With captures_only set only captures and promotions are returned.
+    """
+
+    moves = []
+    state = legal_state(position)
+    add_special_moves(position, state, moves, captures_only)
+    (_, checkers, check_mask, pins) = state
+    if checkers & (checkers - 1):
+        return moves
+
+    board = position.board
+    color = position.turn
+    push_mask = check_mask
+    if captures_only:
+        check_mask &= position.colors[color ^ 1]
+        push_mask &= PROMOTION_ROWS[color]
+    for square in range(64):
+        piece = board[square]
+        if piece and piece_color(piece) == color and piece_type(piece) != KING:
+            if square in pins:
+                add_piece_moves(board, square, piece,
+                    check_mask & pins[square], push_mask & pins[square], moves)
+            else:
+                add_piece_moves(board, square, piece, check_mask, push_mask,
+                    moves)
+    return moves
+
+
+def add_piece_moves(board, square, piece, mask, push_mask, moves):
+    """Appends moves for a single piece landing on squares in mask
+
+    Pawn pushes use push_mask since they never capture.
+    """
+
+    # pylint: disable=too-many-arguments
+
+    color = piece_color(piece)
+    kind = piece_type(piece)
+
+    if kind == PAWN:
+        add_pawn_moves(board, square, color, mask, push_mask, moves)
+    elif kind == KNIGHT:
+        for target in KNIGHT_STEPS[square]:
+            occupant = board[target]
+            if (not occupant or piece_color(occupant) != color) \
+                    and mask >> target & 1:
+                moves.append(square | (target << 6))
+    else:
+        for ray in SLIDER_RAYS[kind][square]:
+            for target in ray:
+                occupant = board[target]
+                if occupant and piece_color(occupant) == color:
+                    break
+                if mask >> target & 1:
+                    moves.append(square | (target << 6))
+                if occupant:
+                    break
+
+
+def add_pawn_move(square, target, moves):
+    """Appends a pawn move, expanding promotions"""
+
+    move = square | (target << 6)
+    if target >> 3 in PAWN_LAST_ROW:
+        for promotion in PROMOTIONS:
+            moves.append(move | (promotion << 12))
+    else:
+        moves.append(move)
+
+
+def add_pawn_moves(board, square, color, mask, push_mask, moves):
+    """Appends pawn captures in mask and pushes in push_mask"""
+
+    # pylint: disable=too-many-arguments
+
+    for target in PAWN_CAPTURES[color][square]:
+        occupant = board[target]
+        if occupant and piece_color(occupant) != color and mask >> target & 1:
+            add_pawn_move(square, target, moves)
+
+    target = square + PAWN_PUSH[color]
+    if not board[target]:
+        if push_mask >> target & 1:
+            add_pawn_move(square, target, moves)
+        target += PAWN_PUSH[color]
+        if square >> 3 == PAWN_START_ROW[color] and not board[target] \
+                and push_mask >> target & 1:
+            moves.append(square | (target << 6))
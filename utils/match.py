@@ -0,0 +1,278 @@
+"""Module contains engine self-play matches with SPRT early stopping"""
+import math
+import multiprocessing
+import os
+import time
+
+from utils.core import START_FEN, move_name
+from utils.position import Position, adjudicate
+from utils.search import Search
+from utils.transposition import TranspositionTable
+
+# short opening lines in coordinate notation, each played with both colors
+OPENINGS = (
+    "e2e4 e7e5 g1f3 b8c6",
+    "e2e4 c7c5 g1f3 d7d6",
+    "e2e4 e7e6 d2d4 d7d5",
+    "e2e4 c7c6 d2d4 d7d5",
+    "e2e4 d7d5 e4d5 d8d5",
+    "e2e4 g7g6 d2d4 f8g7",
+    "d2d4 d7d5 c2c4 e7e6",
+    "d2d4 d7d5 c2c4 c7c6",
+    "d2d4 g8f6 c2c4 g7g6",
+    "d2d4 g8f6 c2c4 e7e6",
+    "d2d4 f7f5 g2g3 g8f6",
+    "c2c4 e7e5 b1c3 g8f6",
+    "c2c4 c7c5 g1f3 b8c6",
+    "g1f3 d7d5 g2g3 g8f6",
+    "b2b3 e7e5 c1b2 b8c6",
+    "e2e4 b8c6 d2d4 d7d5",
+)
+ENGINE_LIMITS = ("depth", "nodes", "movetime", "hash")
+DEFAULT_ENGINE = {"nodes": 2000, "hash": 4}
+MAX_PLIES = 300  # games still running are adjudicated as draws
+LLR_PRIOR = 0.5  # pseudo games per outcome when estimating the variance
+
+
+def parse_engine(text):
+    """Parses engine limits such as nodes=2000,hash=4 into a dict"""
+
+    engine = {}
+    for field in filter(None, text.split(",")):
+        (name, _, value) = field.partition("=")
+        if name not in ENGINE_LIMITS or not value:
+            raise ValueError(f"Bad engine limit {field!r}, expected "
+                f"{'/'.join(ENGINE_LIMITS)}=value")
+        engine[name] = float(value) if name == "movetime" else int(value)
+    if not any(name in engine for name in ("depth", "nodes", "movetime")):
+        raise ValueError(f"Engine {text!r} needs a depth, nodes or movetime")
+    return engine
+
+
+def load_openings(path):
+    """Reads openings from a file of FENs or coordinate move lines"""
+
+    with open(path, encoding="utf-8") as handle:
+        return tuple(line.strip() for line in handle
+            if line.strip() and not line.startswith("#"))
+
+
+def setup_opening(opening):
+    """Returns a position after a FEN or a line of coordinate moves"""
+
+    position = Position("bitboard")
+    if "/" in opening:
+        position.set_fen(opening)
+        return position
+    position.set_fen(START_FEN)
+    for name in opening.split():
+        legal = {move_name(move): move for move in position.generate_moves()}
+        if name not in legal:
+            raise ValueError(f"Illegal opening move {name!r} in {opening!r}")
+        position.make_move(legal[name])
+    return position
+
+
+def check_openings(openings):
+    """Raises ValueError unless every opening sets up a legal position"""
+
+    if not openings:
+        raise ValueError("No openings to play")
+    for opening in openings:
+        try:
+            setup_opening(opening)
+        except ValueError as error:
+            raise ValueError(f"Bad opening {opening!r}: {error}") from error
+
+
+def play_game(task):
+    """Plays one game between two engines and returns its record"""
+
+    (index, opening, engines, first_is_white, max_plies) = task
+    position = setup_opening(opening)
+    tables = [TranspositionTable(engine.get("hash", 4)) for engine in engines]
+    # engine 0 is the first engine, sides map the side to move to engines
+    sides = (0, 1) if first_is_white else (1, 0)
+    start = time.perf_counter()
+    moves = []
+    outcome = adjudicate(position)
+    while outcome is None and len(moves) < max_plies:
+        engine = sides[position.turn]
+        limits = engines[engine]
+        result = Search(position, max_depth=limits.get("depth"),
+            max_nodes=limits.get("nodes"), max_time=limits.get("movetime"),
+            table=tables[engine]).run()
+        position.make_move(result.move)
+        moves.append(move_name(result.move))
+        outcome = adjudicate(position)
+    (white_score, reason) = outcome or (0.5, "move limit")
+    return {
+        "index": index,
+        "opening": opening,
+        "first_is_white": first_is_white,
+        "score": white_score if first_is_white else 1.0 - white_score,
+        "reason": reason,
+        "plies": len(moves),
+        "moves": moves,
+        "seconds": round(time.perf_counter() - start, 6),
+    }
+
+
+def expected_score(elo):
+    """Returns the expected score for an Elo difference"""
+
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def elo_from_score(score):
+    """Returns the Elo difference matching an expected score"""
+
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+class SPRT:
+    """Sequential probability ratio test on win, draw and loss counts
+
+    Uses the normal approximation of the generalised log likelihood
+    ratio for H0: elo = elo0 against H1: elo = elo1, so a match can stop
+    as soon as either hypothesis is accepted.
+    """
+
+    # pylint: disable=too-many-arguments
+
+    def __init__(self, elo0=0.0, elo1=10.0, alpha=0.05, beta=0.05):
+        (self.elo0, self.elo1) = (elo0, elo1)
+        (self.alpha, self.beta) = (alpha, beta)
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.wins = self.draws = self.losses = 0
+
+    def add(self, score):
+        """Counts one game scored from the first engine's side"""
+
+        if score == 1.0:
+            self.wins += 1
+        elif score == 0.0:
+            self.losses += 1
+        else:
+            self.draws += 1
+
+    @property
+    def games(self):
+        """Games counted so far"""
+
+        return self.wins + self.draws + self.losses
+
+    def score_variance(self, prior=0.0):
+        """Returns mean score and per game variance
+
+        A prior adds that many pseudo games to each outcome, which keeps
+        the variance positive while one outcome has not been seen yet.
+        """
+
+        (wins, draws, losses) = (self.wins + prior, self.draws + prior,
+            self.losses + prior)
+        games = wins + draws + losses
+        score = (wins + draws / 2) / games
+        variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2
+            + losses * score ** 2) / games
+        return (score, variance)
+
+    def llr(self):
+        """Returns the log likelihood ratio of H1 against H0"""
+
+        if not self.games:
+            return 0.0
+        (score, variance) = self.score_variance(LLR_PRIOR)
+        (score0, score1) = (expected_score(self.elo0),
+            expected_score(self.elo1))
+        return ((score1 - score0) * (2 * score - score0 - score1)
+            * self.games / (2 * variance))
+
+    def status(self):
+        """Returns H0, H1 or None while the test is undecided"""
+
+        llr = self.llr()
+        if llr >= self.upper:
+            return "H1"
+        if llr <= self.lower:
+            return "H0"
+        return None
+
+    def elo(self):
+        """Returns Elo estimate and 95% error margin"""
+
+        if not self.games:
+            return (0.0, 0.0)
+        (score, variance) = self.score_variance()
+        margin = 1.96 * math.sqrt(variance / self.games)
+        elo = elo_from_score(score)
+        return (elo, (elo_from_score(score + margin)
+            - elo_from_score(score - margin)) / 2)
+
+    def as_dict(self):
+        """Returns counts, Elo and test state"""
+
+        (elo, margin) = self.elo()
+        return {
+            "wins": self.wins,
+            "draws": self.draws,
+            "losses": self.losses,
+            "elo": round(elo, 2),
+            "elo_margin": round(margin, 2),
+            "llr": round(self.llr(), 4),
+            "bounds": [round(self.lower, 4), round(self.upper, 4)],
+            "elo0": self.elo0,
+            "elo1": self.elo1,
+            "result": self.status(),
+        }
+
+
+def game_tasks(engines, openings, games, max_plies):
+    """Yields game tasks pairing every opening with both colors"""
+
+    for index in range(games):
+        opening = openings[(index // 2) % len(openings)]
+        yield (index, opening, engines, index % 2 == 0, max_plies)
+
+
+def run_match(engines, games=200, workers=None, openings=OPENINGS,
+        sprt=None, max_plies=MAX_PLIES, on_game=None):
+    """Plays engines[0] against engines[1] across a process pool
+
+    Games are handed out one at a time so every worker stays busy, and
+    the pool is terminated as soon as the SPRT accepts a hypothesis.
+    Openings are checked before the pool starts, raising ValueError.
+    """
+
+    # pylint: disable=too-many-arguments
+
+    check_openings(openings)
+    workers = workers or os.cpu_count() or 1
+    sprt = sprt or SPRT()
+    reasons = {}
+    plies = 0
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        for record in pool.imap_unordered(play_game,
+                game_tasks(engines, openings, games, max_plies)):
+            sprt.add(record["score"])
+            reasons[record["reason"]] = reasons.get(record["reason"], 0) + 1
+            plies += record["plies"]
+            if on_game:
+                on_game(record, sprt)
+            if sprt.status():
+                pool.terminate()
+                break
+    seconds = time.perf_counter() - start
+    return dict(sprt.as_dict(), **{
+        "engines": list(engines),
+        "games": sprt.games,
+        "scheduled": games,
+        "workers": workers,
+        "reasons": reasons,
+        "plies": plies,
+        "seconds": round(seconds, 6),
+        "games_per_second": round(sprt.games / seconds, 4) if seconds else 0,
+    })
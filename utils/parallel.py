@@ -0,0 +1,120 @@
+"""Module contains lazy SMP search across worker processes"""
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+
+from utils.search import Search
+from utils.transposition import (DEFAULT_HASH_MB, BUCKET_BYTES,
+    TranspositionTable, bucket_count)
+
+_WORKER = {}  # per process state set up by _init_worker
+COUNTERS = ("probes", "hits", "stores", "collisions")
+
+
+def _init_worker(memory_name, stop_event):
+    """Attaches a pool process to the shared table and stop event"""
+
+    memory = shared_memory.SharedMemory(name=memory_name)
+    _WORKER["memory"] = memory
+    _WORKER["table"] = TranspositionTable(buffer=memory.buf)
+    _WORKER["stop_event"] = stop_event
+
+
+def _search_worker(position, worker_id, limits, generation):
+    """Runs one lazy SMP thread of the search in a pool process
+
+    Returns the result with the table counters of this search, since the
+    counters live in each process and the parent never sees them.
+    """
+
+    table = _WORKER["table"]
+    table.generation = generation
+    table.probes = table.hits = table.stores = table.collisions = 0
+    # helpers start one ply deeper on odd ids so workers desynchronise
+    searcher = Search(position, max_depth=limits["depth"],
+        max_nodes=limits["nodes"], max_time=limits["movetime"], table=table,
+        stop_event=_WORKER["stop_event"], start_depth=1 + (worker_id & 1))
+    result = searcher.run()
+    return (worker_id, result,
+        {name: getattr(table, name) for name in COUNTERS})
+
+
+class ParallelSearch:
+    """Pool of processes searching one position through a shared table
+
+    Every worker searches the same root with iterative deepening and
+    shares results through a transposition table in shared memory. The
+    search ends when the main worker finishes, and the deepest completed
+    result is returned.
+    """
+
+    def __init__(self, workers=None, hash_mb=DEFAULT_HASH_MB):
+        self.workers = workers or os.cpu_count() or 1
+        size = bucket_count(hash_mb) * BUCKET_BYTES
+        self.memory = shared_memory.SharedMemory(create=True, size=size)
+        self.table = TranspositionTable(buffer=self.memory.buf)
+        self.stop_event = multiprocessing.Event()
+        self.pool = multiprocessing.Pool(self.workers,
+            initializer=_init_worker,
+            initargs=(self.memory.name, self.stop_event))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        """Stops the pool and releases the shared table"""
+
+        self.pool.terminate()
+        self.pool.join()
+        self.table = None
+        self.memory.close()
+        self.memory.unlink()
+
+    def search(self, position, depth=None, nodes=None, movetime=None):
+        """Searches position on every worker and returns the best result"""
+
+        self.table.new_search()
+        self.stop_event.clear()
+        limits = {"depth": depth, "nodes": nodes, "movetime": movetime}
+        start = time.perf_counter()
+        tasks = [self.pool.apply_async(_search_worker,
+            (position, worker_id, limits, self.table.generation))
+            for worker_id in range(self.workers)]
+
+        replies = [tasks[0].get()]
+        self.stop_event.set()
+        replies += [task.get() for task in tasks[1:]]
+        results = [result for (_, result, _) in replies]
+        for name in COUNTERS:
+            setattr(self.table, name, getattr(self.table, name) +
+                sum(counters[name] for (_, _, counters) in replies))
+
+        best = results[0]
+        for result in results[1:]:
+            if result.depth > best.depth and result.pv:
+                best = result
+        best.nodes = sum(result.nodes for result in results)
+        best.seconds = time.perf_counter() - start
+        return best
+
+
+def compare(position, depth, workers=None, hash_mb=DEFAULT_HASH_MB):
+    """Times a single process and a parallel search to the same depth"""
+
+    single = Search(position, max_depth=depth,
+        table=TranspositionTable(hash_mb)).run()
+    with ParallelSearch(workers, hash_mb) as parallel:
+        multi = parallel.search(position, depth=depth)
+        workers = parallel.workers
+    return {
+        "depth": depth,
+        "workers": workers,
+        "single": single.as_dict(),
+        "parallel": multi.as_dict(),
+        "speedup": round(single.seconds / multi.seconds, 3)
+            if multi.seconds else None,
+    }
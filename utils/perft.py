@@ -0,0 +1,87 @@
+"""Module contains perft node counting and the standard perft suite"""
+import time
+
+from utils.core import START_FEN, move_name
+from utils.position import Position
+
+# name: (fen, expected node counts from depth 1)
+PERFT_POSITIONS = {
+    "start": (START_FEN,
+        (20, 400, 8902, 197281, 4865609, 119060324)),
+    "kiwipete": (
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        (48, 2039, 97862, 4085603, 193690690)),
+    "position3": ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+        (14, 191, 2812, 43238, 674624, 11030083)),
+    "position4": (
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        (6, 264, 9467, 422333, 15833292)),
+    "position5": (
+        "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+        (44, 1486, 62379, 2103487, 89941194)),
+    "position6": (
+        "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 "
+        "w - - 0 10",
+        (46, 2079, 89890, 3894594, 164075551)),
+}
+
+
+def perft(position, depth):
+    """Counts leaf nodes of the legal move tree to depth"""
+
+    moves = position.generate_moves()
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+
+    nodes = 0
+    for move in moves:
+        position.make_move(move)
+        nodes += perft(position, depth - 1)
+        position.unmake_move()
+    return nodes
+
+
+def divide(position, depth):
+    """Returns leaf node counts below each root move"""
+
+    counts = {}
+    for move in position.generate_moves():
+        position.make_move(move)
+        counts[move_name(move)] = perft(position, depth - 1)
+        position.unmake_move()
+    return counts
+
+
+def run_perft(name, fen, depth, backend="bitboard", split=False):
+    """Runs perft on a position and returns a result record"""
+
+    position = Position(backend)
+    position.set_fen(fen)
+    start = time.perf_counter()
+    if split:
+        moves = divide(position, depth)
+        nodes = sum(moves.values())
+    else:
+        moves = None
+        nodes = perft(position, depth)
+    seconds = time.perf_counter() - start
+
+    expected = None
+    if name in PERFT_POSITIONS and \
+            1 <= depth <= len(PERFT_POSITIONS[name][1]):
+        expected = PERFT_POSITIONS[name][1][depth - 1]
+
+    result = {
+        "position": name,
+        "fen": fen,
+        "backend": backend,
+        "depth": depth,
+        "nodes": nodes,
+        "expected": expected,
+        "passed": expected is None or nodes == expected,
+        "seconds": round(seconds, 6),
+        "nps": int(nodes / seconds) if seconds else None,
+    }
+    if moves is not None:
+        result["divide"] = moves
+    return result
@@ -0,0 +1,362 @@
+"""Module contains streaming PGN reading and multiprocess game replay"""
+import collections
+import mmap
+import multiprocessing
+import os
+import re
+import time
+
+from utils.bitboard import (COL_MASKS, ROW_MASKS, PAWN_ATTACKS,
+    attackers_to, king_square, piece_attacks)
+from utils.core import (EMPTY, PAWN, KING, PIECE_LETTERS, SQUARE_NAMES,
+    encode_move, make_piece)
+from utils.position import Position, adjudicate
+from utils.tables import PAWN_PUSH, PAWN_START_ROW, PAWN_LAST_ROW
+
+BATCH_SIZE = 64  # games sent to a worker at a time
+BATCHES_PER_WORKER = 4  # batches in flight per worker, bounds memory use
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+RESULT_ENDINGS = tuple(f" {result}".encode() for result in RESULTS)
+SCORE_RESULTS = {1.0: "1-0", 0.0: "0-1", 0.5: "1/2-1/2"}
+FORCED_ENDINGS = ("checkmate", "stalemate")  # results a PGN must agree with
+
+TAG_RE = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+TOKEN_RE = re.compile(r"\{[^}]*\}?|;[^\n]*|\$\d+|[()]|1-0|0-1|1/2-1/2|\*"
+    r"|\d+\.+|[^\s{};()$]+")
+SAN_RE = re.compile(
+    r"([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$")
+SQUARES = {name: square for (square, name) in enumerate(SQUARE_NAMES)}
+CASTLES = {"O-O": 2, "0-0": 2, "O-O-O": -2, "0-0-0": -2}
+
+
+def split_games(source):
+    """Yields (byte offset, raw bytes) of every game in a path or file
+
+    Paths are memory mapped and binary file objects are read line by
+    line, so only the game being split is ever held in memory.
+    """
+
+    if not isinstance(source, (str, os.PathLike)):
+        yield from _split_lines(source)
+        return
+    with open(source, "rb") as handle:
+        if not os.fstat(handle.fileno()).st_size:
+            return
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield from _split_lines(data)
+
+
+def _split_lines(handle):
+    """Yields (byte offset, raw bytes) of games from a readline source
+
+    A game ends where the tag section of the next one starts after its
+    movetext, or after a line ending in a result, so games without tags
+    or blank lines still split. Lines inside a brace comment are movetext
+    whatever they start or end with.
+    """
+
+    (start, offset) = (0, 0)
+    lines = []
+    in_moves = ended = in_comment = False
+    for line in iter(handle.readline, b""):
+        stripped = line.strip()
+        if stripped and not in_comment and \
+                (ended or in_moves and stripped.startswith(b"[")):
+            yield (start, b"".join(lines))
+            lines = []
+            in_moves = ended = False
+        if not lines:
+            start = offset
+        offset += len(line)
+        if not stripped and not lines:
+            continue
+        if in_comment or stripped and \
+                not stripped.startswith((b"[", b"%")):
+            in_moves = True
+            in_comment = _comment_open(line, in_comment)
+            ended = not in_comment and stripped.endswith(RESULT_ENDINGS)
+        lines.append(line)
+    if lines:
+        yield (start, b"".join(lines))
+
+
+def _comment_open(line, in_comment):
+    """Returns whether a brace comment is still open after a line"""
+
+    position = 0
+    while True:
+        if in_comment:
+            position = line.find(b"}", position)
+            if position < 0:
+                return True
+            in_comment = False
+        else:
+            brace = line.find(b"{", position)
+            if brace < 0 or b";" in line[position:brace]:
+                return False  # a semicolon comments out the rest of the line
+            (position, in_comment) = (brace, True)
+        position += 1
+
+
+def parse_game(text):
+    """Returns tags, SAN moves and the result token of one game's text"""
+
+    tags = {}
+    body = []
+    for line in text.splitlines():
+        if line.lstrip().startswith("[") and not body:
+            tags.update(TAG_RE.findall(line))
+        elif not line.startswith("%"):
+            body.append(line)
+
+    moves = []
+    result = None
+    depth = 0
+    for token in TOKEN_RE.findall("\n".join(body)):
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth = max(depth - 1, 0)
+        elif depth or token[0] in "{;$" or token[0].isdigit() and \
+                token.endswith("."):
+            continue
+        elif token in RESULTS:
+            result = token
+        else:
+            moves.append(token)
+    return (tags, moves, result)
+
+
+def decode_san(position, san):
+    """Returns the legal move written in standard algebraic notation
+
+    Only pieces of the named type that attack or push to the target are
+    tried, each checked for legality by making it, which is far cheaper
+    than generating every legal move. Raises ValueError when the text is
+    not SAN or names no legal move, or names more than one.
+    """
+
+    token = san.rstrip("+#!?")
+    if token in CASTLES:
+        return _decode_castle(position, san, CASTLES[token])
+    match = SAN_RE.match(token)
+    if match is None:
+        raise ValueError(f"Bad SAN {san!r}")
+    (letter, file, rank, target, promotion) = match.groups()
+    color = position.turn
+    piece = make_piece(color, PIECE_LETTERS.index(letter.lower())
+        if letter else PAWN)
+    to_square = SQUARES[target]
+    promotion = PIECE_LETTERS.index(promotion.lower()) if promotion else EMPTY
+    if (piece & 7 == PAWN and to_square >> 3 == PAWN_LAST_ROW[color]) != \
+            bool(promotion):
+        raise ValueError(f"Illegal move {san!r}")
+
+    origins = _san_origins(position, piece, to_square, bool(file))
+    if file:
+        origins &= COL_MASKS["abcdefgh".index(file)]
+    if rank:
+        origins &= ROW_MASKS[8 - int(rank)]
+    found = []
+    while origins:
+        from_square = (origins & -origins).bit_length() - 1
+        origins &= origins - 1
+        move = encode_move(from_square, to_square, promotion)
+        if _is_legal(position, move):
+            found.append(move)
+    if len(found) != 1:
+        raise ValueError(f"{'Ambiguous' if found else 'Illegal'} move "
+            f"{san!r}")
+    return found[0]
+
+
+def _san_origins(position, piece, to_square, capture):
+    """Returns squares holding piece that could move to to_square"""
+
+    color = piece >> 3
+    target = position.board[to_square]
+    if target and target >> 3 == color:
+        return 0
+    if piece & 7 != PAWN:
+        return position.bitboards[piece] & piece_attacks(piece & 7, color,
+            to_square, position.occupied)
+    if capture:
+        if not target and to_square != position.ep:
+            return 0
+        return position.bitboards[piece] & PAWN_ATTACKS[color ^ 1][to_square]
+    if target:
+        return 0
+    origin = to_square - PAWN_PUSH[color]
+    if position.board[origin] == piece:
+        return 1 << origin
+    if not position.board[origin] and \
+            position.board[origin - PAWN_PUSH[color]] == piece and \
+            (origin - PAWN_PUSH[color]) >> 3 == PAWN_START_ROW[color]:
+        return 1 << (origin - PAWN_PUSH[color])
+    return 0
+
+
+def _is_legal(position, move):
+    """Returns true if a pseudo legal move leaves its own king safe"""
+
+    color = position.turn
+    position.make_move(move)
+    try:
+        return not attackers_to(position, king_square(position, color),
+            color ^ 1, position.occupied)
+    finally:
+        position.unmake_move()
+
+
+def _decode_castle(position, san, step):
+    """Returns the legal castling move two squares along step"""
+
+    board = position.board
+    for move in position.generate_moves():
+        from_square = move & 63
+        if board[from_square] & 7 == KING and \
+                (move >> 6) & 63 == from_square + step:
+            return move
+    raise ValueError(f"Illegal move {san!r}")
+
+
+def replay_game(index, offset, raw):
+    """Replays one game through the rules and returns its record"""
+
+    (tags, moves, result) = parse_game(raw.decode("utf-8", "replace"))
+    record = {
+        "game": index,
+        "offset": offset,
+        "white": tags.get("White"),
+        "black": tags.get("Black"),
+        "result": tags.get("Result", result),
+        "plies": 0,
+    }
+    position = Position("bitboard")
+    try:
+        if tags.get("FEN"):
+            position.set_fen(tags["FEN"])
+        elif tags.get("SetUp") == "1":
+            raise ValueError("SetUp tag without a FEN tag")
+        for san in moves:
+            position.make_move(decode_san(position, san))
+            record["plies"] += 1
+    except ValueError as error:
+        record.update(status="error", error=str(error),
+            ply=record["plies"] + 1)
+        return record
+
+    (score, ending) = adjudicate(position) or (None, None)
+    record.update(status="ok", ending=ending, fen=position.fen())
+    if ending in FORCED_ENDINGS and \
+            record["result"] not in ("*", SCORE_RESULTS[score]):
+        record.update(status="error",
+            error=f"Result {record['result']} after {ending}")
+    return record
+
+
+def replay_batch(batch):
+    """Replays a list of (index, offset, raw) games in one worker"""
+
+    return [replay_game(*game) for game in batch]
+
+
+def game_batches(source, batch_size):
+    """Yields numbered games from source in lists of batch_size"""
+
+    batch = []
+    for (index, (offset, raw)) in enumerate(split_games(source), 1):
+        batch.append((index, offset, raw))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class ReplayStats:
+    """Game, error, ply and byte counts with throughput"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.games = self.errors = self.plies = self.bytes = 0
+        self.endings = {}
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+
+    def add(self, record, size):
+        """Counts one replayed game of size bytes"""
+
+        self.games += 1
+        self.plies += record["plies"]
+        self.bytes += size
+        if record["status"] == "error":
+            self.errors += 1
+        elif record["ending"]:
+            self.endings[record["ending"]] = \
+                self.endings.get(record["ending"], 0) + 1
+        self.seconds = time.perf_counter() - self.start
+
+    def as_dict(self):
+        """Returns counts and throughput figures"""
+
+        seconds = self.seconds
+        return {
+            "games": self.games,
+            "errors": self.errors,
+            "plies": self.plies,
+            "endings": self.endings,
+            "workers": self.workers,
+            "seconds": round(seconds, 6),
+            "games_per_second": round(self.games / seconds, 2)
+                if seconds else 0,
+            "plies_per_second": int(self.plies / seconds) if seconds else 0,
+            "megabytes_per_second": round(self.bytes / seconds / 2 ** 20, 3)
+                if seconds else 0,
+        }
+
+
+def map_batches(source, function, workers=None, batch_size=BATCH_SIZE):
+    """Yields (batch, function(batch)) for game batches in file order
+
+    Batches are submitted only while fewer than BATCHES_PER_WORKER per
+    worker are in flight, so reading never runs ahead of the pool and
+    memory stays flat however large the archive is.
+    """
+
+    workers = workers or os.cpu_count() or 1
+    batches = game_batches(source, batch_size)
+    if workers == 1:
+        for batch in batches:
+            yield (batch, function(batch))
+        return
+
+    with multiprocessing.Pool(workers) as pool:
+        pending = collections.deque()
+        for batch in batches:
+            pending.append((batch, pool.apply_async(function, (batch,))))
+            if len(pending) >= workers * BATCHES_PER_WORKER:
+                (done, result) = pending.popleft()
+                yield (done, result.get())
+        while pending:
+            (done, result) = pending.popleft()
+            yield (done, result.get())
+
+
+def replay_pgn(source, workers=None, batch_size=BATCH_SIZE, stats=None):
+    """Yields game records in file order, replaying across a process pool"""
+
+    workers = workers or os.cpu_count() or 1
+    stats = stats or ReplayStats(workers)
+    stats.workers = workers
+    for (batch, records) in map_batches(source, replay_batch, workers,
+            batch_size):
+        yield from _counted(batch, records, stats)
+
+
+def _counted(batch, records, stats):
+    """Yields records of a batch after counting them in stats"""
+
+    for ((_, _, raw), record) in zip(batch, records):
+        stats.add(record, len(raw))
+        yield record
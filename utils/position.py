@@ -0,0 +1,380 @@
+"""Module contains headless game state with mailbox lookups"""
+from utils import bitboard, mailbox
+from utils.core import (WHITE, BLACK, EMPTY, PAWN, KNIGHT, BISHOP, ROOK,
+    QUEEN, KING, NO_SQUARE, PIECE_LETTERS, CASTLING_LETTERS, SQUARE_NAMES,
+    START_FEN, make_piece, piece_color, square_index, square_coords)
+from utils.tables import (PAWN_PUSH, CASTLING_MOVES, CASTLING_ROOKS,
+    CASTLING_MASKS, LIGHT_SQUARES)
+from utils.zobrist import PIECE_KEYS, SIDE_KEY, CASTLING_KEYS, ep_key
+
+FEN_PIECES = {(letter.upper() if color == WHITE else letter):
+    make_piece(color, kind) for color in (WHITE, BLACK)
+    for (kind, letter) in enumerate(PIECE_LETTERS) if kind}
+FEN_LETTERS = {piece: letter for (letter, piece) in FEN_PIECES.items()}
+FEN_SKIPS = {str(count): count for count in range(1, 9)}
+EMPTY_BOARD = bytes(64)
+EMPTY_BITBOARDS = (0,) * 16
+BACK_RANKS = 0xff | 0xff << 56  # rank 8 and rank 1, where pawns never stand
+EP_ROWS = (2, 5)  # en passant squares are on rank 6 or rank 3 by side to move
+
+MOVEGEN_BACKENDS = {
+    "mailbox": mailbox,
+    "bitboard": bitboard,
+}
+
+
+class Position:
+    """Headless game state backed by a mailbox and bitboards
+
+    Instances use __slots__ and keep the mailbox in a bytearray, so large
+    numbers of positions can be held in memory for analysis.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    __slots__ = ("backend", "movegen", "board", "bitboards", "colors",
+        "occupied", "turn", "castling", "ep", "halfmove", "fullmove", "key",
+        "history")
+
+    def __init__(self, backend="mailbox"):
+        if backend not in MOVEGEN_BACKENDS:
+            raise ValueError(f"Unknown move generation backend: {backend}")
+        self.backend = backend
+        self.movegen = MOVEGEN_BACKENDS[backend]
+        self.board = bytearray(64)
+        self.bitboards = [0] * 16
+        self.colors = [0, 0]
+        self.occupied = 0
+        self.turn = WHITE
+        self.castling = 0
+        self.ep = NO_SQUARE
+        self.halfmove = 0
+        self.fullmove = 1
+        self.key = 0
+        self.history = []
+        self.setup()
+
+    def __getstate__(self):
+        # modules cannot be pickled, so movegen is rebuilt from backend
+        return {name: getattr(self, name) for name in self.__slots__
+            if name != "movegen"}
+
+    def __setstate__(self, state):
+        for (name, value) in state.items():
+            setattr(self, name, value)
+        self.movegen = MOVEGEN_BACKENDS[self.backend]
+
+    def copy(self):
+        """Returns an independent copy of the position"""
+
+        state = self.__getstate__()
+        for name in ("board", "bitboards", "colors", "history"):
+            state[name] = state[name].copy()
+        position = Position.__new__(Position)
+        position.__setstate__(state)
+        return position
+
+    def setup(self):
+        """Places pieces in the starting position"""
+
+        self.set_fen(START_FEN)
+
+    def set_fen(self, fen):
+        """Sets up the position described by a FEN string"""
+
+        fields = fen.split()
+        if len(fields) == 4:
+            fields += ["0", "1"]
+        if len(fields) != 6:
+            raise ValueError(f"FEN needs 4 or 6 fields: {fen!r}")
+        (placement, turn, castling, ep, halfmove, fullmove) = fields
+
+        rows = placement.split("/")
+        if len(rows) != 8:
+            raise ValueError(f"FEN needs 8 rows: {fen!r}")
+
+        self.clear()
+        for (row, text) in enumerate(rows):
+            square = row << 3
+            end = square + 8
+            for char in text:
+                if char in FEN_SKIPS:
+                    square += FEN_SKIPS[char]
+                    continue
+                piece = FEN_PIECES.get(char)
+                if piece is None or square >= end:
+                    raise ValueError(f"Bad FEN row {text!r}: {fen!r}")
+                self.put_piece(square, piece)
+                square += 1
+            if square != end:
+                raise ValueError(f"Bad FEN row {text!r}: {fen!r}")
+
+        for color in (WHITE, BLACK):
+            if self.bitboards[make_piece(color, KING)].bit_count() != 1:
+                raise ValueError(f"FEN needs one king per side: {fen!r}")
+            if self.bitboards[make_piece(color, PAWN)] & BACK_RANKS:
+                raise ValueError("FEN has a pawn on the first or last "
+                    f"rank: {fen!r}")
+
+        if turn not in ("w", "b"):
+            raise ValueError(f"Bad FEN side to move {turn!r}: {fen!r}")
+        self.turn = WHITE if turn == "w" else BLACK
+        for (letter, right) in CASTLING_LETTERS:
+            if letter in castling:
+                self.castling |= right
+        for (color, rules) in enumerate(CASTLING_MOVES):
+            for (right, king, _, rook, _, _, _) in rules:
+                if self.board[king] != make_piece(color, KING) or \
+                        self.board[rook] != make_piece(color, ROOK):
+                    self.castling &= ~right  # king or rook has moved
+        if ep != "-":
+            if ep not in SQUARE_NAMES or not self.double_pushed(
+                    SQUARE_NAMES.index(ep)):
+                raise ValueError(f"Bad FEN en passant square {ep!r}: {fen!r}")
+            self.ep = SQUARE_NAMES.index(ep)
+        if bitboard.attackers_to(self, bitboard.king_square(self,
+                self.turn ^ 1), self.turn, self.occupied):
+            raise ValueError(f"FEN side not to move is in check: {fen!r}")
+        self.halfmove = int(halfmove)
+        self.fullmove = int(fullmove)
+        # put_piece has already hashed the pieces
+        self.key ^= ((SIDE_KEY if self.turn else 0)
+            ^ CASTLING_KEYS[self.castling] ^ ep_key(self.ep))
+
+    def double_pushed(self, square):
+        """Returns true if an enemy pawn can just have passed over square
+
+        The square must be on the rank behind an enemy pawn that stands
+        on its double push square, with the square it left empty.
+        """
+
+        push = PAWN_PUSH[self.turn]
+        return square >> 3 == EP_ROWS[self.turn] and \
+            self.board[square - push] == make_piece(self.turn ^ 1, PAWN) \
+            and not self.board[square] and not self.board[square + push]
+
+    def clear(self):
+        """Removes every piece from the position and resets state
+
+        The mailbox and bitboard buffers are emptied in place, so setting
+        up many positions in a row on one object allocates nothing new.
+        """
+
+        self.board[:] = EMPTY_BOARD
+        self.bitboards[:] = EMPTY_BITBOARDS
+        self.colors[:] = (0, 0)
+        self.occupied = 0
+        self.turn = WHITE
+        self.castling = 0
+        self.ep = NO_SQUARE
+        self.halfmove = 0
+        self.fullmove = 1
+        self.key = 0
+        self.history.clear()
+
+    def fen(self):
+        """Returns the FEN string describing the position"""
+
+        rows = []
+        board = self.board
+        for start in range(0, 64, 8):
+            text = ""
+            empty = 0
+            for piece in board[start:start + 8]:
+                if not piece:
+                    empty += 1
+                    continue
+                if empty:
+                    text += str(empty)
+                    empty = 0
+                text += FEN_LETTERS[piece]
+            rows.append(text + str(empty) if empty else text)
+        castling = "".join(letter for (letter, right) in CASTLING_LETTERS
+            if self.castling & right) or "-"
+        ep = SQUARE_NAMES[self.ep] if self.ep != NO_SQUARE else "-"
+        return (f"{'/'.join(rows)} {'wb'[self.turn]} {castling} {ep} "
+            f"{self.halfmove} {self.fullmove}")
+
+    def put_piece(self, square, piece):
+        """Places piece on an empty square"""
+
+        bit = 1 << square
+        self.board[square] = piece
+        self.bitboards[piece] |= bit
+        self.colors[piece_color(piece)] |= bit
+        self.occupied |= bit
+        self.key ^= PIECE_KEYS[piece][square]
+
+    def take_piece(self, square):
+        """Removes and returns piece on an occupied square"""
+
+        bit = 1 << square
+        piece = self.board[square]
+        self.board[square] = EMPTY
+        self.bitboards[piece] ^= bit
+        self.colors[piece_color(piece)] ^= bit
+        self.occupied ^= bit
+        self.key ^= PIECE_KEYS[piece][square]
+        return piece
+
+    def piece_at(self, row, col):
+        """Returns piece code on square or EMPTY"""
+
+        return self.board[square_index(row, col)]
+
+    def make_move(self, move):
+        """Plays a legal move, pushing undo state, and returns the capture"""
+
+        from_square = move & 63
+        to_square = (move >> 6) & 63
+        color = self.turn
+        piece = self.board[from_square]
+        kind = piece & 7
+
+        captured_square = to_square
+        if kind == PAWN and to_square == self.ep:
+            captured_square = to_square - PAWN_PUSH[color]
+        captured = self.board[captured_square]
+        self.history.append((move, captured, self.castling, self.ep,
+            self.halfmove, self.key))
+        self.take_piece(from_square)
+
+        if captured:
+            self.take_piece(captured_square)
+            self.halfmove = 0
+        elif kind == PAWN:
+            self.halfmove = 0
+        else:
+            self.halfmove += 1
+
+        if move >> 12:
+            piece = make_piece(color, move >> 12)
+        elif kind == KING and abs(to_square - from_square) == 2:
+            (rook_from, rook_to) = CASTLING_ROOKS[to_square]
+            self.put_piece(rook_to, self.take_piece(rook_from))
+        self.put_piece(to_square, piece)
+
+        key = (self.key ^ SIDE_KEY ^ ep_key(self.ep)
+            ^ CASTLING_KEYS[self.castling])
+        if kind == PAWN and abs(to_square - from_square) == 16:
+            self.ep = (from_square + to_square) >> 1
+        else:
+            self.ep = NO_SQUARE
+        self.castling &= CASTLING_MASKS[from_square] & CASTLING_MASKS[to_square]
+        self.key = key ^ ep_key(self.ep) ^ CASTLING_KEYS[self.castling]
+        if color == BLACK:
+            self.fullmove += 1
+        self.turn = color ^ 1
+        return captured
+
+    def unmake_move(self):
+        """Takes back the last move from the undo stack and returns it"""
+
+        (move, captured, self.castling, self.ep, self.halfmove, key) = \
+            self.history.pop()
+        from_square = move & 63
+        to_square = (move >> 6) & 63
+        color = self.turn ^ 1
+        self.turn = color
+        if color == BLACK:
+            self.fullmove -= 1
+
+        piece = self.take_piece(to_square)
+        if move >> 12:
+            piece = make_piece(color, PAWN)
+        self.put_piece(from_square, piece)
+
+        kind = piece & 7
+        if kind == PAWN and to_square == self.ep:
+            self.put_piece(to_square - PAWN_PUSH[color], captured)
+        elif captured:
+            self.put_piece(to_square, captured)
+        elif kind == KING and abs(to_square - from_square) == 2:
+            (rook_from, rook_to) = CASTLING_ROOKS[to_square]
+            self.put_piece(rook_from, self.take_piece(rook_to))
+        self.key = key
+        return move
+
+    def repetitions(self):
+        """Counts earlier occurrences of the current position
+
+        Only positions since the last capture or pawn move can repeat, so
+        the scan stops at the halfmove clock.
+        """
+
+        count = 0
+        history = self.history
+        stop = max(len(history) - self.halfmove, 0)
+        for index in range(len(history) - 2, stop - 1, -2):
+            if history[index][5] == self.key:
+                count += 1
+        return count
+
+    def insufficient_material(self):
+        """Returns true if neither side has material left to mate with
+
+        That is bare kings, a single minor piece, or only bishops that all
+        stand on squares of one color.
+        """
+
+        bitboards = self.bitboards
+        for kind in (PAWN, ROOK, QUEEN):
+            if bitboards[kind] or bitboards[8 | kind]:
+                return False
+        knights = bitboards[KNIGHT] | bitboards[8 | KNIGHT]
+        bishops = bitboards[BISHOP] | bitboards[8 | BISHOP]
+        if (knights | bishops).bit_count() <= 1:
+            return True
+        return not knights and (not bishops & LIGHT_SQUARES
+            or bishops & LIGHT_SQUARES == bishops)
+
+    def generate_moves(self, captures_only=False):
+        """Returns legal moves, or only captures and promotions"""
+
+        return self.movegen.generate_moves(self, captures_only)
+
+    def get_valid_moves(self, row, col):
+        """Returns legal destination coordinates for piece on square"""
+
+        square = square_index(row, col)
+        return [square_coords((move >> 6) & 63)
+            for move in self.generate_moves() if move & 63 == square]
+
+    def find_move(self, from_square, to_square, promotion=QUEEN):
+        """Returns legal move between squares or None, promoting to queen"""
+
+        for move in self.generate_moves():
+            if move & 63 == from_square and (move >> 6) & 63 == to_square:
+                if move >> 12 in (EMPTY, promotion):
+                    return move
+        return None
+
+    def in_check(self):
+        """Returns true if the side to move is in check"""
+
+        king = bitboard.king_square(self, self.turn)
+        return bool(bitboard.attackers_to(self, king, self.turn ^ 1,
+            self.occupied))
+
+    def pieces(self):
+        """Yields square and piece code for every occupied square"""
+
+        for square in range(64):
+            if self.board[square]:
+                yield (square, self.board[square])
+
+
+def adjudicate(position):
+    """Returns (white score, reason) if the game is over, else None"""
+
+    if not position.generate_moves():
+        if position.in_check():
+            return (0.0 if position.turn == 0 else 1.0, "checkmate")
+        return (0.5, "stalemate")
+    if position.halfmove >= 100:
+        return (0.5, "fifty moves")
+    if position.repetitions() >= 2:
+        return (0.5, "repetition")
+    if position.insufficient_material():
+        return (0.5, "insufficient material")
+    return None
@@ -0,0 +1,19 @@
+"""Module contains JSON report writing shared by the command line tools"""
+import json
+import sys
+
+
+def write_report(report, output):
+    """Writes report as indented JSON to a path, or to stdout for "-"
+
+    Nothing is written when output is empty, so an unset --output option
+    can be passed straight through.
+    """
+
+    if output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif output:
+        with open(output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+            handle.write("\n")
@@ -0,0 +1,360 @@
+"""Module contains alpha-beta search with iterative deepening"""
+import time
+
+from utils.core import EMPTY, PAWN, move_name
+from utils.evaluate import PIECE_VALUES, evaluate
+from utils.transposition import (EXACT, LOWER, UPPER, DEFAULT_HASH_MB,
+    TranspositionTable)
+
+MATE = 100000
+MATE_BOUND = MATE - 1000
+INFINITY = MATE + 1
+MAX_PLY = 64
+
+HASH_MOVE_SCORE = 1 << 20
+CAPTURE_SCORE = 1 << 18
+PROMOTION_SCORE = 1 << 17
+KILLER_SCORES = (1 << 16, (1 << 16) - 1)
+HISTORY_LIMIT = (1 << 16) - 2
+DELTA_MARGIN = 200
+CHECK_INTERVAL = 1023  # nodes between clock and stop flag checks
+
+
+class SearchAborted(Exception):
+    """Raised inside the tree when a node or time limit is reached"""
+
+
+class SearchResult:
+    """Best move, score and principal variation of a finished search"""
+
+    # pylint: disable=too-many-arguments
+
+    def __init__(self, move, score, pv, depth, nodes, seconds, book=False,
+            tablebase=False):
+        self.move = move
+        self.score = score
+        self.pv = pv
+        self.depth = depth
+        self.nodes = nodes
+        self.seconds = seconds
+        self.book = book
+        self.tablebase = tablebase
+
+    def __str__(self):
+        return (f"depth {self.depth} score {self.score} nodes {self.nodes} "
+            f"pv {' '.join(move_name(move) for move in self.pv)}")
+
+    @property
+    def nps(self):
+        """Nodes searched per second"""
+
+        return int(self.nodes / self.seconds) if self.seconds else 0
+
+    @property
+    def mate_in(self):
+        """Moves until mate, negative when being mated, or None"""
+
+        if abs(self.score) < MATE_BOUND:
+            return None
+        plies = MATE - abs(self.score)
+        moves = (plies + 1) // 2
+        return moves if self.score > 0 else -moves
+
+    def as_dict(self):
+        """Returns result as a JSON friendly dict"""
+
+        return {
+            "move": move_name(self.move) if self.move else None,
+            "score": self.score,
+            "mate": self.mate_in,
+            "pv": [move_name(move) for move in self.pv],
+            "depth": self.depth,
+            "nodes": self.nodes,
+            "seconds": round(self.seconds, 6),
+            "nps": self.nps,
+            "book": self.book,
+            "tablebase": self.tablebase,
+        }
+
+
+class Search:
+    """Negamax alpha-beta search with quiescence and move ordering"""
+
+    # pylint: disable=too-many-instance-attributes
+    # pylint: disable=too-many-arguments
+
+    def __init__(self, position, max_depth=MAX_PLY, max_nodes=None,
+            max_time=None, on_info=None, table=None, stop_event=None,
+            start_depth=1, book=None, tablebases=None):
+        self.position = position
+        self.book = book
+        self.tablebases = tablebases
+        self.start_depth = start_depth
+        self.stop_event = stop_event
+        self.table = table or TranspositionTable(DEFAULT_HASH_MB)
+        self.max_depth = MAX_PLY if max_depth is None else \
+            min(max(max_depth, 1), MAX_PLY)
+        self.max_nodes = max_nodes
+        self.max_time = max_time
+        self.on_info = on_info
+        self.nodes = 0
+        self.deadline = None
+        self.stopped = False
+        self.pv_table = [[] for _ in range(MAX_PLY + 2)]
+        self.killers = [[0, 0] for _ in range(MAX_PLY + 2)]
+        self.history_scores = [0] * 4096
+
+    def stop(self):
+        """Asks a running search to return as soon as possible"""
+
+        self.stopped = True
+
+    def run(self):
+        """Deepens the search until a limit is hit and returns the result"""
+
+        start = time.perf_counter()
+        if self.max_time is not None:
+            self.deadline = start + self.max_time
+        self.nodes = 0
+        self.stopped = False
+        self.table.new_search()
+        root_ply = len(self.position.history)
+
+        moves = self.position.generate_moves()
+        if not moves:
+            score = -MATE if self.position.in_check() else 0
+            return SearchResult(None, score, [], 0, 0, 0.0)
+        if self.book is not None:
+            move = self.book.choose(self.position)
+            if move is not None:
+                return SearchResult(move, 0, [move], 0, 0,
+                    time.perf_counter() - start, book=True)
+        if self.tablebases is not None and self.position.occupied.bit_count() \
+                <= self.tablebases.max_pieces:
+            best = self.tablebases.best_move(self.position, MATE)
+            if best is not None:
+                pv = self.tablebases.line(self.position, MATE) or [best[0]]
+                return SearchResult(best[0], best[1], pv, len(pv), len(moves),
+                    time.perf_counter() - start, tablebase=True)
+
+        result = SearchResult(self.order_moves(moves, 0, 0)[0], 0, [], 0, 0, 0.0)
+        for depth in range(min(self.start_depth, self.max_depth),
+                self.max_depth + 1):
+            try:
+                score = self.negamax(depth, -INFINITY, INFINITY, 0)
+            except SearchAborted:
+                while len(self.position.history) > root_ply:
+                    self.position.unmake_move()
+                break
+
+            pv = list(self.pv_table[0])
+            result = SearchResult(pv[0], score, pv, depth, self.nodes,
+                time.perf_counter() - start)
+            if self.on_info:
+                self.on_info(result)
+            if abs(score) >= MATE_BOUND or len(moves) == 1:
+                break
+
+        result.nodes = self.nodes
+        result.seconds = time.perf_counter() - start
+        return result
+
+    def count_node(self):
+        """Counts a node and aborts the search when a limit is hit"""
+
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            raise SearchAborted()
+        if not self.nodes & CHECK_INTERVAL:
+            if self.stopped or (self.stop_event and self.stop_event.is_set()):
+                raise SearchAborted()
+            if self.deadline is not None and time.perf_counter() >= self.deadline:
+                raise SearchAborted()
+
+    def negamax(self, depth, alpha, beta, ply):
+        """Returns score of the position searched to depth"""
+
+        position = self.position
+        self.pv_table[ply] = []
+        if ply and self.tablebases is not None and \
+                position.occupied.bit_count() <= self.tablebases.max_pieces:
+            score = self.tablebases.score(position, ply, MATE)
+            if score is not None:
+                return score
+        if depth <= 0:
+            return self.quiesce(alpha, beta, ply)
+
+        self.count_node()
+        if ply and (position.halfmove >= 100 or position.repetitions()):
+            return 0
+
+        hash_move = 0
+        entry = self.table.probe(position.key)
+        if entry:
+            (hash_move, entry_depth, score, bound) = entry
+            if ply and entry_depth >= depth:
+                score = score_from_table(score, ply)
+                if (bound == EXACT or (bound == LOWER and score >= beta)
+                        or (bound == UPPER and score <= alpha)):
+                    return score
+
+        in_check = position.in_check()
+        moves = position.generate_moves()
+        if not moves:
+            return -MATE + ply if in_check else 0
+        if ply >= MAX_PLY:
+            return evaluate(position)
+        if in_check:
+            depth += 1
+
+        original_alpha = alpha
+        best = -INFINITY
+        best_move = 0
+        for move in self.order_moves(moves, ply, hash_move):
+            quiet = self.is_quiet(move)
+            position.make_move(move)
+            score = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            position.unmake_move()
+
+            if score > best:
+                best = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+                self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+                if alpha >= beta:
+                    if quiet:
+                        self.update_quiet_stats(move, depth, ply)
+                    break
+
+        if best >= beta:
+            bound = LOWER
+        elif best > original_alpha:
+            bound = EXACT
+        else:
+            bound = UPPER
+            best_move = 0
+        self.table.store(position.key, best_move, depth,
+            score_to_table(best, ply), bound)
+        return best
+
+    def quiesce(self, alpha, beta, ply):
+        """Searches captures until the position is quiet"""
+
+        position = self.position
+        self.count_node()
+        self.pv_table[ply] = []
+
+        if ply >= MAX_PLY:
+            return evaluate(position)
+
+        best = -INFINITY
+        if position.in_check():
+            moves = position.generate_moves()
+            if not moves:
+                return -MATE + ply
+        else:
+            best = evaluate(position)
+            if best >= beta:
+                return best
+            alpha = max(alpha, best)
+            moves = position.generate_moves(captures_only=True)
+
+        for move in self.order_moves(moves, ply, 0):
+            if best > -INFINITY and not move >> 12:
+                # delta pruning: skip captures that cannot raise alpha
+                victim = position.board[(move >> 6) & 63] & 7 or PAWN
+                if best + PIECE_VALUES[victim] + DELTA_MARGIN <= alpha:
+                    continue
+            position.make_move(move)
+            score = -self.quiesce(-beta, -alpha, ply + 1)
+            position.unmake_move()
+
+            if score > best:
+                best = score
+            if score > alpha:
+                alpha = score
+                self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+                if alpha >= beta:
+                    break
+        return best
+
+    def is_quiet(self, move):
+        """Returns true if move neither captures nor promotes"""
+
+        position = self.position
+        to_square = (move >> 6) & 63
+        if move >> 12 or position.board[to_square] != EMPTY:
+            return False
+        return not (to_square == position.ep
+            and position.board[move & 63] & 7 == PAWN)
+
+    def order_moves(self, moves, ply, hash_move):
+        """Sorts moves by hash move, MVV-LVA, killers and history"""
+
+        board = self.position.board
+        killers = self.killers[ply]
+        history = self.history_scores
+        scored = []
+        for move in moves:
+            if move == hash_move:
+                score = HASH_MOVE_SCORE
+            elif not self.is_quiet(move):
+                victim = board[(move >> 6) & 63] & 7
+                if victim or not move >> 12:
+                    attacker = board[move & 63] & 7
+                    score = CAPTURE_SCORE + (victim or PAWN) * 8 - attacker
+                else:
+                    score = PROMOTION_SCORE
+                score += move >> 12
+            elif move == killers[0]:
+                score = KILLER_SCORES[0]
+            elif move == killers[1]:
+                score = KILLER_SCORES[1]
+            else:
+                score = history[move & 4095]
+            scored.append((score, move))
+        scored.sort(reverse=True)
+        return [move for (_, move) in scored]
+
+    def update_quiet_stats(self, move, depth, ply):
+        """Records a quiet move that caused a beta cutoff"""
+
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        index = move & 4095
+        self.history_scores[index] = min(
+            self.history_scores[index] + depth * depth, HISTORY_LIMIT)
+
+
+def score_to_table(score, ply):
+    """Converts mate scores to distance from the stored node"""
+
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_table(score, ply):
+    """Converts stored mate scores back to distance from the root"""
+
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+
+def search(position, depth=None, nodes=None, movetime=None, on_info=None,
+        table=None, book=None, tablebases=None):
+    """Searches position within the given limits and returns the result"""
+
+    # pylint: disable=too-many-arguments
+
+    return Search(position, max_depth=depth, max_nodes=nodes,
+        max_time=movetime, on_info=on_info, table=table, book=book,
+        tablebases=tablebases).run()
@@ -0,0 +1,390 @@
+"""Module contains an asyncio JSON lines server hosting headless games"""
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.core import PIECE_LETTERS, SQUARE_NAMES, move_name
+from utils.game import Game
+
+LATENCY_SAMPLES = 1024  # most recent requests kept per game for percentiles
+STREAM_LIMIT = 1 << 16  # longest request line, asyncio's default limit
+
+
+class ProtocolError(Exception):
+    """Raised for malformed, unknown or illegal requests"""
+
+
+class LatencyStats:
+    """Request count, mean, percentiles and worst case of handling time"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+        self.samples = deque(maxlen=LATENCY_SAMPLES)
+
+    def add(self, seconds):
+        """Records the handling time of one request"""
+
+        self.count += 1
+        self.total += seconds
+        self.worst = max(self.worst, seconds)
+        self.samples.append(seconds)
+
+    def percentile(self, fraction):
+        """Returns the given percentile of recent samples in seconds"""
+
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+    def as_dict(self):
+        """Returns latency figures in milliseconds"""
+
+        return {
+            "requests": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 4)
+                if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.5) * 1000, 4),
+            "p99_ms": round(self.percentile(0.99) * 1000, 4),
+            "max_ms": round(self.worst * 1000, 4),
+        }
+
+
+def parse_move(name):
+    """Returns origin square and destination coordinates of a move name"""
+
+    if not isinstance(name, str) or len(name) not in (4, 5):
+        raise ProtocolError(f"Bad move {name!r}, expected e.g. e2e4")
+    if name[:2] not in SQUARE_NAMES or name[2:4] not in SQUARE_NAMES:
+        raise ProtocolError(f"Bad move {name!r}, expected e.g. e2e4")
+    if name[4:] not in ("", "q"):
+        raise ProtocolError(f"Only queen promotions are supported: {name!r}")
+    to_square = SQUARE_NAMES.index(name[2:4])
+    return (SQUARE_NAMES.index(name[:2]), (to_square >> 3, to_square & 7))
+
+
+async def read_line(reader):
+    """Returns the next request line, b"" at end of stream, or None
+
+    None means the line was longer than the stream limit. The rest of it
+    is read and dropped, so the next request starts on a fresh line.
+    """
+
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as error:
+        return error.partial  # a last line without a newline
+    except asyncio.LimitOverrunError:
+        pass
+    while True:
+        try:
+            await reader.readuntil(b"\n")
+            return None
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError as error:
+            await reader.readexactly(error.consumed)
+
+
+def game_status(game):
+    """Returns playing, checkmate or stalemate"""
+
+    if not game.over:
+        return "playing"
+    return "checkmate" if game.position.in_check() else "stalemate"
+
+
+def legal_names(game):
+    """Returns coordinate names of the game's legal moves"""
+
+    return sorted(move_name(move) for targets in game.move_map.values()
+        for move in targets.values())
+
+
+class GameServer:
+    """Hosts many games and answers JSON lines requests about them
+
+    Each request is one JSON object per line with an "op" field and an
+    optional "id" echoed in the response. Moves are played on a thread
+    pool under a per-game lock, so generating the next side's moves never
+    runs on the event loop and requests for one game stay ordered.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, backend="mailbox", workers=None):
+        self.backend = backend
+        self.games = {}
+        self.locks = {}
+        self.latency = {}
+        self.total = LatencyStats()
+        self.ids = itertools.count(1)
+        self.connections = 0
+        self.executor = ThreadPoolExecutor(workers)
+        self.handlers = {
+            "new": self.op_new,
+            "move": self.op_move,
+            "state": self.op_state,
+            "close": self.op_close,
+            "stats": self.op_stats,
+        }
+
+    async def serve(self, host="127.0.0.1", port=8765, path=None):
+        """Starts listening on a unix socket path or a TCP port"""
+
+        if path:
+            return await asyncio.start_unix_server(self.handle_connection,
+                path=path, limit=STREAM_LIMIT)
+        return await asyncio.start_server(self.handle_connection, host, port,
+            limit=STREAM_LIMIT)
+
+    def close(self):
+        """Stops the move worker threads"""
+
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def handle_connection(self, reader, writer):
+        """Answers requests from one client until it disconnects"""
+
+        self.connections += 1
+        try:
+            while True:
+                line = await read_line(reader)
+                if not line:
+                    if line is not None:
+                        break
+                    response = {"ok": False, "error": "Request line over "
+                        f"{STREAM_LIMIT} bytes"}
+                else:
+                    response = await self.handle_line(line)
+                writer.write(json.dumps(response,
+                    separators=(",", ":")).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def handle_line(self, line):
+        """Returns the response for one request line"""
+
+        start = time.perf_counter()
+        request = {}
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError as error:  # also lines that are not UTF-8
+                raise ProtocolError(f"Bad JSON: {error}") from error
+            if not isinstance(request, dict):
+                request = {}
+                raise ProtocolError("Request must be a JSON object")
+            op = request.get("op")
+            handler = self.handlers.get(op) if isinstance(op, str) else None
+            if handler is None:
+                raise ProtocolError(f"Unknown op {request.get('op')!r}, "
+                    f"expected one of {', '.join(self.handlers)}")
+            response = dict(await handler(request), ok=True)
+        except ProtocolError as error:
+            response = {"ok": False, "error": str(error)}
+        if "id" in request:
+            response["id"] = request["id"]
+
+        seconds = time.perf_counter() - start
+        self.total.add(seconds)
+        game_id = request.get("game")
+        if isinstance(game_id, int) and game_id in self.latency:
+            self.latency[game_id].add(seconds)
+        return response
+
+    def find_game(self, request):
+        """Returns the game named by a request"""
+
+        game_id = request.get("game")
+        game = self.games.get(game_id) if isinstance(game_id, int) else None
+        if game is None:
+            raise ProtocolError(f"Unknown game {request.get('game')!r}")
+        return game
+
+    def describe(self, game_id):
+        """Returns the public state of a game"""
+
+        game = self.games[game_id]
+        board = "".join(PIECE_LETTERS[code & 7].upper() if code < 8
+            else PIECE_LETTERS[code & 7] for code in game.position.board)
+        return {
+            "game": game_id,
+            "turn": game.turn_color,
+            "ply": game.turn,
+            "status": game_status(game),
+            "board": board.replace(" ", "."),
+            "fen": game.position.fen(),
+            "moves": [move_name(move) for move in game.moves],
+            "legal": legal_names(game),
+        }
+
+    async def op_new(self, request):
+        """Creates a game in the starting position or an optional FEN"""
+
+        fen = request.get("fen")
+        if fen is not None and not isinstance(fen, str):
+            raise ProtocolError(f"Bad FEN {fen!r}")
+        try:
+            game = Game(self.backend, fen)
+        except ValueError as error:
+            raise ProtocolError(str(error)) from error
+        game_id = next(self.ids)
+        self.games[game_id] = game
+        self.locks[game_id] = asyncio.Lock()
+        self.latency[game_id] = LatencyStats()
+        return self.describe(game_id)
+
+    async def op_move(self, request):
+        """Plays a move given in coordinate notation"""
+
+        self.find_game(request)
+        (from_square, to_coords) = parse_move(request.get("move"))
+        game_id = request["game"]
+        async with self.locks[game_id]:
+            game = self.find_game(request)  # it may have closed while waiting
+            move = await asyncio.get_running_loop().run_in_executor(
+                self.executor, game.play, from_square, to_coords)
+            if move is None:
+                raise ProtocolError(f"Illegal move {request['move']!r}")
+            return {
+                "game": game_id,
+                "move": move_name(move),
+                "turn": game.turn_color,
+                "ply": game.turn,
+                "status": game_status(game),
+                "legal": legal_names(game),
+            }
+
+    async def op_state(self, request):
+        """Returns the board, move list and legal moves of a game"""
+
+        self.find_game(request)
+        game_id = request["game"]
+        async with self.locks[game_id]:
+            self.find_game(request)  # it may have closed while waiting
+            return self.describe(game_id)
+
+    async def op_close(self, request):
+        """Forgets a game, returning its latency figures"""
+
+        self.find_game(request)
+        game_id = request["game"]
+        async with self.locks[game_id]:
+            self.find_game(request)  # it may have closed while waiting
+            del self.games[game_id]
+            del self.locks[game_id]
+            return {"game": game_id,
+                "latency": self.latency.pop(game_id).as_dict()}
+
+    async def op_stats(self, request):
+        """Returns server wide and optionally per game latency figures"""
+
+        stats = {
+            "games": len(self.games),
+            "connections": self.connections,
+            "latency": self.total.as_dict(),
+        }
+        if request.get("game") is not None:
+            self.find_game(request)
+            stats["game_latency"] = self.latency[request["game"]].as_dict()
+        return stats
+
+
+class Client:
+    """Minimal JSON lines client for the game server"""
+
+    def __init__(self, reader, writer):
+        (self.reader, self.writer) = (reader, writer)
+        self.latency = LatencyStats()
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=8765, path=None):
+        """Opens a connection to a unix socket path or a TCP port"""
+
+        if path:
+            streams = await asyncio.open_unix_connection(path)
+        else:
+            streams = await asyncio.open_connection(host, port)
+        return cls(*streams)
+
+    async def request(self, **fields):
+        """Sends one request and returns the decoded response"""
+
+        start = time.perf_counter()
+        self.writer.write(json.dumps(fields).encode() + b"\n")
+        await self.writer.drain()
+        response = json.loads(await self.reader.readline())
+        self.latency.add(time.perf_counter() - start)
+        return response
+
+    async def close(self):
+        """Closes the connection"""
+
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def play_random_games(client, games, plies, rng):
+    """Plays random legal moves in several games on one connection"""
+
+    played = 0
+    for _ in range(games):
+        state = await client.request(op="new")
+        game_id = state["game"]
+        for _ in range(plies):
+            if state["status"] != "playing":
+                break
+            state = await client.request(op="move", game=game_id,
+                move=rng.choice(state["legal"]))
+            if not state["ok"]:
+                raise RuntimeError(state["error"])
+            played += 1
+        await client.request(op="close", game=game_id)
+    return played
+
+
+async def run_load(games=1000, plies=40, connections=50, seed=1,
+        host="127.0.0.1", port=8765, path=None):
+    """Plays games over many connections and returns throughput figures"""
+
+    # pylint: disable=too-many-arguments
+
+    clients = [await Client.connect(host, port, path)
+        for _ in range(connections)]
+    shares = [games // connections + (index < games % connections)
+        for index in range(connections)]
+    start = time.perf_counter()
+    played = await asyncio.gather(*[
+        play_random_games(client, share, plies, random.Random(seed + index))
+        for (index, (client, share)) in enumerate(zip(clients, shares))])
+    seconds = time.perf_counter() - start
+
+    stats = await clients[0].request(op="stats")
+    latency = LatencyStats()
+    latency.samples = deque(itertools.chain.from_iterable(
+        client.latency.samples for client in clients))
+    for client in clients:
+        latency.count += client.latency.count
+        latency.total += client.latency.total
+        latency.worst = max(latency.worst, client.latency.worst)
+        await client.close()
+    return {
+        "games": games,
+        "connections": connections,
+        "moves": sum(played),
+        "seconds": round(seconds, 6),
+        "moves_per_second": int(sum(played) / seconds) if seconds else 0,
+        "round_trip": latency.as_dict(),
+        "server": stats["latency"],
+    }
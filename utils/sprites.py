@@ -0,0 +1,122 @@
+"""Module contains a cache of pre-rendered piece sprites"""
+from collections import OrderedDict
+
+from utils.logger import LOGGER
+
+logger = LOGGER.get_logger('sprites')
+
+SPRITE_FONTS = ("DejaVuSans.ttf", "FreeSerif.ttf", "seguisym.ttf",
+    "Arial Unicode.ttf")
+DEFAULT_SPRITES = 48  # twelve pieces at four square lengths
+
+
+class SpriteCache:
+    """Least recently used cache of piece images keyed by square length
+
+    Each (glyph, color, length) combination is rendered once with Pillow
+    and reused by every piece drawn at that size. When Pillow or a font
+    with the chess glyphs is missing the cache is disabled and pieces are
+    drawn as text instead.
+    """
+
+    def __init__(self, maxsize=DEFAULT_SPRITES):
+        self.maxsize = maxsize
+        self.sprites = OrderedDict()
+        self.fonts = {}
+        self.pillow = None
+        self.enabled = None  # decided when the first sprite is requested
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, char, color, length, size):
+        """Returns sprite for glyph drawn in color, or None if disabled"""
+
+        # pylint: disable=too-many-arguments
+
+        if self.enabled is None:
+            self.enabled = self.load()
+        if not self.enabled:
+            return None
+        key = (char, color, length)
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.hits += 1
+            self.sprites.move_to_end(key)
+            return sprite
+
+        self.misses += 1
+        image = self.render(char, color, length, size)
+        if image is None:
+            return None
+        sprite = self.pillow.ImageTk.PhotoImage(image)
+        self.sprites[key] = sprite
+        while len(self.sprites) > self.maxsize:
+            self.sprites.popitem(last=False)
+            self.evictions += 1
+        return sprite
+
+    def load(self):
+        """Imports Pillow on first use, returning false if it is missing"""
+
+        # pylint: disable=import-outside-toplevel
+        try:
+            import PIL.Image
+            import PIL.ImageDraw
+            import PIL.ImageFont
+            import PIL.ImageTk
+        except ImportError:  # Pillow is optional, pieces fall back to text
+            return False
+        self.pillow = PIL
+        return True
+
+    def render(self, char, color, length, size):
+        """Renders glyph centered on a transparent square image"""
+
+        # pylint: disable=too-many-arguments
+
+        font = self.font(size)
+        if font is None:
+            return None
+        image = self.pillow.Image.new("RGBA", (length, length), (0, 0, 0, 0))
+        draw = self.pillow.ImageDraw.Draw(image)
+        draw.text((length / 2, length / 2), char, fill=color, font=font,
+            anchor="mm")
+        return image
+
+    def font(self, size):
+        """Returns a truetype font with chess glyphs, or None"""
+
+        if size not in self.fonts:
+            for name in SPRITE_FONTS:
+                try:
+                    self.fonts[size] = self.pillow.ImageFont.truetype(name,
+                        size)
+                    break
+                except OSError:
+                    continue
+            else:
+                logger.warning("No font with chess glyphs, drawing text")
+                self.enabled = False
+                return None
+        return self.fonts[size]
+
+    def clear(self):
+        """Drops every cached sprite"""
+
+        self.sprites.clear()
+
+    def stats(self):
+        """Returns counters for tuning the cache size"""
+
+        return {
+            "enabled": self.enabled,
+            "sprites": len(self.sprites),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+SPRITES = SpriteCache()
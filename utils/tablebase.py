@@ -0,0 +1,612 @@
+"""Module contains retrograde endgame tablebases for small material sets"""
+import mmap
+import multiprocessing
+import os
+import time
+
+from utils.bitboard import PAWN_ATTACKS, piece_attacks
+from utils.core import (WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING,
+    NO_SQUARE, make_piece)
+from utils.tables import PAWN_PUSH, PAWN_START_ROW, PAWN_LAST_ROW
+
+# One byte per position: DRAW, ILLEGAL, or one more than the plies to mate,
+# where odd plies mean the side to move wins and even plies that it loses.
+DRAW = 0
+ILLEGAL = 255
+TABLE_SUFFIX = ".tb"
+DEFAULT_DIRECTORY = "tablebases"
+TABLE_SETS = {
+    3: ("KQvK", "KRvK", "KPvK"),
+    4: ("KQvKR", "KQvKB", "KQvKN", "KRvKB", "KRvKN", "KBNvK", "KBBvK",
+        "KQvKP", "KRvKP"),
+}
+DRAWN = ("KvK", "KBvK", "KNvK")  # no mate is possible at all
+PIECE_CHARS = {KING: "K", QUEEN: "Q", ROOK: "R", BISHOP: "B", KNIGHT: "N",
+    PAWN: "P"}
+CHAR_PIECES = {char: kind for (kind, char) in PIECE_CHARS.items()}
+PIECE_ORDER = "KQRBNP"
+PIECE_VALUES = {"K": 0, "Q": 9, "R": 5, "B": 3, "N": 3, "P": 1}
+PROMOTION_CHARS = "QRBN"
+
+
+def _transform(square, mirror, flip, swap):
+    """Returns square after mirroring files, flipping ranks and transposing"""
+
+    (row, col) = (square >> 3, square & 7)
+    if mirror:
+        col = 7 - col
+    if flip:
+        row = 7 - row
+    if swap:
+        (row, col) = (7 - col, 7 - row)
+    return row << 3 | col
+
+
+def _king_transform(square, pawns):
+    """Returns the symmetry that moves the first king into its region
+
+    Pawnless tables use all eight symmetries of the board and keep the
+    king in the a1-d1-d4 triangle; pawns only allow mirroring the files.
+    """
+
+    (row, col) = (square >> 3, square & 7)
+    mirror = col > 3
+    if pawns:
+        return (mirror, False, False)
+    flip = row < 4
+    moved = _transform(square, mirror, flip, False)
+    swap = 7 - (moved >> 3) > (moved & 7)
+    return (mirror, flip, swap)
+
+
+def _build_transforms(pawns):
+    """Returns per king square transform tables and the region squares
+
+    A king that lands on the a1-h8 diagonal is left there by transposing
+    too, so such squares carry both transforms and the index takes the
+    smaller result, which keeps every position at exactly one index.
+    """
+
+    transforms = []
+    for king in range(64):
+        (mirror, flip, swap) = _king_transform(king, pawns)
+        options = [tuple(_transform(square, mirror, flip, swap)
+            for square in range(64))]
+        moved = options[0][king]
+        if not pawns and 7 - (moved >> 3) == moved & 7:
+            options.append(tuple(_transform(square, mirror, flip, not swap)
+                for square in range(64)))
+        transforms.append(tuple(options))
+    kings = sorted({options[0][king]
+        for (king, options) in enumerate(transforms)})
+    return (tuple(transforms), tuple(kings))
+
+
+SYMMETRIES = {pawns: _build_transforms(pawns) for pawns in (False, True)}
+
+
+def side_key(side):
+    """Returns a sort key ranking one side's pieces by material"""
+
+    return (sum(PIECE_VALUES[char] for char in side), len(side), side)
+
+
+def normalize(white, black):
+    """Returns the table signature for two sides and whether it is flipped
+
+    The stronger side is always listed first as white, so a position with
+    the colors reversed is looked up with the board flipped.
+    """
+
+    white = "".join(sorted(white, key=PIECE_ORDER.index))
+    black = "".join(sorted(black, key=PIECE_ORDER.index))
+    if side_key(black) > side_key(white):
+        return (f"{black}v{white}", True)
+    return (f"{white}v{black}", False)
+
+
+def parse_signature(signature):
+    """Returns the normalized form of a signature such as KRvK"""
+
+    (white, _, black) = signature.upper().partition("V")
+    for side in (white, black):
+        if side.count("K") != 1 or not side.startswith("K") or \
+                set(side) - set(PIECE_ORDER):
+            raise ValueError(f"Bad material signature {signature!r}, "
+                "expected e.g. KQvKR")
+    return normalize(white, black)[0]
+
+
+def dependencies(signature):
+    """Returns signatures reached from a table by a capture or promotion"""
+
+    (white, _, black) = signature.partition("v")
+    found = set()
+    for (mover, other, flipped) in ((white, black, False),
+            (black, white, True)):
+        captures = {other} | {other[:index] + other[index + 1:]
+            for index in range(1, len(other))}
+        promotions = {mover} | {mover.replace("P", char, 1)
+            for char in PROMOTION_CHARS if "P" in mover}
+        for moved in promotions:
+            for taken in captures:
+                if (moved, taken) == (mover, other):
+                    continue
+                sides = (taken, moved) if flipped else (moved, taken)
+                found.add(normalize(*sides)[0])
+    return found - set(DRAWN)
+
+
+class Layout:
+    """Maps positions of one material signature to table indexes
+
+    Pieces are ordered white king, other white pieces, black king and
+    other black pieces. The white king picks a symmetry and is indexed
+    within its region, every other piece takes six bits.
+    """
+
+    def __init__(self, signature):
+        (white, _, black) = signature.partition("v")
+        self.signature = signature
+        self.pieces = tuple([make_piece(WHITE, CHAR_PIECES[char])
+            for char in white] + [make_piece(BLACK, CHAR_PIECES[char])
+            for char in black])
+        self.pawns = "P" in signature
+        (self.transforms, self.kings) = SYMMETRIES[self.pawns]
+        self.king_index = [-1] * 64
+        for (index, square) in enumerate(self.kings):
+            self.king_index[square] = index
+        self.black_king = len(white)
+        self.size = len(self.kings) << 6 * (len(self.pieces) - 1)
+
+    def index(self, squares):
+        """Returns the index of the position with pieces on squares"""
+
+        best = None
+        for transform in self.transforms[squares[0]]:
+            index = self.king_index[transform[squares[0]]]
+            for square in squares[1:]:
+                index = index << 6 | transform[square]
+            if best is None or index < best:
+                best = index
+        return best
+
+    def decode(self, index):
+        """Returns piece squares of the position at an index"""
+
+        squares = [0] * len(self.pieces)
+        for slot in range(len(self.pieces) - 1, 0, -1):
+            squares[slot] = index & 63
+            index >>= 6
+        squares[0] = self.kings[index]
+        return squares
+
+
+def attacked(square, pieces, squares, color, occupancy):
+    """Returns true if pieces of color attack square"""
+
+    for (piece, origin) in zip(pieces, squares):
+        if piece >> 3 == color and piece_attacks(piece & 7, color, origin,
+                occupancy) >> square & 1:
+            return True
+    return False
+
+
+def is_valid(layout, squares, turn):
+    """Returns true if squares hold a legal position with turn to move"""
+
+    occupancy = 0
+    for (piece, square) in zip(layout.pieces, squares):
+        if occupancy >> square & 1:
+            return False
+        if piece & 7 == PAWN and square >> 3 in (0, 7):
+            return False
+        occupancy |= 1 << square
+    king = squares[layout.black_king if turn == WHITE else 0]
+    return not attacked(king, layout.pieces, squares, turn, occupancy)
+
+
+def generate_children(pieces, squares, turn):
+    """Yields (pieces, squares) after every legal move of turn
+
+    Captures and promotions return a new pieces tuple, so the caller can
+    tell which children belong to another table.
+    """
+
+    occupancy = own = 0
+    for (piece, square) in zip(pieces, squares):
+        occupancy |= 1 << square
+        if piece >> 3 == turn:
+            own |= 1 << square
+    enemy = occupancy ^ own
+    king = squares[pieces.index(make_piece(turn, KING))]
+
+    for (slot, piece) in enumerate(pieces):
+        if piece >> 3 != turn:
+            continue
+        origin = squares[slot]
+        kind = piece & 7
+        if kind == PAWN:
+            targets = PAWN_ATTACKS[turn][origin] & enemy
+            push = origin + PAWN_PUSH[turn]
+            if not occupancy >> push & 1:
+                targets |= 1 << push
+                double = push + PAWN_PUSH[turn]
+                if origin >> 3 == PAWN_START_ROW[turn] and \
+                        not occupancy >> double & 1:
+                    targets |= 1 << double
+        else:
+            targets = piece_attacks(kind, turn, origin, occupancy) & ~own
+        while targets:
+            target = (targets & -targets).bit_length() - 1
+            targets &= targets - 1
+            (child_pieces, child_squares) = (pieces, list(squares))
+            child_squares[slot] = target
+            if enemy >> target & 1:
+                taken = squares.index(target)
+                child_pieces = pieces[:taken] + pieces[taken + 1:]
+                del child_squares[taken]
+            moved = child_squares.index(target)
+            moved_king = target if kind == KING else king
+            if attacked(moved_king, child_pieces, child_squares, turn ^ 1,
+                    occupancy & ~(1 << origin) | 1 << target):
+                continue
+            if kind == PAWN and target >> 3 == PAWN_LAST_ROW[turn]:
+                for char in PROMOTION_CHARS:
+                    promoted = list(child_pieces)
+                    promoted[moved] = make_piece(turn, CHAR_PIECES[char])
+                    yield (tuple(promoted), child_squares)
+                continue
+            yield (child_pieces, child_squares)
+
+
+def generate_parents(layout, squares, turn):
+    """Yields squares of positions one quiet move earlier
+
+    The side that moved last is the one not to move now, and it must not
+    have left the side to move in check before its move.
+    """
+
+    pieces = layout.pieces
+    mover = turn ^ 1
+    occupancy = 0
+    for square in squares:
+        occupancy |= 1 << square
+    king = squares[0 if turn == WHITE else layout.black_king]
+
+    for (slot, piece) in enumerate(pieces):
+        if piece >> 3 != mover:
+            continue
+        origin = squares[slot]
+        kind = piece & 7
+        if kind == PAWN:
+            origins = 0
+            back = origin - PAWN_PUSH[mover]
+            if back >> 3 != PAWN_LAST_ROW[turn] and not occupancy >> back & 1:
+                origins = 1 << back
+                start = back - PAWN_PUSH[mover]
+                if start >> 3 == PAWN_START_ROW[mover] and \
+                        not occupancy >> start & 1:
+                    origins |= 1 << start
+        else:
+            origins = piece_attacks(kind, mover, origin, occupancy) & \
+                ~occupancy
+        while origins:
+            parent = (origins & -origins).bit_length() - 1
+            origins &= origins - 1
+            parent_squares = list(squares)
+            parent_squares[slot] = parent
+            if not attacked(king, pieces, parent_squares, mover,
+                    occupancy & ~(1 << origin) | 1 << parent):
+                yield parent_squares
+
+
+class Tablebases:
+    """Memory mapped tables in a directory, probed by material signature"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.available = set()
+        if os.path.isdir(directory):
+            self.available = {name[:-len(TABLE_SUFFIX)]
+                for name in os.listdir(directory)
+                if name.endswith(TABLE_SUFFIX)}
+        self.max_pieces = max((len(signature) - 1
+            for signature in self.available), default=0)
+        self.tables = {}
+
+    def close(self):
+        """Unmaps every loaded table"""
+
+        for (_, data) in self.tables.values():
+            if isinstance(data, mmap.mmap):
+                data.close()
+        self.tables = {}
+
+    def table(self, signature):
+        """Returns (layout, data) of a table, mapping it on first use"""
+
+        if signature not in self.tables:
+            layout = Layout(signature)
+            path = os.path.join(self.directory, signature + TABLE_SUFFIX)
+            with open(path, "rb") as handle:
+                size = os.fstat(handle.fileno()).st_size
+                if size != 2 * layout.size:
+                    raise ValueError(f"{path} holds {size} bytes, expected "
+                        f"{2 * layout.size}")
+                data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            self.tables[signature] = (layout, data)
+        return self.tables[signature]
+
+    def value(self, pieces, squares, turn):
+        """Returns the table byte of a piece list, or None if not stored"""
+
+        sides = ([], [])
+        for piece in sorted(pieces, key=lambda piece:
+                PIECE_ORDER.index(PIECE_CHARS[piece & 7])):
+            sides[piece >> 3].append(PIECE_CHARS[piece & 7])
+        (signature, flipped) = normalize("".join(sides[WHITE]),
+            "".join(sides[BLACK]))
+        if signature in DRAWN:
+            return DRAW
+        if signature not in self.available:
+            return None
+        (layout, data) = self.table(signature)
+        if flipped:
+            pieces = [piece ^ 8 for piece in pieces]
+            squares = [square ^ 56 for square in squares]
+            turn ^= 1
+        ordered = sorted(zip(pieces, squares), key=lambda pair:
+            (pair[0] >> 3, PIECE_ORDER.index(PIECE_CHARS[pair[0] & 7])))
+        index = layout.index([square for (_, square) in ordered])
+        return data[turn * layout.size + index]
+
+    def probe(self, position):
+        """Returns the table byte of a position, or None if not stored
+
+        Positions with castling rights or a capturable en passant square
+        are never probed, since the tables leave both out.
+        """
+
+        if position.occupied.bit_count() > self.max_pieces or \
+                position.castling:
+            return None
+        if position.ep != NO_SQUARE and PAWN_ATTACKS[position.turn ^ 1][
+                position.ep] & position.bitboards[make_piece(position.turn,
+                PAWN)]:
+            return None
+        pieces = []
+        squares = []
+        for (square, piece) in position.pieces():
+            pieces.append(piece)
+            squares.append(square)
+        return self.value(pieces, squares, position.turn)
+
+    def score(self, position, ply, mate):
+        """Returns the exact search score of a position, or None"""
+
+        value = self.probe(position)
+        if value is None or value == ILLEGAL:
+            return None
+        if value == DRAW:
+            return 0
+        plies = ply + value - 1
+        return mate - plies if value % 2 == 0 else plies - mate
+
+    def best_move(self, position, mate):
+        """Returns (move, score) of the best tablebase move, or None"""
+
+        best = None
+        for move in position.generate_moves():
+            position.make_move(move)
+            score = self.score(position, 1, mate)
+            if score is None and not position.generate_moves():
+                score = -mate + 1 if position.in_check() else 0
+            position.unmake_move()
+            if score is None:
+                return None
+            if best is None or -score > best[1]:
+                best = (move, -score)
+        return best
+
+    def line(self, position, mate, max_plies=100):
+        """Returns the tablebase line of best moves until mate or draw"""
+
+        moves = []
+        while len(moves) < max_plies:
+            best = self.best_move(position, mate)
+            if best is None:
+                break
+            moves.append(best[0])
+            position.make_move(best[0])
+            if not best[1]:
+                break
+        for _ in moves:
+            position.unmake_move()
+        return moves
+
+
+def open_tablebases(directory):
+    """Returns the tables of a directory, raising ValueError if it has none"""
+
+    tablebases = Tablebases(directory)
+    if not tablebases.available:
+        raise ValueError(f"no {TABLE_SUFFIX} tables in {directory}")
+    return tablebases
+
+
+def describe(value):
+    """Returns result and moves to mate for a table byte"""
+
+    if value is None or value == ILLEGAL:
+        return {"result": None, "mate": None}
+    if value == DRAW:
+        return {"result": "draw", "mate": None}
+    moves = value // 2
+    if value % 2 == 0:
+        return {"result": "win", "mate": moves}
+    return {"result": "loss", "mate": -moves}
+
+
+def generate_table(signature, directory):
+    """Solves one table by retrograde analysis and writes it to directory
+
+    Every legal position first counts its distinct moves inside the
+    table, and captures and promotions are scored from already built
+    tables. Positions are then settled ply by ply outwards from mate:
+    parents of a lost position are won, and a parent loses once every
+    one of its moves has been found to be won for the opponent. A
+    position with a capture or promotion that wins is never counted
+    down, so it can only settle as a win.
+    """
+
+    # pylint: disable=too-many-locals,too-many-branches,too-many-statements
+
+    start = time.perf_counter()
+    layout = Layout(signature)
+    tablebases = Tablebases(directory)
+    size = layout.size
+    results = [bytearray(size), bytearray(size)]
+    counts = [bytearray(size), bytearray(size)]
+    later_losses = [bytearray(size), bytearray(size)]
+    schedule = {}
+
+    for turn in (WHITE, BLACK):
+        for index in range(size):
+            squares = layout.decode(index)
+            if not is_valid(layout, squares, turn) or \
+                    layout.index(squares) != index:
+                results[turn][index] = ILLEGAL  # or stored at a mirror index
+                continue
+            inside = set()
+            (blocked, win, loss) = (0, None, 0)
+            for (pieces, child) in generate_children(layout.pieces, squares,
+                    turn):
+                if pieces is layout.pieces:
+                    inside.add(layout.index(child))
+                    continue
+                value = tablebases.value(pieces, child, turn ^ 1)
+                if value == DRAW:
+                    blocked += 1
+                elif value % 2:  # the opponent is mated in value - 1 plies
+                    win = value if win is None else min(win, value)
+                else:
+                    loss = max(loss, value)
+            if not inside and not blocked and win is None:
+                if not loss:  # no legal moves at all
+                    king = squares[0 if turn == WHITE else layout.black_king]
+                    occupancy = sum(1 << square for square in squares)
+                    if not attacked(king, layout.pieces, squares, turn ^ 1,
+                            occupancy):
+                        continue  # stalemate stays a draw
+                schedule.setdefault(loss, []).append((turn, index))
+                continue
+            if win is not None:
+                schedule.setdefault(win, []).append((turn, index))
+                continue  # an in-table win may still settle it sooner
+            counts[turn][index] = len(inside) + blocked
+            later_losses[turn][index] = loss
+
+    while schedule:
+        plies = min(schedule)
+        settled = []
+        for (turn, index) in schedule.pop(plies):
+            if not results[turn][index]:
+                results[turn][index] = plies + 1
+                settled.append((turn, index))
+        for (turn, index) in settled:
+            parents = {layout.index(parent) for parent in
+                generate_parents(layout, layout.decode(index), turn)}
+            mover = turn ^ 1
+            for parent in parents:
+                if results[mover][parent]:
+                    continue
+                if plies % 2 == 0:
+                    schedule.setdefault(plies + 1, []).append((mover, parent))
+                    continue
+                if not counts[mover][parent]:
+                    continue  # it has a winning exit to another table
+                counts[mover][parent] -= 1
+                if not counts[mover][parent]:
+                    schedule.setdefault(max(plies + 1,
+                        later_losses[mover][parent]), []).append(
+                        (mover, parent))
+
+    path = os.path.join(directory, signature + TABLE_SUFFIX)
+    with open(path + ".tmp", "wb") as handle:
+        handle.write(results[WHITE])
+        handle.write(results[BLACK])
+    os.replace(path + ".tmp", path)
+    tablebases.close()
+    return table_report(signature, results, time.perf_counter() - start)
+
+
+def table_report(signature, results, seconds):
+    """Returns position counts, longest mate and size of a built table"""
+
+    data = results[WHITE] + results[BLACK]
+    histogram = [data.count(value) for value in range(256)]
+    wins = sum(histogram[value] for value in range(2, ILLEGAL, 2))
+    losses = sum(histogram[value] for value in range(1, ILLEGAL, 2))
+    longest = max((value for value in range(1, ILLEGAL)
+        if histogram[value]), default=0)
+    return {
+        "table": signature,
+        "positions": len(data) - histogram[ILLEGAL],
+        "wins": wins,
+        "losses": losses,
+        "draws": histogram[DRAW],
+        "longest_mate": longest // 2,
+        "bytes": len(data),
+        "seconds": round(seconds, 3),
+    }
+
+
+def build_order(signatures):
+    """Returns the requested signatures and everything they depend on"""
+
+    needed = set()
+    pending = [parse_signature(signature) for signature in signatures]
+    while pending:
+        signature = pending.pop()
+        if signature in needed or signature in DRAWN:
+            continue
+        needed.add(signature)
+        pending.extend(dependencies(signature))
+    return needed
+
+
+def build_tablebases(signatures, directory, workers=None, force=False,
+        on_table=None):
+    """Builds tables and their dependencies across a process pool
+
+    Tables are handed out in waves: every table whose dependencies are
+    already on disk is solved in parallel, then the next wave starts.
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    needed = build_order(signatures)
+    done = set() if force else (needed & Tablebases(directory).available)
+    remaining = needed - done
+    reports = []
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        while remaining:
+            wave = sorted(signature for signature in remaining
+                if dependencies(signature) <= done)
+            for report in pool.starmap(generate_table,
+                    [(signature, directory) for signature in wave]):
+                reports.append(report)
+                if on_table:
+                    on_table(report)
+            done |= set(wave)
+            remaining -= set(wave)
+    return {
+        "directory": directory,
+        "workers": workers,
+        "tables": reports,
+        "skipped": sorted(needed - {report["table"] for report in reports}),
+        "bytes": sum(report["bytes"] for report in reports),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
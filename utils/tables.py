@@ -0,0 +1,90 @@
+"""Module contains precomputed board geometry tables"""
+from utils.core import (BISHOP, ROOK, QUEEN, WHITE_KINGSIDE, WHITE_QUEENSIDE,
+    BLACK_KINGSIDE, BLACK_QUEENSIDE, ALL_CASTLING, square_index,
+    square_coords)
+
+
+def build_rays(directions):
+    """Precomputes every ray from every square for given directions"""
+
+    rays = []
+    for square in range(64):
+        (row, col) = square_coords(square)
+        square_rays = []
+        for (d_row, d_col) in directions:
+            ray = []
+            (r_pos, c_pos) = (row + d_row, col + d_col)
+            while 0 <= r_pos < 8 and 0 <= c_pos < 8:
+                ray.append(square_index(r_pos, c_pos))
+                (r_pos, c_pos) = (r_pos + d_row, c_pos + d_col)
+            if ray:
+                square_rays.append(tuple(ray))
+        rays.append(tuple(square_rays))
+    return tuple(rays)
+
+
+def build_steps(offsets):
+    """Precomputes single step targets from every square"""
+
+    steps = []
+    for square in range(64):
+        (row, col) = square_coords(square)
+        targets = []
+        for (d_row, d_col) in offsets:
+            (r_pos, c_pos) = (row + d_row, col + d_col)
+            if 0 <= r_pos < 8 and 0 <= c_pos < 8:
+                targets.append(square_index(r_pos, c_pos))
+        steps.append(tuple(targets))
+    return tuple(steps)
+
+
+ORTHOGONAL = ((-1, 0), (0, 1), (1, 0), (0, -1))
+DIAGONAL = ((-1, 1), (1, 1), (1, -1), (-1, -1))
+KNIGHT_OFFSETS = ((-2, -1), (-2, 1), (-1, 2), (1, 2),
+    (2, 1), (2, -1), (1, -2), (-1, -2))
+PAWN_CAPTURE_OFFSETS = (((-1, -1), (-1, 1)), ((1, -1), (1, 1)))
+
+ROOK_RAYS = build_rays(ORTHOGONAL)
+BISHOP_RAYS = build_rays(DIAGONAL)
+QUEEN_RAYS = tuple(r + b for (r, b) in zip(ROOK_RAYS, BISHOP_RAYS))
+KNIGHT_STEPS = build_steps(KNIGHT_OFFSETS)
+KING_STEPS = build_steps(ORTHOGONAL + DIAGONAL)
+SLIDER_RAYS = {BISHOP: BISHOP_RAYS, ROOK: ROOK_RAYS, QUEEN: QUEEN_RAYS}
+
+PAWN_PUSH = (-8, 8)  # white moves up the board, black moves down
+PAWN_START_ROW = (6, 1)
+PAWN_LAST_ROW = (0, 7)
+PAWN_CAPTURES = tuple(build_steps(offsets)
+    for offsets in PAWN_CAPTURE_OFFSETS)
+
+# (right, king from, king to, rook from, rook to, must be empty, king path)
+CASTLING_MOVES = (
+    (
+        (WHITE_KINGSIDE, 60, 62, 63, 61, (61, 62), (61, 62)),
+        (WHITE_QUEENSIDE, 60, 58, 56, 59, (57, 58, 59), (59, 58)),
+    ),
+    (
+        (BLACK_KINGSIDE, 4, 6, 7, 5, (5, 6), (5, 6)),
+        (BLACK_QUEENSIDE, 4, 2, 0, 3, (1, 2, 3), (3, 2)),
+    ),
+)
+CASTLING_ROOKS = {
+    rule[2]: (rule[3], rule[4]) for rules in CASTLING_MOVES for rule in rules
+}
+
+
+def _build_castling_masks():
+    """Precomputes rights kept when a move touches each square"""
+
+    masks = [ALL_CASTLING] * 64
+    for rules in CASTLING_MOVES:
+        for (right, king, _, rook, _, _, _) in rules:
+            masks[king] &= ~right
+            masks[rook] &= ~right
+    return tuple(masks)
+
+
+CASTLING_MASKS = _build_castling_masks()
+
+LIGHT_SQUARES = sum(1 << square for square in range(64)
+    if not ((square >> 3) + (square & 7)) & 1)  # a8 and h1 are light
@@ -0,0 +1,140 @@
+"""Module contains a fixed size transposition table packed into an array"""
+from array import array
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+DEFAULT_HASH_MB = 16
+ENTRY_WORDS = 2  # key word and data word
+BUCKET_ENTRIES = 2  # depth preferred slot, then always replace slot
+BUCKET_BYTES = ENTRY_WORDS * BUCKET_ENTRIES * 8
+
+SCORE_OFFSET = 1 << 20
+MASK_64 = (1 << 64) - 1
+
+
+def pack(move, depth, score, bound, generation):
+    """Packs an entry into one 64-bit data word"""
+
+    return (move | (depth << 16) | (bound << 24)
+        | ((score + SCORE_OFFSET) << 26) | (generation << 48))
+
+
+def unpack(data):
+    """Returns move, depth, score and bound from a data word"""
+
+    return (data & 0xffff, (data >> 16) & 0xff,
+        ((data >> 26) & 0x3fffff) - SCORE_OFFSET, (data >> 24) & 3)
+
+
+def bucket_count(size_mb):
+    """Returns largest power of two bucket count fitting in size_mb"""
+
+    buckets = max(int(size_mb * (1 << 20)) // BUCKET_BYTES, 1)
+    return 1 << (buckets.bit_length() - 1)
+
+
+class TranspositionTable:
+    """Position hash table with bounded memory and two entry buckets
+
+    Every entry stores its key XORed with its data word, so a torn or
+    foreign write simply fails validation on probe. This keeps the table
+    safe to share between processes without locks.
+    """
+
+    def __init__(self, size_mb=DEFAULT_HASH_MB, buffer=None):
+        if buffer is None:
+            words = bucket_count(size_mb) * BUCKET_ENTRIES * ENTRY_WORDS
+            self.words = array("Q", bytes(words * 8))
+        else:
+            self.words = memoryview(buffer).cast("B").cast("Q")
+        self.buckets = bucket_count(len(self.words) * 8 / (1 << 20))
+        self.mask = self.buckets - 1
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.collisions = 0
+
+    @property
+    def size_mb(self):
+        """Memory used by the table in megabytes"""
+
+        return self.buckets * BUCKET_BYTES / (1 << 20)
+
+    def new_search(self):
+        """Ages existing entries so they are replaced first"""
+
+        self.generation = (self.generation + 1) & 0xff
+
+    def clear(self):
+        """Empties the table and resets counters"""
+
+        raw = memoryview(self.words).cast("B")
+        raw[:] = bytes(len(raw))
+        self.generation = 0
+        self.probes = self.hits = self.stores = self.collisions = 0
+
+    def probe(self, key):
+        """Returns (move, depth, score, bound) stored for key, or None"""
+
+        self.probes += 1
+        words = self.words
+        index = (key & self.mask) << 2
+        for slot in (index, index + 2):
+            data = words[slot + 1]
+            if data and words[slot] ^ data == key:
+                self.hits += 1
+                return unpack(data)
+        return None
+
+    def store(self, key, move, depth, score, bound):
+        """Stores an entry using depth preferred and always replace slots"""
+
+        # pylint: disable=too-many-arguments
+
+        self.stores += 1
+        words = self.words
+        index = (key & self.mask) << 2
+        data = pack(move, min(depth, 0xff), score, bound, self.generation)
+
+        preferred = words[index + 1]
+        if (not preferred or words[index] ^ preferred == key
+                or (preferred >> 16) & 0xff <= depth
+                or preferred >> 48 != self.generation):
+            slot = index
+        else:
+            slot = index + 2
+            preferred = words[slot + 1]
+
+        if preferred and words[slot] ^ preferred != key:
+            self.collisions += 1
+        if not move and preferred and words[slot] ^ preferred == key:
+            data |= preferred & 0xffff  # keep the known best move
+        words[slot] = (key ^ data) & MASK_64
+        words[slot + 1] = data
+
+    def hashfull(self):
+        """Returns permille of sampled entries written this generation"""
+
+        sample = min(self.buckets, 500)
+        used = 0
+        for index in range(0, sample * 4, 2):
+            data = self.words[index + 1]
+            if data and data >> 48 == self.generation:
+                used += 1
+        return used * 1000 // (sample * 2)
+
+    def stats(self):
+        """Returns counters for tuning the table size"""
+
+        return {
+            "size_mb": self.size_mb,
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.probes, 4) if self.probes else 0.0,
+            "stores": self.stores,
+            "collisions": self.collisions,
+            "hashfull": self.hashfull(),
+        }
@@ -0,0 +1,254 @@
+"""Module contains a Universal Chess Interface front end for the engine"""
+import sys
+import threading
+
+from utils.book import OpeningBook
+from utils.core import (PIECE_LETTERS, PROMOTIONS, QUEEN, SQUARE_NAMES,
+    START_FEN, move_name)
+from utils.position import Position
+from utils.search import Search
+from utils.tablebase import open_tablebases
+from utils.transposition import DEFAULT_HASH_MB, TranspositionTable
+
+ENGINE_NAME = "Chess V2"
+ENGINE_AUTHOR = "Adam Scanga, Curtis Lane"
+MOVE_OVERHEAD = 0.05  # seconds kept back from every move for I/O
+MOVES_TO_GO = 30  # moves assumed left when the time control gives none
+MAX_HASH_MB = 1024
+
+
+def parse_limits(tokens, turn):
+    """Returns depth, nodes, movetime and infinite from go arguments"""
+
+    values = {}
+    infinite = False
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token == "infinite":
+            infinite = True
+        elif token in ("depth", "nodes", "movetime", "wtime", "btime",
+                "winc", "binc", "movestogo") and index + 1 < len(tokens):
+            index += 1
+            values[token] = int(tokens[index])
+        index += 1
+
+    movetime = None
+    if "movetime" in values:
+        movetime = max(values["movetime"] / 1000 - MOVE_OVERHEAD, 0.01)
+    elif not infinite and ("wtime", "btime")[turn] in values:
+        left = values[("wtime", "btime")[turn]] / 1000
+        increment = values.get(("winc", "binc")[turn], 0) / 1000
+        budget = left / values.get("movestogo", MOVES_TO_GO) + increment * 0.8
+        movetime = max(min(budget, left / 2 - MOVE_OVERHEAD), 0.01)
+    return (values.get("depth"), values.get("nodes"), movetime, infinite)
+
+
+def info_line(result):
+    """Formats a search result as a UCI info line"""
+
+    mate = result.mate_in
+    score = f"mate {mate}" if mate is not None else f"cp {result.score}"
+    return (f"info depth {result.depth} score {score} nodes {result.nodes} "
+        f"nps {result.nps} time {int(result.seconds * 1000)} "
+        f"pv {' '.join(move_name(move) for move in result.pv)}")
+
+
+class UciEngine:
+    """Reads UCI commands and answers on stdout without buffering
+
+    Searches run on a background thread so stop, isready and quit are
+    handled while the engine thinks. Every line is flushed as soon as it
+    is written, which keeps time controls accurate under match runners.
+    """
+
+    def __init__(self, stdin=None, stdout=None, book=None,
+            tablebases=None):
+        self.stdin = stdin or sys.stdin
+        self.stdout = stdout or sys.stdout
+        self.lock = threading.Lock()
+        self.position = Position("bitboard")
+        self.hash_mb = DEFAULT_HASH_MB
+        self.table = TranspositionTable(self.hash_mb)
+        self.book = book
+        self.tablebases = tablebases
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.commands = {
+            "uci": self.cmd_uci,
+            "isready": self.cmd_isready,
+            "ucinewgame": self.cmd_ucinewgame,
+            "setoption": self.cmd_setoption,
+            "position": self.cmd_position,
+            "go": self.cmd_go,
+            "stop": self.cmd_stop,
+        }
+
+    def send(self, line):
+        """Writes one line and flushes it immediately"""
+
+        with self.lock:
+            self.stdout.write(line + "\n")
+            self.stdout.flush()
+
+    def run(self):
+        """Handles commands until quit or end of input"""
+
+        for line in self.stdin:
+            tokens = line.split()
+            if not tokens:
+                continue
+            if tokens[0] == "quit":
+                break
+            command = self.commands.get(tokens[0])
+            if command is None:
+                self.send(f"info string unknown command {tokens[0]}")
+                continue
+            try:
+                command(tokens[1:])
+            except ValueError as error:
+                self.send(f"info string {error}")
+        self.cmd_stop([])
+        return 0
+
+    def cmd_uci(self, _):
+        """Identifies the engine and its options"""
+
+        self.send(f"id name {ENGINE_NAME}")
+        self.send(f"id author {ENGINE_AUTHOR}")
+        self.send(f"option name Hash type spin default {DEFAULT_HASH_MB} "
+            f"min 1 max {MAX_HASH_MB}")
+        self.send("option name Book type string default <empty>")
+        self.send("option name TablebasePath type string default <empty>")
+        self.send("uciok")
+
+    def cmd_isready(self, _):
+        """Answers readyok, even while searching"""
+
+        self.send("readyok")
+
+    def cmd_ucinewgame(self, _):
+        """Forgets everything learned in the previous game"""
+
+        self.cmd_stop([])
+        self.table.clear()
+
+    def cmd_setoption(self, tokens):
+        """Sets the Hash option in megabytes, or the Book or tables path"""
+
+        text = " ".join(tokens)
+        (name, _, value) = text.partition(" value ")
+        name = name.lower()
+        if name == "name hash" and value:
+            self.cmd_stop([])
+            self.hash_mb = min(max(int(value), 1), MAX_HASH_MB)
+            self.table = TranspositionTable(self.hash_mb)
+        elif name == "name book":
+            self.cmd_stop([])
+            if self.book is not None:
+                self.book.close()
+            try:
+                self.book = OpeningBook(value) if value and \
+                    value != "<empty>" else None
+            except OSError as error:
+                self.book = None
+                raise ValueError(f"cannot open book: {error}") from error
+        elif name == "name tablebasepath":
+            self.cmd_stop([])
+            if self.tablebases is not None:
+                self.tablebases.close()
+            self.tablebases = None
+            if value and value != "<empty>":
+                try:
+                    self.tablebases = open_tablebases(value)
+                except OSError as error:
+                    raise ValueError(f"cannot open tablebases: {error}") \
+                        from error
+        else:
+            raise ValueError(f"unsupported option: {text}")
+
+    def cmd_position(self, tokens):
+        """Sets up startpos or a FEN and plays the listed moves"""
+
+        self.cmd_stop([])
+        if "moves" in tokens:
+            split = tokens.index("moves")
+            (setup, moves) = (tokens[:split], tokens[split + 1:])
+        else:
+            (setup, moves) = (tokens, [])
+
+        position = Position("bitboard")
+        if setup[:1] == ["fen"]:
+            position.set_fen(" ".join(setup[1:]))
+        elif setup[:1] == ["startpos"]:
+            position.set_fen(START_FEN)
+        else:
+            raise ValueError("position needs startpos or fen")
+        for name in moves:
+            move = self.parse_move(position, name)
+            if move is None:
+                raise ValueError(f"illegal move {name}")
+            position.make_move(move)
+        self.position = position
+
+    @staticmethod
+    def parse_move(position, name):
+        """Returns the legal move for a UCI move name, or None
+
+        A promotion letter is only accepted on a move that promotes, and a
+        promotion without one is taken to be to a queen.
+        """
+
+        if len(name) not in (4, 5) or name[:2] not in SQUARE_NAMES \
+                or name[2:4] not in SQUARE_NAMES:
+            return None
+        promotion = PIECE_LETTERS.find(name[4]) if name[4:] else QUEEN
+        if promotion not in PROMOTIONS:
+            return None
+        move = position.find_move(SQUARE_NAMES.index(name[:2]),
+            SQUARE_NAMES.index(name[2:4]), promotion)
+        if move is not None and name[4:] and not move >> 12:
+            return None
+        return move
+
+    def cmd_go(self, tokens):
+        """Starts searching the current position in the background"""
+
+        self.cmd_stop([])
+        (depth, nodes, movetime, infinite) = parse_limits(tokens,
+            self.position.turn)
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.think,
+            args=(depth, nodes, movetime, infinite), daemon=True)
+        self.thread.start()
+
+    def think(self, depth, nodes, movetime, infinite):
+        """Searches, streams info lines and reports the best move"""
+
+        searcher = Search(self.position, max_depth=depth, max_nodes=nodes,
+            max_time=movetime, table=self.table, stop_event=self.stop_event,
+            on_info=lambda result: self.send(info_line(result)),
+            book=self.book, tablebases=self.tablebases)
+        result = searcher.run()
+        if result.book:
+            self.send(f"info string book move {move_name(result.move)}")
+        elif result.tablebase:
+            self.send("info string tablebase move "
+                f"{move_name(result.move)}")
+        if infinite:
+            self.stop_event.wait()  # UCI reports infinite searches on stop
+        if result.move is None:
+            self.send("bestmove 0000")
+        elif len(result.pv) > 1:
+            self.send(f"bestmove {move_name(result.move)} "
+                f"ponder {move_name(result.pv[1])}")
+        else:
+            self.send(f"bestmove {move_name(result.move)}")
+
+    def cmd_stop(self, _):
+        """Stops a running search and waits for its bestmove"""
+
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
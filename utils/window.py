@@ -0,0 +1,47 @@
+"""Module contains the game window hosting the board"""
+import tkinter as tk
+import sys
+
+from utils.board import Board
+
+
+class App(tk.Tk):
+    """Controls the window and contains the board"""
+
+    def __init__(self, fen=None, book=None):
+        super().__init__()
+        self.title('Chess V2')
+
+        if sys.platform == "linux":
+            self.window_arg = "-zoomed"
+        else:
+            self.window_arg = "-fullscreen"
+
+        self.fullscreen_state = False
+        self.attributes(self.window_arg, self.fullscreen_state)
+
+        self.bind("<F11>", self.toggle_fullscreen)
+        self.bind("<Escape>", self.exit_fullscreen)
+
+        self.board = Board(self, fen=fen, book=book)
+        self.bind("<F2>", self.board.toggle_analysis)
+        self.bind("<F3>", self.board.play_book_move)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.mainloop()
+
+    def close(self):
+        """Stops background work and closes the window"""
+
+        self.board.close()
+        self.destroy()
+
+    def toggle_fullscreen(self, _):
+        """Gives user ability to toggle fullscreen"""
+
+        self.fullscreen_state = not self.fullscreen_state
+        self.attributes(self.window_arg, self.fullscreen_state)
+
+    def exit_fullscreen(self, _):
+        """Allows user to escape fullscreen with escape key"""
+
+        self.attributes(self.window_arg, False)
@@ -0,0 +1,121 @@
+"""Module contains a background engine process driven through queues"""
+import multiprocessing
+import queue
+
+from utils.search import Search
+from utils.transposition import DEFAULT_HASH_MB, TranspositionTable
+
+
+class _JobFlag:
+    """Stop flag that is set once a newer job replaces the current one"""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, latest, job):
+        self.latest = latest
+        self.job = job
+
+    def is_set(self):
+        """Returns true if the job was cancelled or superseded"""
+
+        return self.latest.value != self.job
+
+
+def _engine_loop(requests, responses, latest, hash_mb):
+    """Serves search requests until a None request arrives"""
+
+    table = TranspositionTable(hash_mb)
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        (job, position, limits) = request
+        if latest.value != job:
+            continue  # cancelled or superseded while queued
+
+        def report(result, job=job):
+            responses.put(("info", job, result.as_dict()))
+
+        try:
+            result = Search(position, max_depth=limits.get("depth"),
+                max_nodes=limits.get("nodes"),
+                max_time=limits.get("movetime"), on_info=report,
+                table=table, stop_event=_JobFlag(latest, job)).run()
+        except Exception as error:  # pylint: disable=broad-except
+            responses.put(("error", job, str(error)))
+        else:
+            responses.put(("done", job, result.as_dict()))
+
+
+class EngineWorker:
+    """Engine search running in a separate process
+
+    Requests and responses travel through queues so the caller never
+    blocks: submit a position, then poll for ("info", job, result),
+    ("done", job, result) or ("error", job, message) tuples. Submitting a
+    new job or calling cancel stops the running search within a few
+    thousand nodes, and responses from stale jobs are dropped by poll.
+    """
+
+    def __init__(self, hash_mb=DEFAULT_HASH_MB):
+        # spawn keeps the child free of the parent's Tk state
+        context = multiprocessing.get_context("spawn")
+        self.requests = context.Queue()
+        self.responses = context.Queue()
+        self.latest = context.Value("q", 0, lock=False)
+        self.job = 0
+        self.process = context.Process(target=_engine_loop,
+            args=(self.requests, self.responses, self.latest, hash_mb),
+            daemon=True)
+        self.process.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    @property
+    def busy(self):
+        """True while the latest job has not finished"""
+
+        return self.latest.value == self.job and self.job > 0
+
+    def submit(self, position, depth=None, nodes=None, movetime=None):
+        """Queues a search of position, cancelling any earlier job"""
+
+        self.job += 1
+        self.latest.value = self.job
+        self.requests.put((self.job, position,
+            {"depth": depth, "nodes": nodes, "movetime": movetime}))
+        return self.job
+
+    def cancel(self):
+        """Stops the running job without starting another"""
+
+        self.latest.value = -1
+
+    def poll(self):
+        """Returns responses for the latest job received so far"""
+
+        responses = []
+        while True:
+            try:
+                (kind, job, payload) = self.responses.get_nowait()
+            except queue.Empty:
+                break
+            if job != self.job:
+                continue
+            if kind != "info":
+                self.latest.value = 0  # finished, no longer busy
+            responses.append((kind, payload))
+        return responses
+
+    def close(self):
+        """Stops the engine process"""
+
+        self.cancel()
+        self.requests.put(None)
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.terminate()
@@ -0,0 +1,37 @@
+"""Module contains Zobrist keys for incremental position hashing"""
+import random
+
+from utils.core import NO_SQUARE
+
+_RANDOM = random.Random(0x5EED)  # fixed seed keeps keys stable across runs
+
+
+def _random_key():
+    """Returns a random 64-bit key"""
+
+    return _RANDOM.getrandbits(64)
+
+
+PIECE_KEYS = tuple(
+    tuple(_random_key() for _ in range(64)) for _ in range(16)
+)
+SIDE_KEY = _random_key()
+CASTLING_KEYS = tuple(_random_key() for _ in range(16))
+EP_KEYS = tuple(_random_key() for _ in range(8))
+
+
+def ep_key(square):
+    """Returns key for en passant square, or 0 when there is none"""
+
+    return 0 if square == NO_SQUARE else EP_KEYS[square & 7]
+
+
+def compute_key(position):
+    """Computes the key of position from scratch"""
+
+    key = 0
+    for (square, piece) in position.pieces():
+        key ^= PIECE_KEYS[piece][square]
+    if position.turn:
+        key ^= SIDE_KEY
+    return key ^ CASTLING_KEYS[position.castling] ^ ep_key(position.ep)